@@ -0,0 +1,242 @@
+"""Benchmark suite for the plan assessment pipeline.
+
+Generates synthetic plans (see ``generate_plan.py``) at several sizes and
+measures each stage of the pipeline in isolation:
+
+- ``load``: ``load_plan_json`` (full ``json.load``)
+- ``stream``: ``iter_resource_changes`` (streaming parse, drained)
+- ``summarize``: ``summarize_changes`` on an already loaded plan
+- ``match``: risk pattern compilation and matching of every resource type
+- ``assess``: ``assess_risk`` on the summary
+- ``format``: ``format_summary_markdown`` on the assessment
+- ``end_to_end``: ``assess_plan_file``, as run by the CLI
+
+Wall time is the best of several runs. Peak memory is measured with
+``tracemalloc`` in a separate run so that tracing does not skew the timings.
+
+Usage:
+    python benchmarks/bench.py [--sizes 1k,10k,100k] [--runs 3] [--format markdown|json]
+    python benchmarks/bench.py --save-baseline
+    python benchmarks/bench.py --compare [--tolerance 0.25] [--fail-on-regression]
+
+Comparisons are normalized by a short calibration workload timed in both
+runs, which absorbs uniform differences in machine speed or load. Baselines
+are still best saved on the machine that compares against them.
+"""
+
+import argparse
+import copy
+import gc
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from collections import deque
+from typing import Any, Callable, Dict, List
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(os.path.dirname(BENCH_DIR), "src"))
+
+from generate_plan import generate_plan, parse_count  # noqa: E402
+
+from terraguard.batch import assess_plan_file  # noqa: E402
+from terraguard.outputs.formatter import format_summary_markdown  # noqa: E402
+from terraguard.risk.risk import load_risk_config, map_risk_level  # noqa: E402
+from terraguard.risk.rules import assess_risk  # noqa: E402
+from terraguard.terraform_plan.loader import iter_resource_changes, load_plan_json  # noqa: E402
+from terraguard.terraform_plan.summarizer import summarize_changes  # noqa: E402
+
+DEFAULT_SIZES = "1k,10k,100k"
+DEFAULT_BASELINE = os.path.join(BENCH_DIR, "baseline.json")
+DEFAULT_TOLERANCE = 0.25
+# Stages faster than this are dominated by timer noise and are not compared.
+MIN_COMPARE_SECONDS = 0.001
+RISK_CONFIG_PATH = os.path.join(
+    os.path.dirname(BENCH_DIR), "src", "terraguard", "risk", "risk_config.json"
+)
+
+# Stage name -> function building the callable to time from the shared context.
+Stage = Callable[[Dict[str, Any]], Callable[[], Any]]
+
+
+def _match_all(ctx: Dict[str, Any]) -> Callable[[], Any]:
+    def run() -> None:
+        # A fresh copy of the config per run, so pattern compilation is included.
+        config = copy.deepcopy(ctx["risk_config"])
+        for rtype in ctx["types"]:
+            map_risk_level(rtype, config)
+
+    return run
+
+
+STAGES: Dict[str, Stage] = {
+    "load": lambda ctx: lambda: load_plan_json(ctx["path"]),
+    "stream": lambda ctx: lambda: deque(iter_resource_changes(ctx["path"]), maxlen=0),
+    "summarize": lambda ctx: lambda: summarize_changes(ctx["plan"], ctx["risk_config"]),
+    "match": _match_all,
+    "assess": lambda ctx: lambda: assess_risk(ctx["stats"], ctx["risk_config"]),
+    "format": lambda ctx: lambda: format_summary_markdown(ctx["result"]),
+    "end_to_end": lambda ctx: lambda: assess_plan_file(ctx["path"], ctx["risk_config"]),
+}
+
+
+def time_best(func: Callable[[], Any], runs: int) -> float:
+    """Return the best wall time of ``func`` over ``runs`` runs, in seconds."""
+    best = float("inf")
+    for _ in range(runs):
+        gc.collect()
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def calibrate(runs: int = 5) -> float:
+    """Time a fixed pure-Python workload, used to normalize comparisons across load."""
+    return time_best(lambda: sorted(str(i) for i in range(200_000)), runs)
+
+
+def peak_memory(func: Callable[[], Any]) -> int:
+    """Return the peak traced memory allocated while running ``func``, in bytes."""
+    gc.collect()
+    tracemalloc.start()
+    try:
+        func()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def bench_size(
+    resources: int, workdir: str, runs: int, risk_config: Dict[str, Any]
+) -> Dict[str, Any]:
+    """Generate a plan with ``resources`` resource changes and benchmark every stage."""
+    path = os.path.join(workdir, f"plan-{resources}.json")
+    with open(path, "w", encoding="utf-8") as f:
+        generate_plan(f, resources, prior_state=True)
+    size = os.path.getsize(path)
+
+    ctx: Dict[str, Any] = {"path": path, "risk_config": risk_config}
+    ctx["plan"] = load_plan_json(path)
+    ctx["types"] = [rc["type"] for rc in ctx["plan"]["resource_changes"]]
+    ctx["stats"] = summarize_changes(ctx["plan"], risk_config)
+    ctx["result"] = assess_risk(ctx["stats"], ctx["risk_config"])
+
+    stages: Dict[str, Dict[str, float]] = {}
+    for name, build in STAGES.items():
+        func = build(ctx)
+        seconds = time_best(func, runs)
+        stages[name] = {
+            "seconds": round(seconds, 6),
+            "peak_mb": round(peak_memory(func) / 2**20, 2),
+            "resources_per_s": round(resources / seconds) if seconds else 0,
+            "mb_per_s": round(size / 2**20 / seconds, 1) if seconds else 0,
+        }
+    os.unlink(path)
+    return {"resources": resources, "plan_mb": round(size / 2**20, 2), "stages": stages}
+
+
+def compare(
+    results: List[Dict[str, Any]],
+    baseline: List[Dict[str, Any]],
+    tolerance: float,
+    speed: float = 1.0,
+) -> List[str]:
+    """Return a description of every stage slower than the baseline beyond ``tolerance``.
+
+    Args:
+        results: Results of this run, annotated in place with "vs_baseline".
+        baseline: Results of the baseline run.
+        tolerance: Allowed slowdown, e.g. 0.25 for 25%.
+        speed: Calibration time of this run divided by that of the baseline
+            run. Ratios are divided by it, so a uniformly slower machine does
+            not count as a regression.
+    """
+    by_size = {entry["resources"]: entry["stages"] for entry in baseline}
+    regressions = []
+    for entry in results:
+        base_stages = by_size.get(entry["resources"], {})
+        for name, stage in entry["stages"].items():
+            base = base_stages.get(name)
+            if not base or base["seconds"] < MIN_COMPARE_SECONDS:
+                continue
+            ratio = stage["seconds"] / base["seconds"] / speed
+            stage["vs_baseline"] = round(ratio, 2)
+            if ratio > 1 + tolerance:
+                regressions.append(
+                    f"{name} @ {entry['resources']} resources: {stage['seconds']:.4f}s vs "
+                    f"{base['seconds']:.4f}s baseline ({ratio:.2f}x)"
+                )
+    return regressions
+
+
+def format_markdown(results: List[Dict[str, Any]]) -> str:
+    """Render benchmark results as a markdown table."""
+    with_baseline = any("vs_baseline" in s for r in results for s in r["stages"].values())
+    header = "| Resources | Plan MB | Stage | Time (s) | Peak MB | Resources/s | MB/s |"
+    rule = "|---:|---:|---|---:|---:|---:|---:|"
+    if with_baseline:
+        header += " vs baseline |"
+        rule += "---:|"
+    lines = [header, rule]
+    for entry in results:
+        for name, stage in entry["stages"].items():
+            line = (
+                f"| {entry['resources']} | {entry['plan_mb']} | {name} | {stage['seconds']:.4f} "
+                f"| {stage['peak_mb']} | {stage['resources_per_s']} | {stage['mb_per_s']} |"
+            )
+            if with_baseline:
+                line += f" {stage['vs_baseline']}x |" if "vs_baseline" in stage else " - |"
+            lines.append(line)
+    return "\n".join(lines)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", default=DEFAULT_SIZES, help="Plan sizes, e.g. 1k,10k,1m.")
+    parser.add_argument("--runs", type=int, default=3, help="Timed runs per stage (best kept).")
+    parser.add_argument("--format", choices=("markdown", "json"), default="markdown")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="Baseline JSON path.")
+    parser.add_argument("--save-baseline", action="store_true", help="Write results as baseline.")
+    parser.add_argument("--compare", action="store_true", help="Compare against the baseline.")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE)
+    parser.add_argument("--fail-on-regression", action="store_true")
+    args = parser.parse_args()
+
+    risk_config = load_risk_config(RISK_CONFIG_PATH)
+    sizes: List[int] = [parse_count(s) for s in args.sizes.split(",")]
+    with tempfile.TemporaryDirectory(prefix="tguard-bench-") as workdir:
+        results = [bench_size(n, workdir, args.runs, risk_config) for n in sizes]
+
+    calibration = calibrate()
+    regressions: List[str] = []
+    if args.compare:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        speed = calibration / baseline.get("calibration_seconds", calibration)
+        regressions = compare(results, baseline["results"], args.tolerance, speed)
+
+    if args.format == "json":
+        print(json.dumps({"results": results, "regressions": regressions}, indent=2))
+    else:
+        print(format_markdown(results))
+        for line in regressions:
+            print(f"REGRESSION: {line}")
+
+    if args.save_baseline:
+        baseline = {
+            "python": sys.version.split()[0],
+            "calibration_seconds": round(calibration, 6),
+            "results": results,
+        }
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(baseline, f, indent=2)
+            f.write("\n")
+
+    sys.exit(1 if regressions and args.fail_on_regression else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,379 @@
+"""Synthetic Terraform plan generator for benchmarks.
+
+Writes a plan JSON shaped like ``terraform show -json`` output with a
+configurable number of resource changes, provider mix and action mix, an
+optional ``prior_state`` holding the current values of every existing
+resource, and a ``configuration`` whose resources reference each other in
+chains within their module. The plan is written incrementally, so even a
+million resource changes are generated in constant memory.
+
+Usage:
+    python benchmarks/generate_plan.py --resources 100k -o plan.json
+    python benchmarks/generate_plan.py --resources 1m --prior-state \\
+        --providers aws=6,google=2,azurerm=1,kubernetes=1 \\
+        --actions create=5,update=3,delete=1,replace=1 -o big.json
+"""
+
+import argparse
+import json
+import random
+import sys
+from typing import IO, Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+RESOURCE_TYPES: Dict[str, Sequence[str]] = {
+    "aws": (
+        "aws_instance",
+        "aws_s3_bucket",
+        "aws_s3_bucket_policy",
+        "aws_iam_role",
+        "aws_iam_policy",
+        "aws_iam_role_policy_attachment",
+        "aws_security_group",
+        "aws_security_group_rule",
+        "aws_db_instance",
+        "aws_vpc",
+        "aws_subnet",
+        "aws_route_table",
+        "aws_route",
+        "aws_lambda_function",
+        "aws_cloudwatch_log_group",
+        "aws_kms_key",
+        "aws_route53_record",
+    ),
+    "google": (
+        "google_compute_instance",
+        "google_compute_firewall",
+        "google_compute_network",
+        "google_storage_bucket",
+        "google_project_iam_member",
+        "google_sql_database_instance",
+    ),
+    "azurerm": (
+        "azurerm_network_security_group",
+        "azurerm_linux_virtual_machine",
+        "azurerm_storage_account",
+        "azurerm_role_assignment",
+        "azurerm_resource_group",
+    ),
+    "kubernetes": (
+        "kubernetes_deployment",
+        "kubernetes_service",
+        "kubernetes_config_map",
+        "kubernetes_secret",
+        "kubernetes_manifest",
+    ),
+    "null": ("null_resource",),
+}
+
+PROVIDER_NAMES = {
+    "aws": "registry.terraform.io/hashicorp/aws",
+    "google": "registry.terraform.io/hashicorp/google",
+    "azurerm": "registry.terraform.io/hashicorp/azurerm",
+    "kubernetes": "registry.terraform.io/hashicorp/kubernetes",
+    "null": "registry.terraform.io/hashicorp/null",
+}
+
+ACTIONS: Dict[str, List[str]] = {
+    "create": ["create"],
+    "update": ["update"],
+    "delete": ["delete"],
+    "replace": ["delete", "create"],
+    "no-op": ["no-op"],
+    "read": ["read"],
+}
+
+DEFAULT_PROVIDERS = "aws=6,google=2,azurerm=1,kubernetes=1"
+DEFAULT_ACTIONS = "create=5,update=3,delete=1,replace=1"
+
+MODULES = ("network", "compute", "data", "iam", "observability", "platform")
+
+# Consecutive resources sharing a module call; references stay within a block.
+BLOCK_SIZE = 100
+
+
+def parse_count(value: str) -> int:
+    """Parse a count such as "5000", "10k" or "1m"."""
+    value = value.strip().lower()
+    scale = {"k": 1_000, "m": 1_000_000}.get(value[-1:], 1)
+    return int(float(value.rstrip("km")) * scale)
+
+
+def parse_mix(value: str, choices: Sequence[str]) -> Tuple[List[str], List[float]]:
+    """Parse a weighted mix such as "aws=6,google=2" into names and weights."""
+    names: List[str] = []
+    weights: List[float] = []
+    for part in value.split(","):
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        if name not in choices:
+            raise ValueError(f"Unknown choice '{name}'. Must be one of {tuple(choices)}.")
+        names.append(name)
+        weights.append(float(weight or 1))
+    return names, weights
+
+
+def _attributes(rng: random.Random, rtype: str, name: str, padding: int) -> Dict[str, Any]:
+    """Return a plausible attribute body for a resource."""
+    tags = {"Name": name, "Environment": rng.choice(("dev", "staging", "prod")), "Team": "infra"}
+    body: Dict[str, Any] = {
+        "id": f"{rtype}-{rng.getrandbits(48):012x}",
+        "name": name,
+        "tags": tags,
+        "tags_all": dict(tags, Terraform="true"),
+    }
+    if "iam" in rtype or rtype.endswith("_policy"):
+        statement = {
+            "Effect": "Allow",
+            "Action": [f"s3:{a}" for a in ("GetObject", "PutObject", "ListBucket")],
+            "Resource": [f"arn:aws:s3:::{name}", f"arn:aws:s3:::{name}/*"],
+        }
+        body["policy"] = json.dumps({"Version": "2012-10-17", "Statement": [statement] * 3})
+    elif rtype in ("aws_security_group", "google_compute_firewall"):
+        body["ingress"] = [
+            {"from_port": port, "to_port": port, "protocol": "tcp", "cidr_blocks": ["10.0.0.0/8"]}
+            for port in (22, 80, 443)
+        ]
+    elif rtype == "aws_db_instance":
+        body.update(storage_encrypted=True, publicly_accessible=False, engine="postgres")
+    elif rtype == "kubernetes_manifest":
+        body["manifest"] = {
+            "apiVersion": "apps/v1",
+            "kind": "Deployment",
+            "metadata": {"name": name, "labels": tags},
+            "spec": {"replicas": 3, "template": {"spec": {"containers": [{"name": name}]}}},
+        }
+    if padding:
+        body["user_data"] = "x" * padding
+    return body
+
+
+def _iter_resources(
+    seed: int, resources: int, providers: str, actions: str, padding: int
+) -> Iterator[Tuple[str, str, str, str, List[str], Optional[Dict[str, Any]], Any, str, List[str]]]:
+    """Yield (address, type, name, provider, actions, before, after, module, refs) per resource.
+
+    ``module`` is the address prefix of the resource's module ("" for the
+    root module) and ``refs`` the module-relative addresses of the resources
+    it references. Each block of ``BLOCK_SIZE`` consecutive resources belongs
+    to its own module call (or to the root module).
+
+    The sequence only depends on the arguments, so it can be replayed to write
+    the ``prior_state`` and the ``configuration`` without keeping the
+    resources in memory.
+    """
+    rng = random.Random(seed)
+    provider_names, provider_weights = parse_mix(providers, tuple(RESOURCE_TYPES))
+    action_names, action_weights = parse_mix(actions, tuple(ACTIONS))
+    module = ""
+    block: List[str] = []
+    block_rng = rng
+    for i in range(resources):
+        if i % BLOCK_SIZE == 0:
+            number = i // BLOCK_SIZE
+            block_rng = random.Random(seed * 1_000_003 + number)
+            module = "".join(
+                f"module.{block_rng.choice(MODULES)}_{number}."
+                for _ in range(block_rng.randint(0, 2))
+            )
+            block = []
+        provider = rng.choices(provider_names, provider_weights)[0]
+        rtype = rng.choice(RESOURCE_TYPES[provider])
+        action = rng.choices(action_names, action_weights)[0]
+        name = f"r{i}"
+
+        after: Optional[Dict[str, Any]] = _attributes(rng, rtype, name, padding)
+        before = None
+        if action != "create" and after is not None:
+            revision = str(rng.randint(1, 9))
+            before = dict(after, tags=dict(after["tags"], Revision=revision))
+        if action == "delete":
+            after = None
+        refs = []
+        if block and block_rng.random() < 0.6:
+            refs.append(block[-1])
+        if len(block) > 1 and block_rng.random() < 0.3:
+            refs.append(block_rng.choice(block[:-1]))
+        block.append(f"{rtype}.{name}")
+        yield (
+            f"{module}{rtype}.{name}",
+            rtype,
+            name,
+            provider,
+            ACTIONS[action],
+            before,
+            after,
+            module,
+            refs,
+        )
+
+
+def _configuration_resource(rtype: str, name: str, provider: str, refs: List[str]) -> str:
+    """Return the JSON of a configuration resource referencing ``refs``."""
+    expressions: Dict[str, Any] = {"name": {"constant_value": name}}
+    if refs:
+        expressions["depends_on_ids"] = {
+            "references": [r for ref in refs for r in (f"{ref}.id", ref)]
+        }
+    resource = {
+        "address": f"{rtype}.{name}",
+        "mode": "managed",
+        "type": rtype,
+        "name": name,
+        "provider_config_key": provider,
+        "expressions": expressions,
+        "schema_version": 0,
+    }
+    return json.dumps(resource, separators=(",", ":"))
+
+
+def _write_configuration(out: IO[str], args: Tuple[Any, ...]) -> None:
+    """Write the ``configuration`` of the resources: root ones, then one module call per block."""
+    out.write(',"configuration":{"root_module":{"resources":[')
+    first = True
+    for _, rtype, name, provider, _, _, _, module, refs in _iter_resources(*args):
+        if module:
+            continue
+        if not first:
+            out.write(",")
+        first = False
+        out.write(_configuration_resource(rtype, name, provider, refs))
+    out.write('],"module_calls":{')
+    current = None
+    first = True
+    for _, rtype, name, provider, _, _, _, module, refs in _iter_resources(*args):
+        if not module:
+            continue
+        calls = module.rstrip(".").split(".")[1::2]
+        if module != current:
+            if current is not None:
+                out.write(_close_module_call(current))
+            out.write("," if current is not None else "")
+            for depth, call in enumerate(calls):
+                source = call.rsplit("_", 1)[0]
+                prefix = '"module_calls":{' if depth else ""
+                out.write(f'{prefix}"{call}":{{"source":"./modules/{source}","module":{{')
+            out.write('"resources":[')
+            current = module
+            first = True
+        if not first:
+            out.write(",")
+        first = False
+        out.write(_configuration_resource(rtype, name, provider, refs))
+    if current is not None:
+        out.write(_close_module_call(current))
+    out.write("}}}")
+
+
+def _close_module_call(module: str) -> str:
+    """Return the JSON closing the resources and nested module calls of ``module``."""
+    depth = module.count(".") // 2
+    # resources list, module and call objects; then module_calls, module and
+    # call objects of each enclosing call.
+    return "]}}" + "}}}" * (depth - 1)
+
+
+def generate_plan(
+    out: IO[str],
+    resources: int,
+    providers: str = DEFAULT_PROVIDERS,
+    actions: str = DEFAULT_ACTIONS,
+    prior_state: bool = False,
+    padding: int = 0,
+    seed: int = 0,
+) -> None:
+    """Write a synthetic Terraform plan JSON document to ``out``.
+
+    Args:
+        out: Text stream to write to.
+        resources: Number of resource changes.
+        providers: Weighted provider mix, e.g. "aws=6,google=2".
+        actions: Weighted action mix, e.g. "create=5,update=3,delete=1,replace=1".
+        prior_state: Whether to include a ``prior_state`` with the current
+            values of every resource that already exists.
+        padding: Extra characters of attribute data per resource body, to
+            model resources with large bodies.
+        seed: Random seed; the same arguments and seed give the same plan.
+    """
+    args = (seed, resources, providers, actions, padding)
+
+    out.write('{"format_version":"1.2","terraform_version":"1.9.0",')
+    out.write('"planned_values":{"root_module":{}},"resource_changes":[')
+    for i, (address, rtype, name, provider, rc_actions, before, after, _, _) in enumerate(
+        _iter_resources(*args)
+    ):
+        change: Dict[str, Any] = {
+            "address": address,
+            "mode": "managed",
+            "type": rtype,
+            "name": name,
+            "provider_name": PROVIDER_NAMES[provider],
+            "change": {
+                "actions": rc_actions,
+                "before": before,
+                "after": after,
+                "after_unknown": {"id": True} if "create" in rc_actions else {},
+                "before_sensitive": False if before is None else {},
+                "after_sensitive": False if after is None else {},
+            },
+        }
+        module_address = address.rsplit(".", 2)[0] if address.startswith("module.") else ""
+        if module_address:
+            change["module_address"] = module_address
+        if i:
+            out.write(",")
+        out.write(json.dumps(change, separators=(",", ":")))
+    out.write("]")
+
+    if prior_state:
+        out.write(',"prior_state":{"format_version":"1.0","values":{"root_module":{"resources":[')
+        first = True
+        for address, rtype, name, provider, _, before, _, _, _ in _iter_resources(*args):
+            if before is None:
+                continue
+            resource = {
+                "address": address,
+                "mode": "managed",
+                "type": rtype,
+                "name": name,
+                "provider_name": PROVIDER_NAMES[provider],
+                "values": before,
+            }
+            if not first:
+                out.write(",")
+            first = False
+            out.write(json.dumps(resource, separators=(",", ":")))
+        out.write("]}}}")
+
+    _write_configuration(out, args)
+    out.write(',"applyable":true,"complete":true}')
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--resources", default="10k", help="Resource changes, e.g. 1k, 1m.")
+    parser.add_argument("--providers", default=DEFAULT_PROVIDERS, help="Weighted provider mix.")
+    parser.add_argument("--actions", default=DEFAULT_ACTIONS, help="Weighted action mix.")
+    parser.add_argument("--prior-state", action="store_true", help="Include a prior_state.")
+    parser.add_argument("--padding", type=int, default=0, help="Extra chars per resource body.")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("-o", "--output", default="-", help="Output path, '-' for stdout.")
+    args = parser.parse_args()
+
+    out = sys.stdout if args.output == "-" else open(args.output, "w", encoding="utf-8")
+    try:
+        generate_plan(
+            out,
+            parse_count(args.resources),
+            providers=args.providers,
+            actions=args.actions,
+            prior_state=args.prior_state,
+            padding=args.padding,
+            seed=args.seed,
+        )
+    finally:
+        if out is not sys.stdout:
+            out.close()
+
+
+if __name__ == "__main__":
+    main()
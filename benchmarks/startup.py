@@ -0,0 +1,103 @@
+"""Startup budget check for the ``tguard`` command.
+
+Imports ``terraguard.cli`` in fresh interpreters and fails if
+
+- any module that should only be loaded on demand (``requests`` and its HTTP
+  stack, ``multiprocessing``, and the plan reader, risk matcher, result cache
+  and profiler, which are loaded once a plan is assessed) is imported at
+  startup, or
+- the cumulative import time of ``terraguard.cli`` reported by
+  ``python -X importtime`` exceeds the budget (best of several runs).
+
+Usage:
+    python benchmarks/startup.py [--budget-ms 60] [--runs 7]
+
+Exits with code 1 if the budget is exceeded, 0 otherwise.
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+from typing import Dict, List
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src")
+
+# Modules that must not be imported just to start the CLI.
+LAZY_MODULES = (
+    "requests",
+    "urllib3",
+    "charset_normalizer",
+    "idna",
+    "http.client",
+    "multiprocessing",
+    "concurrent.futures.process",
+    "terraguard.batch",
+    "terraguard.cache",
+    "terraguard.profiling",
+    "terraguard.risk",
+    "terraguard.terraform_plan",
+)
+
+DEFAULT_BUDGET_MS = float(os.getenv("TGUARD_STARTUP_BUDGET_MS", "60"))
+
+
+def _env() -> Dict[str, str]:
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [SRC_DIR, env.get("PYTHONPATH")]))
+    return env
+
+
+def imported_modules() -> List[str]:
+    """Return the modules that importing terraguard.cli adds to sys.modules."""
+    code = (
+        "import sys; before = set(sys.modules); import terraguard.cli; "
+        "print('\\n'.join(sorted(set(sys.modules) - before)))"
+    )
+    out = subprocess.run(
+        [sys.executable, "-c", code], env=_env(), check=True, capture_output=True, text=True
+    )
+    return out.stdout.split()
+
+
+def import_time_us() -> int:
+    """Return the cumulative import time of terraguard.cli in microseconds."""
+    out = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import terraguard.cli"],
+        env=_env(),
+        check=True,
+        capture_output=True,
+        text=True,
+    )
+    for line in out.stderr.splitlines():
+        # import time: self [us] | cumulative | imported package
+        fields = line.split("|")
+        if len(fields) == 3 and fields[2].strip() == "terraguard.cli":
+            return int(fields[1])
+    raise RuntimeError("terraguard.cli not found in -X importtime output")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--budget-ms", type=float, default=DEFAULT_BUDGET_MS)
+    parser.add_argument("--runs", type=int, default=7)
+    args = parser.parse_args()
+
+    failed = False
+    modules = set(imported_modules())
+    eager = [name for name in LAZY_MODULES if name in modules]
+    if eager:
+        print(f"FAIL: imported at startup: {', '.join(eager)}")
+        failed = True
+
+    import_time_us()  # warm up the bytecode cache
+    best_ms = min(import_time_us() for _ in range(args.runs)) / 1000
+    status = "FAIL" if best_ms > args.budget_ms else "ok"
+    print(f"{status}: import terraguard.cli took {best_ms:.1f} ms (budget {args.budget_ms:g} ms)")
+    failed = failed or best_ms > args.budget_ms
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,17 +1,50 @@
-from .config import get_settings
-from .outputs.formatter import format_summary_markdown
-from .outputs.github import maybe_post_github_comment
-from .risk.risk import load_risk_config
-from .risk.rules import assess_risk
-from .terraform_plan.loader import load_plan_json
-from .terraform_plan.summarizer import summarize_changes
+from importlib import import_module
+from typing import TYPE_CHECKING, Any, List
+
+if TYPE_CHECKING:
+    from .config import get_settings
+    from .outputs.formatter import format_summary_markdown
+    from .outputs.github import maybe_post_github_comment
+    from .risk.risk import load_risk_config
+    from .risk.rules import assess_risk
+    from .terraform_plan.loader import iter_resource_changes, load_plan_json
+    from .terraform_plan.summarizer import summarize_changes, summarize_resource_changes
 
 __all__ = [
     "load_risk_config",
     "assess_risk",
     "load_plan_json",
+    "iter_resource_changes",
     "summarize_changes",
+    "summarize_resource_changes",
     "get_settings",
     "format_summary_markdown",
     "maybe_post_github_comment",
 ]
+
+# Public names and the submodules defining them. They are imported on first
+# access, so that importing a light submodule (e.g. terraguard.client) does
+# not load the whole package.
+_EXPORTS = {
+    "load_risk_config": ".risk.risk",
+    "assess_risk": ".risk.rules",
+    "load_plan_json": ".terraform_plan.loader",
+    "iter_resource_changes": ".terraform_plan.loader",
+    "summarize_changes": ".terraform_plan.summarizer",
+    "summarize_resource_changes": ".terraform_plan.summarizer",
+    "get_settings": ".config",
+    "format_summary_markdown": ".outputs.formatter",
+    "maybe_post_github_comment": ".outputs.github",
+}
+
+
+def __getattr__(name: str) -> Any:
+    if name not in _EXPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(import_module(_EXPORTS[name], __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__() -> List[str]:
+    return sorted(list(globals()) + __all__)
@@ -0,0 +1,334 @@
+"""Batch assessment of many Terraform plan files in one invocation.
+
+This module expands directories and glob patterns into plan files, assesses
+them on a process pool that shares one loaded risk configuration, and
+aggregates the per-plan results into an overall verdict.
+"""
+
+import glob
+import os
+from collections import deque
+from itertools import islice
+from typing import Any, Deque, Dict, Iterator, List, Optional, Sequence
+
+from terraguard.cache import ResultCache, cache_key
+from terraguard.config import RISK_LEVEL_ORDER, STDIN
+from terraguard.profiling import NULL_PROFILER, Profiler
+from terraguard.risk.risk import get_risk_matcher
+from terraguard.risk.rules import assess_risk, score_from_level
+from terraguard.terraform_plan.baseline import Baseline, BaselineDiff
+from terraguard.terraform_plan.graph import DependencyGraph
+from terraguard.terraform_plan.loader import PLAN_SUFFIXES, iter_resource_changes
+from terraguard.terraform_plan.sections import SectionSignals
+from terraguard.terraform_plan.summarizer import summarize_resource_changes
+from terraguard.terraform_plan.table import ChangeTable
+
+# Plans submitted to the pool per worker ahead of the result being yielded.
+PENDING_PER_WORKER = 2
+
+# Risk configuration, result cache and baseline options installed in each
+# pool worker by _init_worker.
+_worker_risk_config: Dict[str, Any] = {}
+_worker_cache: Optional[ResultCache] = None
+_worker_baseline: Optional[Baseline] = None
+_worker_record_digest = False
+_worker_stop_at: Optional[str] = None
+_worker_record_changes = False
+
+
+def available_cpus() -> int:
+    """Return the number of CPUs this process may run on."""
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+def collect_plan_paths(inputs: Sequence[str]) -> List[str]:
+    """Expand plan inputs into a list of plan file paths.
+
+    Args:
+        inputs: Plan file paths, directories (searched recursively for
+            files ending with one of ``PLAN_SUFFIXES``, e.g. ``*.json`` or
+            ``*.json.gz``) and glob patterns (``**`` is supported).
+
+    Returns:
+        The matching file paths in input order, each directory and pattern
+        expanded in sorted order, without duplicates.
+    """
+    paths: List[str] = []
+    seen = set()
+    for item in inputs:
+        if os.path.isdir(item):
+            expanded = sorted(
+                p
+                for p in glob.glob(os.path.join(item, "**", "*.json*"), recursive=True)
+                if p.endswith(PLAN_SUFFIXES)
+            )
+        elif any(c in item for c in "*?["):
+            expanded = sorted(p for p in glob.glob(item, recursive=True) if os.path.isfile(p))
+        else:
+            expanded = [item]
+        for path in expanded:
+            if path not in seen:
+                seen.add(path)
+                paths.append(path)
+    return paths
+
+
+def assess_plan_file(
+    path: str,
+    risk_config: Dict[str, Any],
+    cache: Optional[ResultCache] = None,
+    profiler: Profiler = NULL_PROFILER,
+    baseline: Optional[Baseline] = None,
+    record_digest: bool = False,
+    stop_at: Optional[str] = None,
+    record_changes: bool = False,
+    jobs: int = 1,
+) -> Dict[str, Any]:
+    """Assess a single plan file, capturing load errors in the result.
+
+    Args:
+        path: Path to the Terraform plan JSON file, which may be compressed,
+            or "-" for stdin (see ``terraform_plan.loader.open_plan``).
+        risk_config: Risk configuration dictionary.
+        cache: Optional result cache. On a hit the plan is not parsed at all;
+            on a miss the fresh result is stored. Not used for stdin, which
+            cannot be hashed before it is parsed.
+        profiler: Optional profiler recording the stages of the assessment.
+        baseline: Optional baseline to diff the plan against, so that only
+            new and escalated changes are scored.
+        record_digest: Whether to return the change codes of the plan, to
+            write a digest of it. The cache is not read in that case.
+        stop_at: Optional risk level at which to stop reading the plan, once
+            it is certain to be reached (see ``summarize_resource_changes``).
+            Such partial results are not cached.
+        record_changes: Whether to return the ``ChangeTable`` of the plan,
+            to write its resources as records. The cache is not read in that
+            case.
+        jobs: Maximum number of worker processes to summarize the plan
+            with. Plain plan files of ``SHARD_THRESHOLD`` bytes or more are
+            then summarized in shards (see ``terraform_plan.shards``), unless
+            ``stop_at`` is given.
+
+    Returns:
+        The ``assess_risk`` result dictionary with an added "path" key (and
+        "digest" key, holding the change codes, with ``record_digest``, and
+        "changes" key, holding the change table, with ``record_changes``,
+        and "cached" key, telling whether the result was found in the cache,
+        when the cache was read), or a dictionary with "path" and "error" keys if the plan could not
+        be read.
+    """
+    stage = profiler.stage
+    try:
+        key = ""
+        result = None
+        if path == STDIN:
+            cache = None
+        if cache is not None:
+            with stage("cache_lookup"):
+                key = cache_key(path, risk_config, baseline.fingerprint(path) if baseline else "")
+                result = None if record_digest or record_changes else cache.get(key)
+            if result is not None:
+                result["cached"] = True
+        if result is None:
+            if profiler.enabled:
+                with stage("compile_patterns"):
+                    get_risk_matcher(risk_config)
+            diff = None
+            if baseline is not None or record_digest:
+                diff = BaselineDiff(baseline.for_plan(path) if baseline else None, record_digest)
+            with stage("summarize"):
+                table = ChangeTable()
+                stats = None
+                if stop_at is None and jobs > 1:
+                    # Imported here: only large plans are summarized in shards.
+                    from terraguard.terraform_plan.shards import shardable, summarize_plan_sharded
+
+                    if shardable(path, jobs):
+                        stats = summarize_plan_sharded(path, risk_config, jobs, diff, table)
+                if stats is None:
+                    # Parsing is interleaved with summarizing; it is timed as a nested stage.
+                    graph = DependencyGraph()
+                    signals = SectionSignals(risk_config)
+                    changes = profiler.timed_iter(
+                        "parse", iter_resource_changes(path, graph, signals)
+                    )
+                    stats = summarize_resource_changes(
+                        changes, risk_config, graph, diff, table, stop_at, signals
+                    )
+            with stage("assess"):
+                result = assess_risk(stats, risk_config)
+            if cache is not None and not stats["partial"]:
+                with stage("cache_store"):
+                    cache.put(key, result)
+            if cache is not None and not (record_digest or record_changes):
+                result["cached"] = False
+            if diff is not None and record_digest:
+                result["digest"] = diff.codes()
+            if record_changes:
+                result["changes"] = table
+    except (OSError, ValueError) as e:
+        return {"path": path, "error": str(e)}
+    result["path"] = path
+    return result
+
+
+def _init_worker(
+    risk_config: Dict[str, Any],
+    cache: Optional[ResultCache],
+    baseline: Optional[Baseline],
+    record_digest: bool,
+    stop_at: Optional[str],
+    record_changes: bool,
+) -> None:
+    global _worker_risk_config, _worker_cache, _worker_baseline, _worker_record_digest
+    global _worker_stop_at, _worker_record_changes
+    _worker_risk_config = risk_config
+    _worker_cache = cache
+    _worker_baseline = baseline
+    _worker_record_digest = record_digest
+    _worker_stop_at = stop_at
+    _worker_record_changes = record_changes
+
+
+def _assess_in_worker(path: str) -> Dict[str, Any]:
+    return assess_plan_file(
+        path,
+        _worker_risk_config,
+        _worker_cache,
+        baseline=_worker_baseline,
+        record_digest=_worker_record_digest,
+        stop_at=_worker_stop_at,
+        record_changes=_worker_record_changes,
+    )
+
+
+def assess_plans(
+    paths: Sequence[str],
+    risk_config: Dict[str, Any],
+    jobs: Optional[int] = None,
+    cache: Optional[ResultCache] = None,
+    baseline: Optional[Baseline] = None,
+    record_digest: bool = False,
+    stop_at: Optional[str] = None,
+) -> List[Dict[str, Any]]:
+    """Assess many plan files, in parallel when more than one worker is useful.
+
+    The risk configuration is sent to each worker process once, when the
+    worker starts, rather than with every plan.
+
+    Args:
+        paths: Plan file paths to assess.
+        risk_config: Risk configuration dictionary shared by all plans.
+        jobs: Maximum number of worker processes. Defaults to the number of
+            available CPUs.
+        cache: Optional result cache shared by all workers.
+        baseline: Optional baseline of the plans (see ``assess_plan_file``).
+        record_digest: Whether to return the change codes of each plan.
+        stop_at: Optional risk level at which to stop reading each plan (see
+            ``assess_plan_file``).
+
+    Returns:
+        One result per path, in the same order (see ``assess_plan_file``).
+    """
+    return list(
+        iter_assess_plans(paths, risk_config, jobs, cache, baseline, record_digest, stop_at)
+    )
+
+
+def iter_assess_plans(
+    paths: Sequence[str],
+    risk_config: Dict[str, Any],
+    jobs: Optional[int] = None,
+    cache: Optional[ResultCache] = None,
+    baseline: Optional[Baseline] = None,
+    record_digest: bool = False,
+    stop_at: Optional[str] = None,
+    record_changes: bool = False,
+) -> Iterator[Dict[str, Any]]:
+    """Yield the results of ``assess_plans`` one by one, in path order, as they are ready.
+
+    At most ``PENDING_PER_WORKER`` plans per worker are submitted ahead of
+    the result being yielded, so the results held at once do not grow with
+    the number of paths.
+
+    Args:
+        record_changes: Whether to return the change table of each plan
+            (see ``assess_plan_file``). Consumers can write the records of a
+            plan and drop its table before the next result, so that only a
+            few tables are held at once.
+
+    See ``assess_plans`` for the other arguments.
+    """
+    workers = min(jobs or available_cpus(), len(paths))
+    if workers <= 1:
+        # A single plan may use the workers itself
+        plan_jobs = (jobs or available_cpus()) if len(paths) == 1 else 1
+        for path in paths:
+            yield assess_plan_file(
+                path,
+                risk_config,
+                cache,
+                baseline=baseline,
+                record_digest=record_digest,
+                stop_at=stop_at,
+                record_changes=record_changes,
+                jobs=plan_jobs,
+            )
+        return
+
+    # Imported here: concurrent.futures.process pulls in multiprocessing.
+    from concurrent.futures import Future, ProcessPoolExecutor
+
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        initializer=_init_worker,
+        initargs=(risk_config, cache, baseline, record_digest, stop_at, record_changes),
+    ) as pool:
+        # Only a window of plans is submitted ahead of the one yielded, so
+        # that results waiting for a slow plan do not pile up in memory.
+        pending: Deque[Future[Dict[str, Any]]] = deque()
+        remaining = iter(paths)
+        for path in islice(remaining, workers * PENDING_PER_WORKER):
+            pending.append(pool.submit(_assess_in_worker, path))
+        while pending:
+            result = pending.popleft().result()
+            for path in islice(remaining, 1):
+                pending.append(pool.submit(_assess_in_worker, path))
+            yield result
+
+
+def aggregate_results(results: Sequence[Dict[str, Any]]) -> Dict[str, Any]:
+    """Combine per-plan results into an overall verdict.
+
+    Args:
+        results: Per-plan results as returned by ``assess_plans``.
+
+    Returns:
+        A dictionary containing:
+            - level: Highest risk level among the assessed plans
+            - score: Score of that level
+            - plans: Number of plans
+            - level_counts: Number of plans per risk level
+            - errors: Number of plans that could not be read
+    """
+    level_counts = dict.fromkeys(RISK_LEVEL_ORDER, 0)
+    errors = 0
+    for result in results:
+        if "error" in result:
+            errors += 1
+        else:
+            level_counts[result["level"]] += 1
+
+    level = "LOW"
+    for candidate in RISK_LEVEL_ORDER:
+        if level_counts[candidate]:
+            level = candidate
+    return {
+        "level": level,
+        "score": score_from_level(level),
+        "plans": len(results),
+        "level_counts": level_counts,
+        "errors": errors,
+    }
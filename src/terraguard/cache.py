@@ -0,0 +1,206 @@
+"""Content-addressed on-disk cache of risk assessment results.
+
+Results are keyed on a SHA-256 hash of the terraguard version and
+``CACHE_FORMAT``, the effective (merged) risk configuration, the fingerprint
+of the baseline the plan is diffed against, if any, and the plan file bytes,
+so a re-run on an identical plan (retries, re-triggered checks, matrix jobs)
+skips parsing and scoring entirely.
+
+The cache is a single directory that can be handed to a CI cache action as is::
+
+    <cache_dir>/v<CACHE_FORMAT>/<key[:2]>/<key>.json
+
+for instance ``<cache_dir>/v5/3f/3f9a....json``. Bumping ``CACHE_FORMAT``
+leaves older entries in their own directory, where they are no longer read.
+The same directory also holds the merged risk configurations of
+``risk.layers``.
+
+Entries are immutable and written atomically, so concurrent writers never
+expose partial files. The directory is kept under a size limit by evicting the
+least recently used entries (the modification time is bumped on every hit).
+Each ``ResultCache`` scans the directory once, on its first write, and then
+keeps a running estimate of its size, so it is only scanned again when the
+estimate goes over the limit.
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+from typing import Any, Dict, List, Optional, Tuple, cast
+
+from terraguard.config import DEFAULT_CACHE_MAX_MB
+
+# Bump when the layout or the format of cached results changes.
+CACHE_FORMAT = 5
+
+DEFAULT_MAX_BYTES = DEFAULT_CACHE_MAX_MB * 1024 * 1024
+
+_READ_SIZE = 1 << 20
+
+# Fraction of the size limit evictions go down to, so that a full cache is
+# scanned once per tenth of its size written rather than on every write.
+_EVICT_TO = 0.9
+
+# Stats holding lists of tuples, which JSON turns into lists.
+_TUPLE_STATS = (
+    "sensitive_details",
+    "attribute_changes",
+    "top_dependents",
+    "escalated_changes",
+    "reviewed_details",
+    "module_rollup",
+    "provider_rollup",
+)
+
+
+def terraguard_version() -> str:
+    """Return the installed terraguard version, or "unknown" if not installed."""
+    # Imported lazily: importlib.metadata is only needed when caching is enabled.
+    from importlib.metadata import PackageNotFoundError, version
+
+    try:
+        return version("terraguard")
+    except PackageNotFoundError:
+        return "unknown"
+
+
+def cache_key(plan_path: str, risk_config: Dict[str, Any], baseline: str = "") -> str:
+    """Compute the cache key of a plan assessed with a risk configuration.
+
+    Args:
+        plan_path: Path to the Terraform plan JSON file. It is hashed in chunks,
+            so memory use does not depend on its size.
+        risk_config: Effective risk configuration dictionary.
+        baseline: Fingerprint of the baseline the plan is diffed against, if
+            any (see ``Baseline.fingerprint``).
+
+    Returns:
+        A hex SHA-256 digest.
+
+    Raises:
+        OSError: If the plan file cannot be read.
+    """
+    digest = hashlib.sha256()
+    digest.update(f"terraguard {terraguard_version()} format {CACHE_FORMAT}\0".encode())
+    digest.update(json.dumps(risk_config, sort_keys=True, separators=(",", ":")).encode())
+    digest.update(f"\0{baseline}\0".encode())
+    with open(plan_path, "rb") as f:
+        for chunk in iter(lambda: f.read(_READ_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def restore_tuples(result: Dict[str, Any]) -> None:
+    """Turn the detail lists of a result decoded from JSON back into tuples, in place."""
+    stats = result.get("stats", {})
+    for key in _TUPLE_STATS:
+        if key in stats:
+            stats[key] = [tuple(d) for d in stats[key]]
+
+
+class ResultCache:
+    """Size-bounded, least-recently-used cache of assessment results on disk."""
+
+    def __init__(self, directory: str, max_bytes: int = DEFAULT_MAX_BYTES) -> None:
+        """Create a cache rooted at ``directory``.
+
+        Args:
+            directory: Cache directory. Created on first write.
+            max_bytes: Total size of cached entries above which the least
+                recently used entries are evicted.
+        """
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._root = os.path.join(directory, f"v{CACHE_FORMAT}")
+        # Size of the entries, scanned on the first write and then estimated
+        # from the sizes written. Entries written by other processes are only
+        # counted at the next scan.
+        self._size: Optional[int] = None
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self._root, key[:2], f"{key}.json")
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Return the cached result for ``key``, or None on a miss.
+
+        Unreadable or corrupt entries are treated as misses.
+        """
+        path = self._path(key)
+        try:
+            with open(path, encoding="utf-8") as f:
+                result = cast(Dict[str, Any], json.load(f))
+            os.utime(path)
+        except (OSError, ValueError):
+            return None
+        restore_tuples(result)
+        return result
+
+    def put(self, key: str, result: Dict[str, Any]) -> None:
+        """Store a result under ``key`` and evict old entries if over the size limit.
+
+        The size of the cache is estimated, see ``ResultCache``.
+
+        Failures to write are ignored; the cache is an optimization only.
+        """
+        path = self._path(key)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+            try:
+                with os.fdopen(fd, "w", encoding="utf-8") as f:
+                    json.dump(result, f, separators=(",", ":"))
+                os.replace(tmp_path, path)
+            except BaseException:
+                os.unlink(tmp_path)
+                raise
+            written = os.stat(path).st_size
+        except OSError:
+            return
+        if self._size is None:
+            self._size = sum(size for _, _, size in _scan_entries(self._root))
+        else:
+            self._size += written
+        if self._size > self.max_bytes:
+            self.evict()
+
+    def evict(self) -> None:
+        """Delete least recently used entries if the cache is over ``max_bytes``.
+
+        Entries are deleted until the cache is 10% under the limit.
+        """
+        entries = _scan_entries(self._root)
+        total = sum(size for _, _, size in entries)
+        if total > self.max_bytes:
+            target = int(self.max_bytes * _EVICT_TO)
+            entries.sort()
+            for _, path, size in entries:
+                try:
+                    os.unlink(path)
+                except FileNotFoundError:
+                    pass
+                total -= size
+                if total <= target:
+                    break
+        self._size = total
+
+
+def _scan_entries(root: str) -> List[Tuple[float, str, int]]:
+    """Return (mtime, path, size) for every cache entry under ``root``."""
+    entries: List[Tuple[float, str, int]] = []
+    try:
+        shards = list(os.scandir(root))
+    except FileNotFoundError:
+        return []
+    for shard in shards:
+        if not shard.is_dir():
+            continue
+        for entry in os.scandir(shard.path):
+            if not entry.name.endswith(".json"):
+                continue
+            try:
+                st = entry.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((st.st_mtime, entry.path, st.st_size))
+    return entries
@@ -7,11 +7,26 @@ and optionally gating CI/CD approvals based on the assessed risk level.
 import argparse
 import os
 import sys
+from typing import IO, TYPE_CHECKING, Any, Callable, Dict, NoReturn, Optional, Sequence, Tuple
 
-from terraguard.config import RISK_LEVEL_ORDER, get_settings
-from terraguard.outputs import format_summary_markdown, maybe_post_github_comment
-from terraguard.risk import assess_risk, load_risk_config
-from terraguard.terraform_plan import load_plan_json, summarize_changes
+from terraguard.config import (
+    DEFAULT_CACHE_MAX_MB,
+    GITHUB_REPORT_MODES,
+    RECORD_FORMATS,
+    RISK_LEVEL_ORDER,
+    STDIN,
+    Settings,
+    exit_for_level,
+    get_settings,
+    meets_threshold,
+)
+
+if TYPE_CHECKING:
+    from terraguard.cache import ResultCache
+    from terraguard.outputs.metrics import RunMetrics
+    from terraguard.outputs.records import RecordWriter
+    from terraguard.profiling import Profiler
+    from terraguard.terraform_plan.baseline import Baseline
 
 
 def parse_args() -> argparse.Namespace:
@@ -19,23 +34,79 @@ def parse_args() -> argparse.Namespace:
 
     Returns:
         An argparse.Namespace object containing the parsed arguments:
-        - plan_json: Path to Terraform plan JSON file
+        - plan_json: List of Terraform plan JSON paths (directories and glob
+          patterns are expanded in batch mode)
+        - batch: Flag to assess all given plans and report an aggregate verdict
+        - jobs: Optional number of worker processes for batch mode and
+          large plans
+        - cache_dir: Optional directory of the on-disk result cache
+        - cache_max_mb: Size limit of the result cache in MiB
+        - baseline: Optional baseline plan or digest to diff the plan(s) against
+        - write_digest: Optional path to write a digest of the plan(s) to
+        - fast_fail: Flag to stop reading a plan once the fail-on threshold
+          is certain to be reached
         - risk_config_path: Optional path to risk configuration JSON file
+        - risk_config_layer: Optional list of risk configuration files merged
+          over it, in order
         - fail_on: Optional risk level threshold for failing the build
         - no_github_comment: Flag to disable GitHub comment posting
+        - sticky_comment: Flag to update one comment per pull request
+        - comment_key: Optional key of the sticky comment
+        - github_report: Optional GitHub report mode (see GITHUB_REPORT_MODES)
+        - github_max_workers: Maximum concurrent GitHub API requests
+        - profile: Optional per-stage profile report format ("text" or "json")
+        - profile_dump: Optional path of a cProfile statistics dump
+        - history: Optional path of the run history database
+        - stack: Optional stack name recorded in the history
+        - commit: Optional commit recorded in the history
+        - metrics_file: Optional path of a Prometheus textfile of run metrics
+        - metrics_url: Optional URL to push run metrics to
     """
     parser = argparse.ArgumentParser(
         description="Assess risk level of a Terraform plan JSON and optionally gate approvals."
     )
     parser.add_argument(
         "plan_json",
-        help="Path to Terraform plan JSON (from `terraform show -json plan.out > plan.json`).",
+        nargs="+",
+        help=(
+            "Path to Terraform plan JSON (from `terraform show -json plan.out > plan.json`), "
+            "optionally gzip, xz or bzip2 compressed, or - for stdin. "
+            "In batch mode, any number of files, directories or glob patterns."
+        ),
+    )
+    parser.add_argument(
+        "--batch",
+        action="store_true",
+        help=(
+            "Assess every plan given (implied by more than one path) and report per-plan "
+            "results plus an aggregate verdict."
+        ),
+    )
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=None,
+        help=(
+            "Worker processes for batch mode, and to summarize a single large plan. "
+            "Default: number of available CPUs."
+        ),
     )
     parser.add_argument(
         "--risk-config-path",
         default=os.getenv("RISK_CONFIG_PATH"),
         help="Path to the risk configuration JSON file. Overrides RISK_CONFIG_PATH env var.",
     )
+    parser.add_argument(
+        "--risk-config-layer",
+        action="append",
+        metavar="PATH",
+        default=None,
+        help=(
+            "Risk configuration JSON file merged over the base one; repeat for several layers "
+            "(e.g. org, repo, stack), later ones taking precedence. Default: env "
+            f"RISK_CONFIG_LAYERS, paths separated by '{os.pathsep}'."
+        ),
+    )
     parser.add_argument(
         "--fail-on",
         choices=RISK_LEVEL_ORDER,
@@ -50,7 +121,170 @@ def parse_args() -> argparse.Namespace:
         action="store_true",
         help="Do not attempt to post a comment to GitHub, even if running in Actions.",
     )
-    return parser.parse_args()
+    parser.add_argument(
+        "--sticky-comment",
+        action="store_true",
+        help=(
+            "Update a single comment per pull request instead of posting a new one, and skip "
+            "the update when the summary is unchanged. Default: env TERRAGUARD_STICKY_COMMENT."
+        ),
+    )
+    parser.add_argument(
+        "--comment-key",
+        default=None,
+        help=(
+            "Key of the sticky comment, to keep one per stack on the same pull request. "
+            "Default: env TERRAGUARD_COMMENT_KEY or 'default'."
+        ),
+    )
+    parser.add_argument(
+        "--github-report",
+        choices=GITHUB_REPORT_MODES,
+        default=None,
+        help=(
+            "Report as a comment, as a Check Run on the pull request's head commit, or as "
+            "one sticky comment per plan of a batch run. "
+            "Default: env TERRAGUARD_GITHUB_REPORT or 'comment'."
+        ),
+    )
+    parser.add_argument(
+        "--github-max-workers",
+        type=int,
+        default=4,
+        help="Maximum concurrent GitHub API requests when posting per-plan comments. Default: 4.",
+    )
+    parser.add_argument(
+        "--cache-dir",
+        default=os.getenv("TERRAGUARD_CACHE_DIR"),
+        help=(
+            "Directory of an on-disk result cache keyed on plan and risk config content. "
+            "Overrides TERRAGUARD_CACHE_DIR env var. Default: no cache."
+        ),
+    )
+    parser.add_argument(
+        "--cache-max-mb",
+        type=float,
+        default=float(os.getenv("TERRAGUARD_CACHE_MAX_MB", DEFAULT_CACHE_MAX_MB)),
+        help=(
+            "Evict least recently used cache entries above this size. "
+            f"Default: {DEFAULT_CACHE_MAX_MB}."
+        ),
+    )
+    parser.add_argument(
+        "--baseline",
+        metavar="PATH",
+        default=None,
+        help=(
+            "Baseline plan JSON or digest (see --write-digest) of the last reviewed run. "
+            "Only new and escalated changes are scored; the others are listed as reviewed."
+        ),
+    )
+    parser.add_argument(
+        "--write-digest",
+        metavar="PATH",
+        default=None,
+        help="Write a compact digest of the plan(s) to PATH, to be used as a later --baseline.",
+    )
+    parser.add_argument(
+        "--fast-fail",
+        action="store_true",
+        help=(
+            "Stop reading a plan as soon as its risk level is certain to reach the fail-on "
+            "threshold. The summary then covers the changes read so far and is marked partial."
+        ),
+    )
+    parser.add_argument(
+        "--details-file",
+        metavar="PATH",
+        default=None,
+        help=(
+            "Write the full summary, with every detail row, to PATH. The printed and posted "
+            "summary is kept within GitHub's comment size limit, and points to PATH for the "
+            "rows left out."
+        ),
+    )
+    parser.add_argument(
+        "--output",
+        choices=RECORD_FORMATS,
+        default=None,
+        help=(
+            "Also write machine-readable records: JSON Lines (one record per changed resource "
+            "and one summary per plan) or SARIF (one result per MEDIUM or riskier change)."
+        ),
+    )
+    parser.add_argument(
+        "--output-file",
+        metavar="PATH",
+        default="-",
+        help="File to write the --output records to. Default: stdout, instead of the summary.",
+    )
+    parser.add_argument(
+        "--profile",
+        nargs="?",
+        const="text",
+        choices=("text", "json"),
+        default=None,
+        help=(
+            "Print the wall time, CPU time and peak allocation of each stage to stderr, "
+            "as a table (default) or JSON."
+        ),
+    )
+    parser.add_argument(
+        "--profile-dump",
+        metavar="PATH",
+        default=None,
+        help="Write cProfile statistics of the run to PATH (implies --profile).",
+    )
+    parser.add_argument(
+        "--history",
+        metavar="PATH",
+        default=os.getenv("TERRAGUARD_HISTORY"),
+        help=(
+            "Append the result, per-type change counts and stage timings of each plan to the "
+            "SQLite run history at PATH, queried with `tguard history`. "
+            "Default: env TERRAGUARD_HISTORY, or no history."
+        ),
+    )
+    parser.add_argument(
+        "--stack",
+        metavar="NAME",
+        default=os.getenv("TERRAGUARD_STACK"),
+        help="Stack name recorded in the history. Default: env TERRAGUARD_STACK, or the plan path.",
+    )
+    parser.add_argument(
+        "--commit",
+        metavar="SHA",
+        default=os.getenv("GITHUB_SHA"),
+        help="Commit recorded in the history. Default: env GITHUB_SHA.",
+    )
+    parser.add_argument(
+        "--metrics-file",
+        metavar="PATH",
+        default=os.getenv("TERRAGUARD_METRICS_FILE"),
+        help=(
+            "Add the run's metrics to the Prometheus textfile at PATH, for node_exporter's "
+            "textfile collector. Default: env TERRAGUARD_METRICS_FILE, or none."
+        ),
+    )
+    parser.add_argument(
+        "--metrics-url",
+        metavar="URL",
+        default=os.getenv("TERRAGUARD_METRICS_URL"),
+        help=(
+            "POST the run's metrics in the OpenMetrics text format to URL. "
+            "Default: env TERRAGUARD_METRICS_URL, or none."
+        ),
+    )
+    args = parser.parse_args()
+    if args.fast_fail and args.write_digest:
+        parser.error(
+            "--fast-fail cannot be combined with --write-digest: a digest covers whole plans"
+        )
+    if args.profile_dump and not args.profile:
+        args.profile = "text"
+    if len(args.plan_json) > 1:
+        args.batch = True
+    return args
 
 
 def main() -> None:
@@ -62,50 +296,409 @@ def main() -> None:
 
     Exits with code 1 if risk level meets or exceeds the fail-on threshold,
     otherwise exits with code 0.
+
+    ``tguard history ...`` queries the run history instead (see
+    ``terraguard.history``).
     """
+    if sys.argv[1:2] == ["history"]:
+        # Imported here: sqlite3 is only needed with a history database.
+        from terraguard.history import main as history_main
+
+        history_main(sys.argv[2:])
+        return
     args = parse_args()
+    # Imported here, like the rest of the assessment machinery, so that
+    # starting the CLI (--help, argument errors) stays fast.
+    from terraguard.profiling import Profiler
+
+    metrics = None
+    if args.metrics_file or args.metrics_url:
+        # Imported here: metrics are only collected when they are exported.
+        from terraguard.outputs.metrics import RunMetrics, activate
+
+        metrics = RunMetrics()
+        activate(metrics)
+    # The history and the metrics record stage times; memory is only traced for --profile
+    profiler = Profiler(
+        enabled=args.profile is not None or bool(args.history) or metrics is not None,
+        dump_path=args.profile_dump,
+        trace_memory=args.profile is not None,
+    )
+    profiler.start()
+    try:
+        run(args, profiler)
+    finally:
+        profiler.stop()
+        if args.profile is not None:
+            print(profiler.format_report(args.profile), file=sys.stderr)
+        if metrics is not None:
+            export_metrics(args, metrics, profiler)
+
+
+def run(args: argparse.Namespace, profiler: "Profiler") -> NoReturn:
+    """Assess the plan(s) given on the command line and exit with the verdict.
+
+    Each stage of the run is recorded by ``profiler``.
+    """
+    # Imported here: the plan reader, risk matcher and scoring rules are
+    # loaded once a plan is to be assessed, not to start the CLI.
+    from terraguard.batch import assess_plan_file, available_cpus
+    from terraguard.cache import ResultCache
+    from terraguard.risk.layers import RiskConfigError, load_layered_config
+    from terraguard.terraform_plan.baseline import load_baseline
+
+    stage = profiler.stage
     DEFAULT_RISK_CONFIG_PATH = os.path.join(os.path.dirname(__file__), "risk", "risk_config.json")
     risk_config_path = args.risk_config_path or DEFAULT_RISK_CONFIG_PATH
     settings = get_settings(
         arg_fail_on=args.fail_on,
         arg_no_github_comment=args.no_github_comment,
+        arg_sticky_comment=args.sticky_comment,
+        arg_comment_key=args.comment_key,
+        arg_github_report=args.github_report,
     )
 
-    try:
-        plan = load_plan_json(args.plan_json)
-    except Exception as e:
-        print(f"ERROR: Failed to load plan JSON from {args.plan_json}: {e}", file=sys.stderr)
-        sys.exit(1)
+    stop_at = settings.fail_on_risk_level if args.fast_fail else None
+
+    layers = args.risk_config_layer
+    if layers is None:
+        layers = [path for path in os.getenv("RISK_CONFIG_LAYERS", "").split(os.pathsep) if path]
 
-    risk_config = load_risk_config(risk_config_path)
+    with stage("load_config"):
+        try:
+            risk_config = load_layered_config([risk_config_path, *layers], args.cache_dir)
+        except RiskConfigError as e:
+            print(f"ERROR: {e}", file=sys.stderr)
+            sys.exit(1)
+    cache = None
+    if args.cache_dir:
+        cache = ResultCache(args.cache_dir, max_bytes=int(args.cache_max_mb * 1024 * 1024))
+    baseline = None
+    if args.baseline:
+        with stage("load_baseline"):
+            try:
+                baseline = load_baseline(args.baseline, risk_config)
+            except (OSError, ValueError) as e:
+                print(f"ERROR: Failed to load baseline {args.baseline}: {e}", file=sys.stderr)
+                sys.exit(1)
+
+    if args.batch:
+        run_batch(args, settings, risk_config, cache, profiler, baseline, stop_at)
+
+    plan_path = args.plan_json[0]
+    result = assess_plan_file(
+        plan_path,
+        risk_config,
+        cache,
+        profiler,
+        baseline=baseline,
+        record_digest=bool(args.write_digest),
+        stop_at=stop_at,
+        record_changes=bool(args.output),
+        jobs=args.jobs or available_cpus(),
+    )
+    record_metrics(args, [result])
+    if "error" in result:
+        print(
+            f"ERROR: Failed to load plan JSON from {plan_path}: {result['error']}", file=sys.stderr
+        )
+        sys.exit(1)
+    if args.write_digest:
+        save_digest(args.write_digest, {plan_path: result.pop("digest")})
+    table = result.pop("changes", None)
+    if args.output:
+        with stage("records"):
+            writer = open_records(args.output, args.output_file)
+            writer.write_result(result, table)
+            close_records(writer)
+        del table
 
-    stats = summarize_changes(plan, risk_config)
-    result = assess_risk(stats)
-    summary_md = format_summary_markdown(result)
+    print_summary = not (args.output and args.output_file == "-")
+    with stage("format"):
+        # The formatter is only compiled once there is a result to format
+        from terraguard.outputs.formatter import (
+            MARKDOWN_BUDGET,
+            format_summary_markdown,
+            write_summary_markdown,
+        )
 
-    # Always print markdown summary to stdout so logs show it.
-    print(summary_md)
+        if args.details_file:
+            save_details(args.details_file, lambda out: write_summary_markdown(result, out))
+        summary_md = ""
+        if settings.post_github_comment:
+            summary_md = format_summary_markdown(result, details_path=args.details_file)
+        # Print the markdown summary to stdout so logs show it, unless the
+        # records are written there.
+        if print_summary and summary_md:
+            print(summary_md)
+        elif print_summary:
+            write_summary_markdown(
+                result, sys.stdout, MARKDOWN_BUDGET, details_path=args.details_file
+            )
+            print()
 
     # Optionally post to GitHub
-    maybe_post_github_comment(summary_md)
+    with stage("github"):
+        post_github_comment(
+            summary_md,
+            settings,
+            args.cache_dir,
+            failed=meets_threshold(result["level"], settings),
+            max_workers=args.github_max_workers,
+        )
+
+    if args.history:
+        timings = profiler.timings()
+        with stage("history"):
+            save_history(args, [result], timings)
+    exit_for_level(result["level"], settings)
+
 
-    # Decide exit code based on risk vs threshold
-    current_level = result["level"]
-    fail_on = settings.fail_on_risk_level
+def run_batch(
+    args: argparse.Namespace,
+    settings: Settings,
+    risk_config: Dict[str, Any],
+    cache: Optional["ResultCache"],
+    profiler: "Profiler",
+    baseline: Optional["Baseline"] = None,
+    stop_at: Optional[str] = None,
+) -> NoReturn:
+    """Assess many plans with one risk configuration and exit with the overall verdict.
 
-    if RISK_LEVEL_ORDER.index(current_level) >= RISK_LEVEL_ORDER.index(fail_on):
+    Plans are loaded and summarized on a process pool. A single combined
+    summary is printed and optionally posted to GitHub, as one comment or
+    Check Run, or as one comment per plan.
+
+    Exits with code 1 if any plan could not be read or if the highest risk
+    level meets or exceeds the fail-on threshold, otherwise exits with code 0.
+    """
+    # Imported here, like in run
+    from terraguard.batch import aggregate_results, collect_plan_paths, iter_assess_plans
+
+    stage = profiler.stage
+    with stage("collect_paths"):
+        paths = collect_plan_paths(args.plan_json)
+    if not paths:
+        print(f"ERROR: No plan JSON files found in {' '.join(args.plan_json)}", file=sys.stderr)
+        sys.exit(1)
+    if STDIN in paths:
+        print("ERROR: A plan can only be read from stdin (-) on its own.", file=sys.stderr)
+        sys.exit(1)
+
+    records = open_records(args.output, args.output_file) if args.output else None
+    with stage("assess_plans"):
+        results = []
+        # The records of each plan are written as soon as it is assessed
+        for result in iter_assess_plans(
+            paths,
+            risk_config,
+            jobs=args.jobs,
+            cache=cache,
+            baseline=baseline,
+            record_digest=bool(args.write_digest),
+            stop_at=stop_at,
+            record_changes=records is not None,
+        ):
+            table = result.pop("changes", None)
+            if records is not None:
+                records.write_result(result, table)
+            results.append(result)
+    if args.write_digest:
+        save_digest(
+            args.write_digest,
+            {result["path"]: result.pop("digest") for result in results if "digest" in result},
+        )
+    record_metrics(args, results)
+    with stage("aggregate"):
+        aggregate = aggregate_results(results)
+    if records is not None:
+        close_records(records, aggregate)
+    details_path = args.details_file
+    print_summary = not (args.output and args.output_file == "-")
+    with stage("format"):
+        from terraguard.outputs.formatter import (
+            MARKDOWN_BUDGET,
+            format_batch_summary_markdown,
+            format_plan_summary_markdown,
+            write_batch_summary_markdown,
+        )
+
+        if details_path:
+            save_details(
+                details_path, lambda out: write_batch_summary_markdown(results, aggregate, out)
+            )
+        summary_md = ""
+        if settings.post_github_comment:
+            summary_md = format_batch_summary_markdown(
+                results, aggregate, details_path=details_path
+            )
+        if print_summary and summary_md:
+            print(summary_md)
+        elif print_summary:
+            write_batch_summary_markdown(
+                results, aggregate, sys.stdout, MARKDOWN_BUDGET, details_path=details_path
+            )
+            print()
+    with stage("github"):
+        plan_summaries = None
+        if settings.github_report == "plan-comments" and settings.post_github_comment:
+            plan_summaries = [
+                (result["path"], format_plan_summary_markdown(result, details_path=details_path))
+                for result in results
+            ]
+        post_github_comment(
+            summary_md,
+            settings,
+            args.cache_dir,
+            failed=bool(aggregate["errors"]) or meets_threshold(aggregate["level"], settings),
+            plan_summaries=plan_summaries,
+            max_workers=args.github_max_workers,
+        )
+
+    if args.history:
+        with stage("history"):
+            save_history(args, results)
+    if aggregate["errors"]:
         print(
-            f"\nRisk level `{current_level}` is >= fail-on threshold `{fail_on}`. "
-            f"Failing for manual review.",
+            f"\n{aggregate['errors']} plan(s) could not be read. Failing for manual review.",
             file=sys.stderr,
         )
         sys.exit(1)
+    exit_for_level(aggregate["level"], settings)
+
+
+def save_digest(path: str, plans: Dict[str, Dict[str, int]]) -> None:
+    """Write a digest of the assessed plans, exiting with code 1 if it cannot be written."""
+    from terraguard.terraform_plan.baseline import write_digest
+
+    try:
+        write_digest(path, plans)
+    except OSError as e:
+        print(f"ERROR: Failed to write digest {path}: {e}", file=sys.stderr)
+        sys.exit(1)
+
+
+def save_history(
+    args: argparse.Namespace,
+    results: Sequence[Dict[str, Any]],
+    timings: Optional[Dict[str, float]] = None,
+) -> None:
+    """Append the results to the run history.
+
+    A history that cannot be written is reported, but does not fail the run.
+    Plans that could not be read are not recorded. ``timings`` are the stage
+    timings of a single plan's run; those of a batch are not split per plan.
+    """
+    # Imported here: sqlite3 is only needed with a history database.
+    from terraguard.history import HistoryStore, result_run
+
+    runs = [
+        result_run(result, args.stack, args.commit, timings)
+        for result in results
+        if "error" not in result
+    ]
+    try:
+        with HistoryStore(args.history) as store:
+            store.record(runs)
+    except OSError as e:
+        print(f"WARNING: Failed to record the run history: {e}", file=sys.stderr)
+
+
+def record_metrics(args: argparse.Namespace, results: Sequence[Dict[str, Any]]) -> None:
+    """Add the assessed plans to the run metrics, if they are exported."""
+    if not (args.metrics_file or args.metrics_url):
+        return
+    # Imported here, like in main, only when the metrics are exported
+    from terraguard.outputs.metrics import observe_results
+
+    observe_results(results)
+
+
+def export_metrics(args: argparse.Namespace, metrics: "RunMetrics", profiler: "Profiler") -> None:
+    """Add the run's timings to its metrics, then write and push them.
+
+    Metrics that cannot be written or pushed are reported, but do not fail
+    the run.
+    """
+    # Imported here, like in main, only when the metrics are exported
+    from terraguard.outputs.metrics import push, write_textfile
+    from terraguard.risk.risk import patterns_evaluated
+
+    metrics.observe_run(profiler.timings(), patterns_evaluated())
+    if args.metrics_file:
+        try:
+            write_textfile(metrics, args.metrics_file)
+        except OSError as e:
+            print(
+                f"WARNING: Failed to write metrics file {args.metrics_file}: {e}", file=sys.stderr
+            )
+    if args.metrics_url:
+        try:
+            push(metrics, args.metrics_url)
+        except (OSError, ValueError) as e:
+            print(f"WARNING: Failed to push metrics to {args.metrics_url}: {e}", file=sys.stderr)
+
+
+def open_records(output_format: str, path: str) -> "RecordWriter":
+    """Open the record writer of ``--output``, exiting with code 1 if the file cannot be opened."""
+    # Imported here, like the formatter, once records are to be written
+    from terraguard.outputs.records import record_writer
+
+    try:
+        out = sys.stdout if path == "-" else open(path, "w", encoding="utf-8")
+    except OSError as e:
+        print(f"ERROR: Failed to open output file {path}: {e}", file=sys.stderr)
+        sys.exit(1)
+    return record_writer(output_format, out)
+
+
+def close_records(writer: "RecordWriter", aggregate: Optional[Dict[str, Any]] = None) -> None:
+    """Finish the records and close their file."""
+    writer.close(aggregate)
+    if writer.out is not sys.stdout:
+        writer.out.close()
+
+
+def save_details(path: str, write: Callable[[IO[str]], None]) -> None:
+    """Write the unbounded summary to a file, exiting with code 1 if it cannot be written."""
+    try:
+        with open(path, "w", encoding="utf-8") as out:
+            write(out)
+            out.write("\n")
+    except OSError as e:
+        print(f"ERROR: Failed to write details file {path}: {e}", file=sys.stderr)
+        sys.exit(1)
+
+
+def post_github_comment(
+    summary_md: str,
+    settings: Settings,
+    cache_dir: Optional[str] = None,
+    failed: bool = False,
+    plan_summaries: Optional[Sequence[Tuple[str, str]]] = None,
+    max_workers: int = 4,
+) -> None:
+    """Report the summary to GitHub unless disabled by ``--no-github-comment``.
+
+    The GitHub backend (and with it ``requests``) is only imported when a
+    comment may actually be posted. ``cache_dir`` also holds the sticky
+    comment ID cache. ``failed`` is the Check Run conclusion, and
+    ``plan_summaries`` the (path, summary) of each plan for per-plan comments.
+    """
+    if not settings.post_github_comment:
+        return
+    from terraguard.outputs.github import maybe_post_github_report
 
-    print(
-        f"\nRisk level `{current_level}` is below fail-on threshold `{fail_on}`. " f"Continuing.",
-        file=sys.stderr,
+    maybe_post_github_report(
+        summary_md,
+        mode=settings.github_report,
+        failed=failed,
+        plan_summaries=plan_summaries,
+        sticky=settings.sticky_comment,
+        key=settings.comment_key,
+        cache_dir=cache_dir,
+        max_workers=max_workers,
     )
-    sys.exit(0)
 
 
 if __name__ == "__main__":
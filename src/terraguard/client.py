@@ -0,0 +1,291 @@
+"""Thin client for a running assessment server.
+
+``tguard-client`` accepts the same arguments as ``tguard`` plus ``--server``.
+For a single plan it asks the server (see ``terraguard.server``) for the
+assessment, which skips the package imports, the risk config loading and the
+pattern compilation a fresh ``tguard`` process pays for. If no server is
+configured or it cannot be reached, or if the arguments need features only
+the full CLI offers (batch mode, caching, profiling, ...), the run falls back
+to in-process evaluation with ``terraguard.cli``.
+
+This module only imports the standard library and ``terraguard.config`` so
+that the client starts quickly.
+"""
+
+import argparse
+import json
+import os
+import socket
+import sys
+from typing import IO, Any, Dict, List, NoReturn, Optional, Sequence, Tuple, Union, cast
+from urllib.parse import urlencode
+
+from terraguard.config import (
+    RISK_LEVEL_ORDER,
+    STDIN,
+    exit_for_level,
+    get_settings,
+    meets_threshold,
+)
+
+DEFAULT_ADDRESS = "127.0.0.1:8765"
+DEFAULT_TIMEOUT = 300.0
+
+# How long to wait for a connection before falling back to in-process evaluation.
+CONNECT_TIMEOUT = 1.0
+
+_BODY_CHUNK_SIZE = 1 << 20
+
+Address = Union[str, Tuple[str, int]]
+
+
+class ServerUnavailable(OSError):
+    """Raised when the assessment server cannot be reached or fails internally.
+
+    ``plan_read`` is set when part of the plan file object given to
+    ``assess_remote`` was already sent, so that it cannot be read again.
+    """
+
+    plan_read = False
+
+
+class AssessmentError(ValueError):
+    """Raised when the server rejects a request, e.g. because the plan is invalid."""
+
+
+def parse_address(address: str) -> Address:
+    """Parse a server address.
+
+    Args:
+        address: ``unix:/path/to.sock`` or a path containing "/" for a Unix
+            socket, or ``host:port``, ``:port`` or ``port`` for TCP.
+
+    Returns:
+        The socket path for a Unix socket, or a (host, port) tuple.
+
+    Raises:
+        ValueError: If the address cannot be parsed.
+    """
+    if address.startswith("unix:"):
+        return address[len("unix:") :]
+    if "/" in address:
+        return address
+    host, _, port = address.rpartition(":")
+    try:
+        return (host or "127.0.0.1", int(port))
+    except ValueError:
+        raise ValueError(f"Invalid server address '{address}'.") from None
+
+
+def _connect(address: str, timeout: float) -> socket.socket:
+    """Open a connection to the server, raising ServerUnavailable if it is not listening."""
+    target = parse_address(address)
+    try:
+        if isinstance(target, str):
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            sock.settimeout(CONNECT_TIMEOUT)
+            try:
+                sock.connect(target)
+            except OSError:
+                sock.close()
+                raise
+        else:
+            sock = socket.create_connection(target, timeout=CONNECT_TIMEOUT)
+    except OSError as e:
+        raise ServerUnavailable(f"Assessment server at {address} is not available: {e}") from e
+    sock.settimeout(timeout)
+    return sock
+
+
+def _read_response(sock: socket.socket) -> Tuple[int, bytes]:
+    """Read an HTTP response up to the server closing the connection."""
+    chunks = []
+    for chunk in iter(lambda: sock.recv(_BODY_CHUNK_SIZE), b""):
+        chunks.append(chunk)
+    head, _, body = b"".join(chunks).partition(b"\r\n\r\n")
+    status_line = head.split(b"\r\n", 1)[0].split()
+    if len(status_line) < 2 or not status_line[1].isdigit():
+        raise ValueError("Malformed HTTP response")
+    return int(status_line[1]), body
+
+
+def assess_remote(
+    address: str,
+    plan_path: Optional[str] = None,
+    plan_file: Optional[IO[bytes]] = None,
+    risk_config_path: Optional[str] = None,
+    timeout: float = DEFAULT_TIMEOUT,
+    risk_config_layers: Sequence[str] = (),
+) -> Dict[str, Any]:
+    """Assess a plan on a running assessment server.
+
+    Exactly one of ``plan_path`` and ``plan_file`` must be given. A path is
+    read by the server itself, so it must be valid on the server's host; a
+    file object, such as standard input, is streamed to the server as the
+    request body, compressed or not.
+
+    The HTTP exchange is written by hand on a plain socket: ``http.client``
+    alone would take longer to import than the rest of the client.
+
+    Args:
+        address: Server address (see ``parse_address``).
+        plan_path: Path to the Terraform plan JSON file.
+        plan_file: Binary file object holding the plan JSON.
+        risk_config_path: Optional risk configuration path on the server's
+            host. Defaults to the server's built-in configuration.
+        timeout: Seconds to wait for the assessment.
+        risk_config_layers: Optional paths of risk configuration layers on
+            the server's host, merged over the base configuration in order.
+
+    Returns:
+        A dictionary with "result" (the ``assess_risk`` result dictionary) and
+        "summary_markdown" (the formatted summary), as decoded from JSON: the
+        detail tuples of the result's stats arrive as lists (see
+        ``terraguard.cache.restore_tuples``).
+
+    Raises:
+        ServerUnavailable: If the server cannot be reached or fails internally.
+        AssessmentError: If the server cannot assess the plan.
+    """
+    if (plan_path is None) == (plan_file is None):
+        raise ValueError("Exactly one of plan_path and plan_file must be given.")
+    query: Dict[str, Any] = {"risk_config_path": risk_config_path} if risk_config_path else {}
+    if risk_config_layers:
+        query["risk_config_layer"] = list(risk_config_layers)
+
+    sock = _connect(address, timeout)
+    try:
+        if plan_path is not None:
+            request = {
+                "plan_path": os.path.abspath(plan_path),
+                "risk_config_path": risk_config_path,
+                "risk_config_layers": list(risk_config_layers),
+            }
+            body = json.dumps(request).encode()
+            sock.sendall(
+                b"POST /assess HTTP/1.1\r\nHost: localhost\r\nConnection: close\r\n"
+                b"Content-Type: application/json\r\nContent-Length: %d\r\n\r\n%s"
+                % (len(body), body)
+            )
+        else:
+            target = "/assess/body" + (f"?{urlencode(query, doseq=True)}" if query else "")
+            sock.sendall(
+                b"POST %s HTTP/1.1\r\nHost: localhost\r\nConnection: close\r\n"
+                b"Content-Type: application/json\r\nTransfer-Encoding: chunked\r\n\r\n"
+                % target.encode()
+            )
+            for chunk in iter(lambda: cast(IO[bytes], plan_file).read(_BODY_CHUNK_SIZE), b""):
+                sock.sendall(b"%x\r\n%s\r\n" % (len(chunk), chunk))
+            sock.sendall(b"0\r\n\r\n")
+        status, data = _read_response(sock)
+        payload = json.loads(data or b"{}")
+    except (OSError, ValueError) as e:
+        error = ServerUnavailable(f"Assessment server at {address} failed: {e}")
+        error.plan_read = plan_file is not None
+        raise error from e
+    finally:
+        sock.close()
+
+    if status >= 500:
+        error = ServerUnavailable(f"Assessment server error: {payload.get('error', status)}")
+        error.plan_read = plan_file is not None
+        raise error
+    if status >= 300:
+        raise AssessmentError(payload.get("error", f"HTTP {status}"))
+    return cast(Dict[str, Any], payload)
+
+
+class _FastPathParser(argparse.ArgumentParser):
+    """Argument parser raising instead of exiting, so that the full CLI reports errors."""
+
+    def error(self, message: str) -> NoReturn:
+        raise ValueError(message)
+
+
+def _parse_fast_path_args(argv: List[str]) -> Optional[argparse.Namespace]:
+    """Parse the arguments the remote fast path supports, or return None if others are given."""
+    if argv[:1] == ["history"] or any(
+        os.getenv(name)
+        for name in ("TERRAGUARD_HISTORY", "TERRAGUARD_METRICS_FILE", "TERRAGUARD_METRICS_URL")
+    ):
+        # History queries, and runs to be recorded or measured, are for the full CLI
+        return None
+    parser = _FastPathParser(add_help=False)
+    parser.add_argument("plan_json", nargs="+")
+    parser.add_argument("--risk-config-path", default=os.getenv("RISK_CONFIG_PATH"))
+    parser.add_argument("--risk-config-layer", action="append", default=None)
+    parser.add_argument("--fail-on", choices=RISK_LEVEL_ORDER, default=None)
+    parser.add_argument("--no-github-comment", action="store_true")
+    try:
+        args, unknown = parser.parse_known_args(argv)
+    except ValueError:
+        return None
+    if unknown or len(args.plan_json) != 1:
+        return None
+    if args.risk_config_layer is None:
+        args.risk_config_layer = [
+            path for path in os.getenv("RISK_CONFIG_LAYERS", "").split(os.pathsep) if path
+        ]
+    return args
+
+
+def main() -> None:
+    """Entry point of ``tguard-client``.
+
+    Exits with the same codes as ``tguard``.
+    """
+    parser = argparse.ArgumentParser(add_help=False)
+    parser.add_argument("--server", default=os.getenv("TERRAGUARD_SERVER"))
+    known, rest = parser.parse_known_args(sys.argv[1:])
+    args = _parse_fast_path_args(rest) if known.server else None
+
+    if args is not None:
+        plan_path = args.plan_json[0]
+        # A plan piped on stdin is sent as the request body: the server cannot read it
+        plan_file = sys.stdin.buffer if plan_path == STDIN else None
+        try:
+            response = assess_remote(
+                known.server,
+                plan_path=None if plan_file is not None else plan_path,
+                plan_file=plan_file,
+                risk_config_path=(
+                    os.path.abspath(args.risk_config_path) if args.risk_config_path else None
+                ),
+                risk_config_layers=[os.path.abspath(path) for path in args.risk_config_layer],
+            )
+        except AssessmentError as e:
+            print(f"ERROR: Failed to load plan JSON from {plan_path}: {e}", file=sys.stderr)
+            sys.exit(1)
+        except ServerUnavailable as e:
+            if e.plan_read:
+                # The plan read from stdin is gone: it cannot be assessed in-process
+                print(f"ERROR: {e}", file=sys.stderr)
+                sys.exit(1)
+            print(f"WARNING: {e}. Assessing in-process.", file=sys.stderr)
+        else:
+            settings = get_settings(
+                arg_fail_on=args.fail_on, arg_no_github_comment=args.no_github_comment
+            )
+            summary_md = response["summary_markdown"]
+            level = response["result"]["level"]
+            print(summary_md)
+            if settings.post_github_comment:
+                from terraguard.outputs.github import maybe_post_github_report
+
+                maybe_post_github_report(
+                    summary_md,
+                    mode=settings.github_report,
+                    failed=meets_threshold(level, settings),
+                    sticky=settings.sticky_comment,
+                    key=settings.comment_key,
+                )
+            exit_for_level(level, settings)
+
+    from terraguard.cli import main as cli_main
+
+    sys.argv[1:] = rest
+    cli_main()
+
+
+if __name__ == "__main__":
+    main()
@@ -5,12 +5,33 @@ derive runtime settings from command-line arguments and environment variables.
 """
 
 import os
+import sys
 from dataclasses import dataclass
-from typing import Optional, Tuple
+from typing import NoReturn, Optional, Tuple
 
 # Single source of truth for risk levels
 RISK_LEVEL_ORDER: Tuple[str, ...] = ("LOW", "MEDIUM", "HIGH")
 
+# Score of each level of RISK_LEVEL_ORDER.
+LEVEL_SCORES: Tuple[int, ...] = (10, 50, 90)
+
+# Levels a resource type can be mapped to. CRITICAL only exists at resource
+# level and is folded into HIGH by the overall assessment.
+RESOURCE_RISK_LEVEL_ORDER: Tuple[str, ...] = RISK_LEVEL_ORDER + ("CRITICAL",)
+
+# Ways of reporting to a pull request: one comment, a Check Run on the head
+# commit, or one comment per plan of a batch run.
+GITHUB_REPORT_MODES: Tuple[str, ...] = ("comment", "check-run", "plan-comments")
+
+# Machine-readable record formats: JSON Lines and SARIF.
+RECORD_FORMATS: Tuple[str, ...] = ("jsonl", "sarif")
+
+# Default size limit of the result cache, in MiB.
+DEFAULT_CACHE_MAX_MB = 256
+
+# Plan path reading the plan from stdin.
+STDIN = "-"
+
 
 @dataclass(frozen=True)
 class Settings:
@@ -22,22 +43,44 @@ class Settings:
     # Whether the script should attempt to post a comment to GitHub.
     post_github_comment: bool
 
+    # Whether to update a single comment per pull request instead of posting
+    # a new one every run.
+    sticky_comment: bool = False
+
+    # Distinguishes several sticky comments on one pull request.
+    comment_key: str = "default"
+
+    # How to report to the pull request (one of GITHUB_REPORT_MODES).
+    github_report: str = "comment"
+
 
 def get_settings(
     arg_fail_on: Optional[str],
     arg_no_github_comment: bool,
+    arg_sticky_comment: bool = False,
+    arg_comment_key: Optional[str] = None,
+    arg_github_report: Optional[str] = None,
 ) -> Settings:
     """Derive runtime settings from CLI arguments and environment variables.
 
     Args:
         arg_fail_on: Risk level threshold from CLI argument, or None.
         arg_no_github_comment: Flag indicating GitHub comments should be disabled.
+        arg_sticky_comment: Flag enabling the sticky comment. Also enabled by
+            a TERRAGUARD_STICKY_COMMENT environment variable set to "1",
+            "true" or "yes".
+        arg_comment_key: Sticky comment key from CLI argument, or None to use
+            TERRAGUARD_COMMENT_KEY or "default".
+        arg_github_report: Report mode from CLI argument, or None to use
+            TERRAGUARD_GITHUB_REPORT or "comment".
 
     Returns:
-        A Settings object with fail_on_risk_level and post_github_comment values.
+        A Settings object with fail_on_risk_level, post_github_comment,
+        sticky_comment, comment_key and github_report values.
 
     Raises:
-        ValueError: If an invalid risk level is provided (not in RISK_LEVEL_ORDER).
+        ValueError: If an invalid risk level is provided (not in RISK_LEVEL_ORDER),
+            or an invalid report mode (not in GITHUB_REPORT_MODES).
 
     Note:
         The fail_on_risk_level is determined in priority order:
@@ -58,8 +101,44 @@ def get_settings(
     final_fail_on = fail_on if fail_on is not None else "HIGH"
 
     post_github_comment = not arg_no_github_comment
+    env_sticky = os.getenv("TERRAGUARD_STICKY_COMMENT", "").lower() in ("1", "true", "yes")
+
+    github_report = arg_github_report or os.getenv("TERRAGUARD_GITHUB_REPORT") or "comment"
+    if github_report not in GITHUB_REPORT_MODES:
+        raise ValueError(
+            f"Invalid GitHub report mode '{github_report}'. Must be one of {GITHUB_REPORT_MODES}."
+        )
 
     return Settings(
         fail_on_risk_level=final_fail_on,
         post_github_comment=post_github_comment,
+        sticky_comment=arg_sticky_comment or env_sticky,
+        comment_key=arg_comment_key or os.getenv("TERRAGUARD_COMMENT_KEY") or "default",
+        github_report=github_report,
+    )
+
+
+def meets_threshold(current_level: str, settings: Settings) -> bool:
+    """Return whether ``current_level`` is at or above the fail-on threshold."""
+    return RISK_LEVEL_ORDER.index(current_level) >= RISK_LEVEL_ORDER.index(
+        settings.fail_on_risk_level
+    )
+
+
+def exit_for_level(current_level: str, settings: Settings) -> NoReturn:
+    """Exit with code 1 if ``current_level`` meets the fail-on threshold, else 0."""
+    fail_on = settings.fail_on_risk_level
+
+    if meets_threshold(current_level, settings):
+        print(
+            f"\nRisk level `{current_level}` is >= fail-on threshold `{fail_on}`. "
+            f"Failing for manual review.",
+            file=sys.stderr,
+        )
+        sys.exit(1)
+
+    print(
+        f"\nRisk level `{current_level}` is below fail-on threshold `{fail_on}`. " f"Continuing.",
+        file=sys.stderr,
     )
+    sys.exit(0)
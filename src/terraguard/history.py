@@ -0,0 +1,829 @@
+"""Run history: an append-only SQLite store of assessment results.
+
+Each ``tguard`` run is stateless. With ``--history PATH`` (or the
+TERRAGUARD_HISTORY environment variable), the result of every plan assessed
+is also appended to a SQLite database, so that questions spanning many runs
+("how often does this stack go HIGH?", "which resource types drive our HIGH
+verdicts?") can be answered without scraping CI logs::
+
+    runs         one row per assessed plan: time, stack, commit, plan path,
+                 level, score, the result as JSON (its summary record, see
+                 ``outputs.records``) and the stage timings of the run
+    type_counts  one row per resource type changed in a run: changes,
+                 deletes and HIGH or CRITICAL risk changes of the type
+    types        the resource type names, stored once
+    imports      one row per imported records file: its SHA-256 digest,
+                 path, import time and number of runs
+
+The per-type counts are derived from the result's ``provider_rollup``, so
+cached results are recorded like fresh ones. Runs are indexed on stack,
+commit, level and time, and type counts on type.
+
+Runs are never updated or deleted, so the aggregates ``tguard history``
+reports can be kept up to date as runs are recorded: the number of runs per
+stack and level, and the counts of each resource type per run level, both
+in total (``level_totals``, ``type_totals``) and per UTC day
+(``level_days``, ``type_days``). Aggregate queries read a few hundred rows
+of those tables instead of every run, and answer in milliseconds over
+hundreds of thousands of runs; only those restricted to one stack read its
+runs.
+
+Saved JSON Lines records (``--output jsonl``) can be imported in bulk, to
+backfill the store from past runs::
+
+    tguard history --db runs.sqlite import results/*.jsonl
+
+A file whose content was already imported is skipped, so that the same
+runs are not counted twice when a backfill is run again.
+
+The schema version is kept in the database's ``user_version``; a database
+written by a later terraguard is refused rather than misread.
+"""
+
+import argparse
+import hashlib
+import io
+import json
+import os
+import sqlite3
+import sys
+import time
+from dataclasses import dataclass, field
+from typing import IO, Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from terraguard.config import RISK_LEVEL_ORDER
+from terraguard.outputs.records import summary_record
+from terraguard.terraform_plan.tree import RiskTree
+
+# Bump when the schema changes.
+HISTORY_FORMAT = 2
+
+# How long a writer waits for another one to finish, in seconds.
+BUSY_TIMEOUT = 30.0
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    recorded_at REAL NOT NULL,
+    stack TEXT NOT NULL,
+    commit_sha TEXT,
+    plan TEXT NOT NULL,
+    level INTEGER NOT NULL,
+    score INTEGER NOT NULL,
+    result TEXT NOT NULL,
+    timings TEXT
+);
+CREATE INDEX IF NOT EXISTS runs_stack ON runs (stack, recorded_at, level);
+CREATE INDEX IF NOT EXISTS runs_commit ON runs (commit_sha);
+CREATE INDEX IF NOT EXISTS runs_level ON runs (level, recorded_at);
+CREATE INDEX IF NOT EXISTS runs_time ON runs (recorded_at);
+CREATE TABLE IF NOT EXISTS types (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE
+);
+CREATE TABLE IF NOT EXISTS type_counts (
+    run_id INTEGER NOT NULL,
+    type_id INTEGER NOT NULL,
+    changes INTEGER NOT NULL,
+    deletes INTEGER NOT NULL,
+    sensitive INTEGER NOT NULL,
+    PRIMARY KEY (run_id, type_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS type_counts_type ON type_counts (type_id, run_id);
+CREATE TABLE IF NOT EXISTS level_totals (
+    stack TEXT NOT NULL,
+    level INTEGER NOT NULL,
+    runs INTEGER NOT NULL,
+    PRIMARY KEY (stack, level)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS level_days (
+    day INTEGER NOT NULL,
+    stack TEXT NOT NULL,
+    level INTEGER NOT NULL,
+    runs INTEGER NOT NULL,
+    PRIMARY KEY (day, stack, level)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS type_totals (
+    level INTEGER NOT NULL,
+    type_id INTEGER NOT NULL,
+    runs INTEGER NOT NULL,
+    sensitive_runs INTEGER NOT NULL,
+    changes INTEGER NOT NULL,
+    deletes INTEGER NOT NULL,
+    sensitive INTEGER NOT NULL,
+    PRIMARY KEY (level, type_id)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS type_days (
+    level INTEGER NOT NULL,
+    day INTEGER NOT NULL,
+    type_id INTEGER NOT NULL,
+    runs INTEGER NOT NULL,
+    sensitive_runs INTEGER NOT NULL,
+    changes INTEGER NOT NULL,
+    deletes INTEGER NOT NULL,
+    sensitive INTEGER NOT NULL,
+    PRIMARY KEY (level, day, type_id)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS imports (
+    digest TEXT PRIMARY KEY,
+    path TEXT NOT NULL,
+    imported_at REAL NOT NULL,
+    runs INTEGER NOT NULL
+) WITHOUT ROWID;
+"""
+
+# (key columns, count columns) of each aggregate table. Counts are added by
+# inserting a row of zero counts if missing, then updating it: the UPSERT
+# clause needs SQLite 3.24.
+_AGGREGATES = {
+    "level_totals": (("stack", "level"), ("runs",)),
+    "level_days": (("day", "stack", "level"), ("runs",)),
+    "type_totals": (
+        ("level", "type_id"),
+        ("runs", "sensitive_runs", "changes", "deletes", "sensitive"),
+    ),
+    "type_days": (
+        ("level", "day", "type_id"),
+        ("runs", "sensitive_runs", "changes", "deletes", "sensitive"),
+    ),
+}
+
+_DAY = 86400
+
+_SENSITIVE_LEVELS = ("HIGH", "CRITICAL")
+
+# (resource type, changes, deletes, HIGH or CRITICAL risk changes)
+TypeCount = Tuple[str, int, int, int]
+# Counts added to a row of an aggregate table, by key.
+Aggregate = Dict[Tuple[Any, ...], List[int]]
+
+
+class HistoryError(OSError):
+    """Raised when the history database cannot be opened, read or written."""
+
+
+@dataclass
+class Run:
+    """One assessed plan, as recorded in the history."""
+
+    stack: str
+    plan: str
+    level: str
+    score: int
+    # Summary of the result: level, score, reasons and the summary statistics
+    result: Dict[str, Any]
+    type_counts: List[TypeCount] = field(default_factory=list)
+    commit: Optional[str] = None
+    timings: Optional[Dict[str, float]] = None
+    recorded_at: float = 0.0
+
+
+class HistoryStore:
+    """Append-only run history in a SQLite database."""
+
+    def __init__(self, path: str) -> None:
+        """Open a history database, creating it if needed.
+
+        Args:
+            path: Path of the database file.
+
+        Raises:
+            HistoryError: If the database cannot be opened, or was written
+                by a later version of terraguard.
+        """
+        self.path = path
+        try:
+            self._db = sqlite3.connect(path, timeout=BUSY_TIMEOUT, isolation_level=None)
+            try:
+                self._setup()
+            except BaseException:
+                self._db.close()
+                raise
+        except sqlite3.Error as e:
+            raise HistoryError(f"History database {path}: {e}") from None
+        self._type_ids: Dict[str, int] = {}
+
+    def _setup(self) -> None:
+        version = self._db.execute("PRAGMA user_version").fetchone()[0]
+        if version > HISTORY_FORMAT:
+            raise sqlite3.DatabaseError(
+                f"schema version {version} is newer than this terraguard's ({HISTORY_FORMAT})"
+            )
+        # Concurrent CI jobs may append to the same database
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        if version < HISTORY_FORMAT:
+            with self._db:
+                self._db.executescript(f"BEGIN IMMEDIATE;{_SCHEMA}")
+                self._db.execute(f"PRAGMA user_version={HISTORY_FORMAT}")
+
+    def close(self) -> None:
+        """Close the database."""
+        self._db.close()
+
+    def __enter__(self) -> "HistoryStore":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
+
+    def record(self, runs: Iterable[Run]) -> int:
+        """Append runs to the history, in one transaction.
+
+        Runs without a ``recorded_at`` time are recorded at the current time.
+
+        Returns:
+            The number of runs recorded.
+
+        Raises:
+            HistoryError: If the database cannot be written.
+        """
+        count = self._record(runs, None)
+        assert count is not None
+        return count
+
+    def record_import(self, runs: Iterable[Run], digest: str, path: str) -> Optional[int]:
+        """Append the runs read from a records file, unless the file was already imported.
+
+        The file is identified by the digest of its content, recorded in the
+        same transaction as its runs.
+
+        Args:
+            runs: Runs read from the file.
+            digest: SHA-256 hex digest of the file's content.
+            path: Path of the file, for reference.
+
+        Returns:
+            The number of runs recorded, or None if a file with the same
+            digest was already imported.
+
+        Raises:
+            HistoryError: If the database cannot be written.
+        """
+        return self._record(runs, (digest, path))
+
+    def _record(self, runs: Iterable[Run], source: Optional[Tuple[str, str]]) -> Optional[int]:
+        """Append runs, read from the file of (digest, path) ``source`` if given."""
+        now = time.time()
+        count = 0
+        aggregates: Dict[str, Aggregate] = {table: {} for table in _AGGREGATES}
+        try:
+            with self._db:
+                self._db.execute("BEGIN IMMEDIATE")
+                if (
+                    source is not None
+                    and self._db.execute(
+                        "SELECT 1 FROM imports WHERE digest = ?", source[:1]
+                    ).fetchone()
+                ):
+                    return None
+                for run in runs:
+                    recorded_at = run.recorded_at or now
+                    level = RISK_LEVEL_ORDER.index(run.level)
+                    cursor = self._db.execute(
+                        "INSERT INTO runs (recorded_at, stack, commit_sha, plan, level, score, "
+                        "result, timings) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                        (
+                            recorded_at,
+                            run.stack,
+                            run.commit,
+                            run.plan,
+                            level,
+                            run.score,
+                            json.dumps(run.result, separators=(",", ":")),
+                            _encode_timings(run.timings) if run.timings is not None else None,
+                        ),
+                    )
+                    run_id = cursor.lastrowid
+                    rows = [
+                        (run_id, self._type_id(rtype), changes, deletes, sensitive)
+                        for rtype, changes, deletes, sensitive in run.type_counts
+                    ]
+                    self._db.executemany("INSERT INTO type_counts VALUES (?, ?, ?, ?, ?)", rows)
+                    _aggregate(aggregates, run.stack, int(recorded_at // _DAY), level, rows)
+                    count += 1
+                for table, counts in aggregates.items():
+                    self._add(table, counts)
+                if source is not None:
+                    self._db.execute(
+                        "INSERT INTO imports VALUES (?, ?, ?, ?)", (*source, now, count)
+                    )
+        except BaseException as e:
+            # The types added by the transaction were rolled back with it
+            self._type_ids.clear()
+            if isinstance(e, sqlite3.Error):
+                raise HistoryError(f"Failed to record runs in {self.path}: {e}") from None
+            raise
+        return count
+
+    def _add(self, table: str, counts: Aggregate) -> None:
+        """Add counts to the rows of an aggregate table."""
+        keys, values = _AGGREGATES[table]
+        self._db.executemany(
+            f"INSERT OR IGNORE INTO {table} VALUES ({', '.join('?' * (len(keys) + len(values)))})",
+            [(*key, *[0] * len(values)) for key in counts],
+        )
+        self._db.executemany(
+            f"UPDATE {table} SET {', '.join(f'{v} = {v} + ?' for v in values)} "
+            f"WHERE {' AND '.join(f'{k} = ?' for k in keys)}",
+            [(*added, *key) for key, added in counts.items()],
+        )
+
+    def _type_id(self, name: str) -> int:
+        type_id = self._type_ids.get(name)
+        if type_id is None:
+            self._db.execute("INSERT OR IGNORE INTO types (name) VALUES (?)", (name,))
+            type_id = self._db.execute("SELECT id FROM types WHERE name = ?", (name,)).fetchone()[0]
+            self._type_ids[name] = type_id
+        return type_id
+
+    def level_counts(
+        self, stack: Optional[str] = None, since: Optional[float] = None
+    ) -> List[Dict[str, Any]]:
+        """Return the number of runs at each risk level, per stack.
+
+        Args:
+            stack: Only count the runs of this stack.
+            since: Only count the runs recorded since the start of the UTC
+                day of this time.
+
+        Returns:
+            One dictionary per stack, by stack name, with its "runs" and
+            the number of runs at each level of ``RISK_LEVEL_ORDER``.
+        """
+        params: List[Any] = []
+        if since is None:
+            sql = "SELECT stack, level, runs FROM level_totals"
+        else:
+            sql = "SELECT stack, level, SUM(runs) FROM level_days WHERE day >= ?"
+            params.append(int(since // _DAY))
+        if stack is not None:
+            sql += " WHERE stack = ?" if since is None else " AND stack = ?"
+            params.append(stack)
+        if since is not None:
+            sql += " GROUP BY stack, level"
+        rows = self._query(f"{sql} ORDER BY stack", params)
+        stacks: Dict[str, Dict[str, Any]] = {}
+        for name, level, count in rows:
+            entry = stacks.get(name)
+            if entry is None:
+                entry = stacks[name] = {"stack": name, "runs": 0}
+                entry.update(dict.fromkeys(RISK_LEVEL_ORDER, 0))
+            entry["runs"] += count
+            entry[RISK_LEVEL_ORDER[level]] += count
+        return list(stacks.values())
+
+    def top_types(
+        self,
+        level: str = "HIGH",
+        stack: Optional[str] = None,
+        since: Optional[float] = None,
+        limit: int = 10,
+    ) -> List[Dict[str, Any]]:
+        """Return the resource types changed most often in runs at or above a level.
+
+        Types are ranked by the number of those runs in which they had HIGH
+        or CRITICAL risk changes, then by their number of changes.
+
+        Args:
+            level: Lowest risk level of the runs considered.
+            stack: Only consider the runs of this stack.
+            since: Only consider the runs recorded since the start of the
+                UTC day of this time.
+            limit: Maximum number of types returned.
+
+        Returns:
+            One dictionary per type with its "type", the number of "runs"
+            it changed in, the number of "sensitive_runs" it had HIGH or
+            CRITICAL risk changes in, and its total "changes", "deletes"
+            and "sensitive" changes over those runs.
+        """
+        if stack is not None:
+            # The runs of one stack are few enough to be added up
+            where, params = _filters(level=level, stack=stack, since=since, table="r.")
+            sql = (
+                "SELECT c.type_id AS type_id, COUNT(*) AS runs, "
+                "SUM(c.sensitive > 0) AS sensitive_runs, SUM(c.changes) AS changes, "
+                "SUM(c.deletes) AS deletes, SUM(c.sensitive) AS sensitive FROM runs r "
+                f"JOIN type_counts c ON c.run_id = r.id {where} GROUP BY c.type_id"
+            )
+        else:
+            table, where = "type_totals", "level >= ?"
+            params = [RISK_LEVEL_ORDER.index(level)]
+            if since is not None:
+                table, where = "type_days", "level >= ? AND day >= ?"
+                params.append(int(since // _DAY))
+            sql = (
+                "SELECT type_id, SUM(runs) AS runs, SUM(sensitive_runs) AS sensitive_runs, "
+                "SUM(changes) AS changes, SUM(deletes) AS deletes, SUM(sensitive) AS sensitive "
+                f"FROM {table} WHERE {where} GROUP BY type_id"
+            )
+        rows = self._query(
+            "SELECT t.name, a.runs, a.sensitive_runs, a.changes, a.deletes, a.sensitive "
+            f"FROM ({sql}) a JOIN types t ON t.id = a.type_id "
+            "ORDER BY a.sensitive_runs DESC, a.changes DESC, t.name LIMIT ?",
+            [*params, limit],
+        )
+        keys = ("type", "runs", "sensitive_runs", "changes", "deletes", "sensitive")
+        return [dict(zip(keys, row)) for row in rows]
+
+    def recent_runs(
+        self,
+        stack: Optional[str] = None,
+        commit: Optional[str] = None,
+        level: Optional[str] = None,
+        rtype: Optional[str] = None,
+        since: Optional[float] = None,
+        limit: int = 20,
+    ) -> List[Dict[str, Any]]:
+        """Return the latest runs, newest first.
+
+        Args:
+            stack: Only return the runs of this stack.
+            commit: Only return the runs of this commit.
+            level: Only return the runs at or above this risk level.
+            rtype: Only return the runs changing this resource type.
+            since: Only return the runs recorded since the start of the UTC
+                day of this time.
+            limit: Maximum number of runs returned.
+
+        Returns:
+            One dictionary per run with its "id", "recorded_at", "stack",
+            "commit", "plan", "level", "score", "reasons" and "timings".
+        """
+        where, params = _filters(
+            level=level, stack=stack, since=since, commit=commit, rtype=rtype, table="r."
+        )
+        rows = self._query(
+            "SELECT r.id, r.recorded_at, r.stack, r.commit_sha, r.plan, r.level, r.score, "
+            f"r.result, r.timings FROM runs r {where} ORDER BY r.recorded_at DESC, r.id DESC "
+            "LIMIT ?",
+            [*params, limit],
+        )
+        return [
+            {
+                "id": run_id,
+                "recorded_at": recorded_at,
+                "stack": stack_name,
+                "commit": commit_sha,
+                "plan": plan,
+                "level": RISK_LEVEL_ORDER[level_index],
+                "score": score,
+                "reasons": json.loads(result).get("reasons", []),
+                "timings": json.loads(timings) if timings else None,
+            }
+            for (
+                run_id,
+                recorded_at,
+                stack_name,
+                commit_sha,
+                plan,
+                level_index,
+                score,
+                result,
+                timings,
+            ) in rows
+        ]
+
+    def _query(self, sql: str, params: Sequence[Any]) -> List[Tuple[Any, ...]]:
+        try:
+            return self._db.execute(sql, params).fetchall()
+        except sqlite3.Error as e:
+            raise HistoryError(f"Failed to read {self.path}: {e}") from None
+
+
+def _aggregate(
+    aggregates: Dict[str, Aggregate],
+    stack: str,
+    day: int,
+    level: int,
+    rows: Sequence[Tuple[Any, int, int, int, int]],
+) -> None:
+    """Add a run and its (run id, type id, changes, deletes, sensitive) rows to the aggregates."""
+    aggregates["level_totals"].setdefault((stack, level), [0])[0] += 1
+    aggregates["level_days"].setdefault((day, stack, level), [0])[0] += 1
+    for _, type_id, changes, deletes, sensitive in rows:
+        added = (1, 1 if sensitive else 0, changes, deletes, sensitive)
+        for counts in (
+            aggregates["type_totals"].setdefault((level, type_id), [0] * len(added)),
+            aggregates["type_days"].setdefault((level, day, type_id), [0] * len(added)),
+        ):
+            for i, value in enumerate(added):
+                counts[i] += value
+
+
+def _encode_timings(timings: Dict[str, float]) -> str:
+    """Encode stage timings to the microsecond."""
+    return json.dumps({name: round(seconds, 6) for name, seconds in timings.items()})
+
+
+def _filters(
+    level: Optional[str] = None,
+    stack: Optional[str] = None,
+    since: Optional[float] = None,
+    commit: Optional[str] = None,
+    rtype: Optional[str] = None,
+    table: str = "",
+) -> Tuple[str, List[Any]]:
+    """Return the WHERE clause and parameters of the given run filters."""
+    clauses = []
+    params: List[Any] = []
+    if level is not None:
+        clauses.append(f"{table}level >= ?")
+        params.append(RISK_LEVEL_ORDER.index(level))
+    if stack is not None:
+        clauses.append(f"{table}stack = ?")
+        params.append(stack)
+    if since is not None:
+        clauses.append(f"{table}recorded_at >= ?")
+        params.append(since // _DAY * _DAY)
+    if commit is not None:
+        clauses.append(f"{table}commit_sha = ?")
+        params.append(commit)
+    if rtype is not None:
+        clauses.append(
+            f"{table}id IN (SELECT run_id FROM type_counts "
+            "WHERE type_id = (SELECT id FROM types WHERE name = ?))"
+        )
+        params.append(rtype)
+    return ("WHERE " + " AND ".join(clauses) if clauses else ""), params
+
+
+def result_run(
+    result: Dict[str, Any],
+    stack: Optional[str] = None,
+    commit: Optional[str] = None,
+    timings: Optional[Dict[str, float]] = None,
+) -> Run:
+    """Return the run of an assessment result (see ``batch.assess_plan_file``).
+
+    Args:
+        result: Assessment result with a "path" key.
+        stack: Name of the stack the plan belongs to; defaults to the plan path.
+        commit: Optional commit the plan was made for.
+        timings: Optional stage timings of the run (see ``Profiler.timings``).
+    """
+    record = summary_record(result)
+    del record["record"], record["plan"]
+    return Run(
+        stack=stack or result["path"],
+        plan=result["path"],
+        level=result["level"],
+        score=result["score"],
+        result=record,
+        type_counts=type_counts(result["stats"].get("provider_rollup") or []),
+        commit=commit,
+        timings=timings,
+    )
+
+
+def type_counts(provider_rollup: Sequence[Tuple[str, int, int, int, int, str]]) -> List[TypeCount]:
+    """Return the counts of each resource type of a ``provider_rollup``.
+
+    The rollup's nodes hold the counts of every type sharing their prefix;
+    the counts of a type are those of its node less those of its children.
+    """
+    tree = RiskTree.from_rollup(provider_rollup, "_")
+    counts = []
+    for node in tree.nodes():
+        changes, deletes, sensitive = node.changes, node.deletes, node.sensitive
+        for child in node.children.values():
+            changes -= child.changes
+            deletes -= child.deletes
+            sensitive -= child.sensitive
+        if changes:
+            counts.append((node.path, changes, deletes, sensitive))
+    return counts
+
+
+def iter_record_runs(
+    fp: IO[str], stack: Optional[str] = None, commit: Optional[str] = None
+) -> Iterator[Run]:
+    """Yield the runs of saved JSON Lines records (see ``outputs.records``).
+
+    A plan's "resource" records are counted by type and its "summary"
+    record ends the run. "error" and "aggregate" records are skipped.
+
+    Args:
+        fp: Text stream of the records.
+        stack: Name of the stack of every plan; defaults to each plan's path.
+        commit: Optional commit of every plan.
+
+    Raises:
+        ValueError: If a line is not a JSON object.
+    """
+    # [changes, deletes, sensitive] of each type, by plan
+    counts: Dict[str, Dict[str, List[int]]] = {}
+    for number, line in enumerate(fp, 1):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError as e:
+            raise ValueError(f"line {number}: {e}") from None
+        if not isinstance(record, dict):
+            raise ValueError(f"line {number}: expected a JSON object")
+        kind = record.get("record")
+        if kind == "resource":
+            if record.get("reviewed"):
+                continue
+            entry = counts.setdefault(record["plan"], {}).setdefault(record["type"], [0, 0, 0])
+            entry[0] += 1
+            entry[1] += "delete" in record.get("actions", [])
+            entry[2] += record.get("risk_level") in _SENSITIVE_LEVELS
+        elif kind == "summary":
+            plan = record["plan"]
+            plan_counts = counts.pop(plan, {})
+            yield Run(
+                stack=stack or plan,
+                plan=plan,
+                level=record["level"],
+                score=record["score"],
+                result={key: record[key] for key in ("level", "score", "reasons", "stats")},
+                type_counts=[(rtype, c, d, s) for rtype, (c, d, s) in plan_counts.items()],
+                commit=commit,
+            )
+
+
+def import_records(
+    store: HistoryStore,
+    paths: Sequence[str],
+    stack: Optional[str] = None,
+    commit: Optional[str] = None,
+) -> Tuple[int, List[str]]:
+    """Import saved JSON Lines records into the history, one transaction per file.
+
+    The runs of a file are recorded at its modification time. Files whose
+    content was already imported, under any name, are skipped.
+
+    Returns:
+        The number of runs imported, and the paths of the files skipped.
+
+    Raises:
+        OSError: If a file cannot be read (HistoryError if the database
+            cannot be written).
+        ValueError: If a file holds invalid records.
+    """
+    total = 0
+    skipped = []
+    for path in paths:
+        with open(path, "rb") as raw:
+            recorded_at = os.fstat(raw.fileno()).st_mtime
+            digest = hashlib.sha256()
+            for chunk in iter(lambda: raw.read(1 << 20), b""):
+                digest.update(chunk)
+            raw.seek(0)
+            try:
+                runs = list(
+                    iter_record_runs(io.TextIOWrapper(raw, encoding="utf-8"), stack, commit)
+                )
+            except (KeyError, ValueError) as e:
+                raise ValueError(f"{path}: invalid records: {e}") from None
+        for run in runs:
+            run.recorded_at = recorded_at
+        count = store.record_import(runs, digest.hexdigest(), path)
+        if count is None:
+            skipped.append(path)
+        else:
+            total += count
+    return total, skipped
+
+
+def parse_args(argv: Sequence[str]) -> argparse.Namespace:
+    """Parse the arguments of ``tguard history``."""
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument(
+        "--db",
+        default=os.getenv("TERRAGUARD_HISTORY"),
+        help="Path of the history database. Default: env TERRAGUARD_HISTORY.",
+    )
+    common.add_argument(
+        "--format",
+        choices=("text", "json"),
+        default="text",
+        help="Print a table (default) or JSON.",
+    )
+    parser = argparse.ArgumentParser(
+        prog="tguard history", description="Query or backfill the run history."
+    )
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    def add_command(name: str, help: str) -> argparse.ArgumentParser:
+        return subparsers.add_parser(name, help=help, description=help, parents=[common])
+
+    def add_filters(command: argparse.ArgumentParser) -> None:
+        command.add_argument(
+            "--stack", metavar="NAME", default=None, help="Only consider the runs of stack NAME."
+        )
+        command.add_argument(
+            "--since",
+            type=int,
+            metavar="DAYS",
+            default=None,
+            help="Only consider the runs of the last DAYS days (UTC), today included.",
+        )
+
+    levels = add_command("levels", "Number of runs at each risk level, per stack.")
+    add_filters(levels)
+    types = add_command(
+        "types", "Resource types changed most often in runs at or above a risk level."
+    )
+    add_filters(types)
+    types.add_argument(
+        "--level",
+        choices=RISK_LEVEL_ORDER,
+        default="HIGH",
+        help="Lowest risk level of the runs considered. Default: HIGH.",
+    )
+    types.add_argument("--limit", type=int, default=10, help="Number of types listed.")
+    runs = add_command("runs", "Latest runs, newest first.")
+    add_filters(runs)
+    runs.add_argument(
+        "--commit", metavar="SHA", default=None, help="Only list the runs of commit SHA."
+    )
+    runs.add_argument(
+        "--level", choices=RISK_LEVEL_ORDER, default=None, help="Only list runs at or above LEVEL."
+    )
+    runs.add_argument(
+        "--type",
+        dest="rtype",
+        metavar="TYPE",
+        default=None,
+        help="Only list runs changing resources of TYPE.",
+    )
+    runs.add_argument("--limit", type=int, default=20, help="Number of runs listed.")
+    imports = add_command("import", "Backfill the history from saved JSON Lines records.")
+    imports.add_argument("records", nargs="+", help="Files written with --output jsonl.")
+    imports.add_argument(
+        "--stack",
+        metavar="NAME",
+        default=None,
+        help="Stack of the imported plans. Default: each plan's path.",
+    )
+    imports.add_argument(
+        "--commit", metavar="SHA", default=None, help="Commit of the imported plans."
+    )
+
+    args = parser.parse_args(argv)
+    if not args.db:
+        parser.error("no history database given: pass --db or set TERRAGUARD_HISTORY")
+    return args
+
+
+def main(argv: Sequence[str]) -> None:
+    """Entry point of ``tguard history``. Exits with code 1 on errors."""
+    args = parse_args(argv)
+    days = getattr(args, "since", None)
+    since = time.time() - (days - 1) * _DAY if days is not None else None
+    try:
+        with HistoryStore(args.db) as store:
+            if args.command == "import":
+                count, skipped = import_records(store, args.records, args.stack, args.commit)
+                for path in skipped:
+                    print(f"Skipped {path}: already imported.")
+                print(f"Imported {count} run(s) into {args.db}.")
+                return
+            if args.command == "levels":
+                rows = store.level_counts(args.stack, since)
+                columns = ["stack", "runs", *RISK_LEVEL_ORDER]
+            elif args.command == "types":
+                rows = store.top_types(args.level, args.stack, since, args.limit)
+                columns = ["type", "runs", "sensitive_runs", "changes", "deletes", "sensitive"]
+            else:
+                rows = store.recent_runs(
+                    args.stack, args.commit, args.level, args.rtype, since, args.limit
+                )
+                columns = ["recorded_at", "stack", "plan", "commit", "level", "score"]
+    except (OSError, ValueError) as e:
+        print(f"ERROR: {e}", file=sys.stderr)
+        sys.exit(1)
+    if args.format == "json":
+        print(json.dumps(rows, indent=2))
+    else:
+        print(format_table(rows, columns))
+
+
+def format_table(rows: Sequence[Dict[str, Any]], columns: Sequence[str]) -> str:
+    """Format query results as a text table, times as UTC dates and counts right-aligned."""
+    cells = [
+        [
+            (
+                time.strftime("%Y-%m-%d %H:%M", time.gmtime(row[column]))
+                if column == "recorded_at"
+                else "-" if row[column] is None else str(row[column])
+            )
+            for column in columns
+        ]
+        for row in rows
+    ]
+    numeric = [bool(rows) and isinstance(rows[0][column], int) for column in columns]
+    widths = [
+        max([len(column)] + [len(row[i]) for row in cells]) for i, column in enumerate(columns)
+    ]
+    return "\n".join(
+        "  ".join(
+            cell.rjust(width) if right else cell.ljust(width)
+            for cell, width, right in zip(row, widths, numeric)
+        ).rstrip()
+        for row in [list(columns), *cells]
+    )
@@ -1,4 +1,60 @@
-from .formatter import format_summary_markdown
-from .github import maybe_post_github_comment
+from importlib import import_module
+from typing import TYPE_CHECKING, Any, List
 
-__all__ = ["format_summary_markdown", "maybe_post_github_comment"]
+from .formatter import (
+    MARKDOWN_BUDGET,
+    MarkdownWriter,
+    format_batch_summary_markdown,
+    format_plan_summary_markdown,
+    format_summary_markdown,
+    write_batch_summary_markdown,
+    write_plan_summary_markdown,
+    write_summary_markdown,
+)
+
+if TYPE_CHECKING:
+    from .github import maybe_post_github_comment, maybe_post_github_report
+    from .metrics import RunMetrics
+    from .records import JsonLinesWriter, RecordWriter, SarifWriter, record_writer
+
+__all__ = [
+    "format_summary_markdown",
+    "format_batch_summary_markdown",
+    "format_plan_summary_markdown",
+    "write_summary_markdown",
+    "write_batch_summary_markdown",
+    "write_plan_summary_markdown",
+    "MarkdownWriter",
+    "MARKDOWN_BUDGET",
+    "maybe_post_github_comment",
+    "maybe_post_github_report",
+    "RecordWriter",
+    "JsonLinesWriter",
+    "SarifWriter",
+    "record_writer",
+    "RunMetrics",
+]
+
+# The GitHub backend, the record writers and the run metrics are imported on
+# first access, so that formatting a summary does not load them.
+_EXPORTS = {
+    "maybe_post_github_comment": ".github",
+    "maybe_post_github_report": ".github",
+    "RecordWriter": ".records",
+    "JsonLinesWriter": ".records",
+    "SarifWriter": ".records",
+    "record_writer": ".records",
+    "RunMetrics": ".metrics",
+}
+
+
+def __getattr__(name: str) -> Any:
+    if name not in _EXPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(import_module(_EXPORTS[name], __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__() -> List[str]:
+    return sorted(list(globals()) + __all__)
@@ -2,13 +2,105 @@
 
 This module provides functionality to format risk assessment results
 into markdown for display in logs or GitHub comments.
+
+Summaries are written line by line to any text stream by the ``write_*``
+functions, optionally within a byte budget: the change summary and reasons
+are always written, and the rows of the collapsible detail sections only
+while they fit. The rows left out are counted per resource type (or risk
+level) and summarized in one "…and 4,812 more" line per section, so memory
+use does not depend on the number of rows. The ``format_*`` functions
+return the text, within ``MARKDOWN_BUDGET`` by default so that it can be
+posted to GitHub as is.
 """
 
-from typing import Any, Dict
+import io
+from collections import Counter
+from typing import IO, Any, Callable, Dict, Iterable, List, Optional, Sequence, TypeVar
 
+from terraguard.terraform_plan.tree import RiskTree, TreeNode, resource_type
 
-def format_summary_markdown(result: Dict[str, Any]) -> str:
-    """Format a risk assessment result dictionary into markdown.
+# Maximum size of a GitHub comment body or Check Run summary.
+GITHUB_BODY_LIMIT = 65536
+
+# Default budget of a formatted summary, in UTF-8 bytes. The rest of the
+# GitHub limit leaves room for the hidden marker of sticky comments.
+MARKDOWN_BUDGET = GITHUB_BODY_LIMIT - 1024
+
+# Bytes set aside for each detail section still to be written: its heading,
+# overflow line and closing tag.
+SECTION_RESERVE = 640
+
+# Smallest budget given to the details of one plan of a batch summary.
+MIN_PLAN_BUDGET = 4096
+
+# Resource types (or risk levels) named in an overflow line.
+OVERFLOW_GROUPS = 5
+
+# Top-level nodes, and children per node, shown of a roll-up tree.
+TREE_TOP = 10
+
+# Levels of a roll-up tree shown, top-level nodes included.
+TREE_DEPTH = 3
+
+Row = TypeVar("Row")
+
+
+class MarkdownWriter:
+    """Writes lines of markdown to a text stream, counting their UTF-8 bytes.
+
+    Lines are separated by newlines, without a trailing one, and two blank
+    lines in a row are written as one.
+    """
+
+    def __init__(self, out: IO[str], budget: Optional[int] = None) -> None:
+        """Create a writer.
+
+        Args:
+            out: Text stream to write to.
+            budget: Optional number of bytes the detail rows must fit in
+                (see ``fits``).
+        """
+        self.out = out
+        self.budget = budget
+        self.size = 0
+        self._started = False
+        self._blank = False
+
+    def line(self, text: str = "") -> None:
+        """Write a line (or several, separated by newlines)."""
+        if not text:
+            if self._blank:
+                return
+            self._blank = True
+        else:
+            self._blank = False
+        if self._started:
+            text = "\n" + text
+        self._started = True
+        self.size += _nbytes(text)
+        self.out.write(text)
+
+    def lines(self, lines: Iterable[str]) -> None:
+        """Write lines."""
+        for text in lines:
+            self.line(text)
+
+    def fits(self, size: int, reserve: int = 0) -> bool:
+        """Return whether ``size`` more bytes fit in the budget, keeping ``reserve`` bytes free."""
+        return self.budget is None or self.size + size + reserve <= self.budget
+
+    def remaining(self) -> Optional[int]:
+        """Return the bytes left in the budget, or None without a budget."""
+        return None if self.budget is None else self.budget - self.size
+
+
+def write_summary_markdown(
+    result: Dict[str, Any],
+    out: IO[str],
+    budget: Optional[int] = None,
+    details_path: Optional[str] = None,
+) -> None:
+    """Write a risk assessment result as markdown to a text stream.
 
     Args:
         result: A dictionary containing:
@@ -16,45 +108,433 @@ def format_summary_markdown(result: Dict[str, Any]) -> str:
             - score: Numeric risk score
             - stats: Dictionary with change statistics
             - reasons: List of reason strings explaining the risk assessment
+        out: Text stream to write to.
+        budget: Optional size limit in UTF-8 bytes. Detail rows past it are
+            summarized per resource type.
+        details_path: Optional path of a file holding the full details, named
+            in the overflow lines.
+    """
+    w = MarkdownWriter(out, budget)
+    w.line("### Terraform Plan Risk Assessment")
+    w.line("")
+    w.line(f"**Risk Level:** `{result['level']}` (score: {result['score']})")
+    w.line("")
+    _write_result_body(w, result, details_path)
+
+
+def format_summary_markdown(
+    result: Dict[str, Any],
+    budget: Optional[int] = MARKDOWN_BUDGET,
+    details_path: Optional[str] = None,
+) -> str:
+    """Format a risk assessment result dictionary into markdown.
+
+    Args:
+        result: Assessment result (see ``write_summary_markdown``).
+        budget: Size limit in UTF-8 bytes, or None for no limit. Defaults to
+            ``MARKDOWN_BUDGET``, which fits a GitHub comment.
+        details_path: Optional path of a file holding the full details.
 
     Returns:
         A formatted markdown string suitable for display in logs or GitHub comments.
         Includes risk level, score, change summary, reasons, and a collapsible
         section for sensitive resource changes.
     """
-    level = result["level"]
+    out = io.StringIO()
+    write_summary_markdown(result, out, budget, details_path)
+    return out.getvalue()
+
+
+def write_batch_summary_markdown(
+    results: Sequence[Dict[str, Any]],
+    aggregate: Dict[str, Any],
+    out: IO[str],
+    budget: Optional[int] = None,
+    details_path: Optional[str] = None,
+) -> None:
+    """Write the results of a batch assessment as markdown to a text stream.
+
+    Args:
+        results: Per-plan results as returned by ``batch.assess_plans``. Each
+            is an assessment result with a "path" key, or a dictionary with
+            "path" and "error" keys.
+        aggregate: Overall verdict as returned by ``batch.aggregate_results``.
+        out: Text stream to write to.
+        budget: Optional size limit in UTF-8 bytes. Table rows and plan
+            details past it are summarized per risk level, and the budget
+            left is shared between the details of the plans.
+        details_path: Optional path of a file holding the full details.
+    """
+    w = MarkdownWriter(out, budget)
+    w.line("### Terraform Plan Risk Assessment")
+    w.line("")
+    w.line(
+        f"**Overall Risk Level:** `{aggregate['level']}` (score: {aggregate['score']}) "
+        f"across {aggregate['plans']} plan(s)"
+    )
+    w.line("")
+    w.line("| Plan | Risk Level | Score | Changes | Deletes |")
+    w.line("| --- | --- | --- | --- | --- |")
+    overflow = _write_rows(w, results, _plan_row, _plan_level, None, 2 * SECTION_RESERVE)
+    if overflow:
+        w.line("")
+        w.line(_overflow_line(overflow, details_path, "plan(s)"))
+    w.line("")
+
+    if aggregate["errors"]:
+        errors = [result for result in results if "error" in result]
+        w.line("**Errors:**")
+        overflow = _write_rows(w, errors, _error_row, _plan_level, None, SECTION_RESERVE)
+        if overflow:
+            w.line(_overflow_line(overflow, details_path, "plan(s)"))
+        w.line("")
+
+    detailed = [
+        result
+        for result in results
+        if "error" not in result and result["stats"]["total_resources"] != 0
+    ]
+    overflow = Counter()
+    for i, result in enumerate(detailed):
+        remaining = w.remaining()
+        if remaining is None:
+            _write_plan_details(w, result, details_path)
+            continue
+        available = remaining - SECTION_RESERVE
+        share = max(available // (len(detailed) - i), MIN_PLAN_BUDGET)
+        buffer = io.StringIO()
+        plan_writer = MarkdownWriter(buffer, min(share, available))
+        if not overflow and available >= MIN_PLAN_BUDGET:
+            _write_plan_details(plan_writer, result, details_path)
+        if not overflow and 0 < plan_writer.size <= available:
+            w.line(buffer.getvalue())
+        else:
+            overflow[result["level"]] += 1
+    if overflow:
+        w.line(_overflow_line(overflow, details_path, "plan(s)", "with details left out"))
+        w.line("")
+
+
+def format_batch_summary_markdown(
+    results: Sequence[Dict[str, Any]],
+    aggregate: Dict[str, Any],
+    budget: Optional[int] = MARKDOWN_BUDGET,
+    details_path: Optional[str] = None,
+) -> str:
+    """Format the results of a batch assessment into markdown.
+
+    Args:
+        results: Per-plan results (see ``write_batch_summary_markdown``).
+        aggregate: Overall verdict as returned by ``batch.aggregate_results``.
+        budget: Size limit in UTF-8 bytes, or None for no limit. Defaults to
+            ``MARKDOWN_BUDGET``.
+        details_path: Optional path of a file holding the full details.
+
+    Returns:
+        A markdown string with the overall risk level, a table of per-plan
+        levels and a collapsible section per plan with its details.
+    """
+    out = io.StringIO()
+    write_batch_summary_markdown(results, aggregate, out, budget, details_path)
+    return out.getvalue()
+
+
+def write_plan_summary_markdown(
+    result: Dict[str, Any],
+    out: IO[str],
+    budget: Optional[int] = None,
+    details_path: Optional[str] = None,
+) -> None:
+    """Write the result of one plan of a batch assessment as markdown to a text stream.
+
+    Args:
+        result: An assessment result with a "path" key, or a dictionary with
+            "path" and "error" keys.
+        out: Text stream to write to.
+        budget: Optional size limit in UTF-8 bytes.
+        details_path: Optional path of a file holding the full details.
+    """
+    w = MarkdownWriter(out, budget)
+    w.line(f"### Terraform Plan Risk Assessment: `{result['path']}`")
+    w.line("")
+    if "error" in result:
+        w.line(f"**Error:** {result['error']}")
+        return
+    w.line(f"**Risk Level:** `{result['level']}` (score: {result['score']})")
+    w.line("")
+    _write_result_body(w, result, details_path)
+
+
+def format_plan_summary_markdown(
+    result: Dict[str, Any],
+    budget: Optional[int] = MARKDOWN_BUDGET,
+    details_path: Optional[str] = None,
+) -> str:
+    """Format the result of one plan of a batch assessment into markdown.
+
+    Used for the per-plan comments of a batch run.
+
+    Args:
+        result: An assessment result with a "path" key, or a dictionary with
+            "path" and "error" keys.
+        budget: Size limit in UTF-8 bytes, or None for no limit. Defaults to
+            ``MARKDOWN_BUDGET``.
+        details_path: Optional path of a file holding the full details.
+
+    Returns:
+        A markdown string like ``format_summary_markdown``'s, naming the plan.
+    """
+    out = io.StringIO()
+    write_plan_summary_markdown(result, out, budget, details_path)
+    return out.getvalue()
+
+
+def _write_plan_details(
+    w: MarkdownWriter, result: Dict[str, Any], details_path: Optional[str]
+) -> None:
+    w.line("<details>")
+    w.line(f"<summary><code>{result['path']}</code>: {result['level']}</summary>")
+    w.line("")
+    _write_result_body(w, result, details_path)
+    w.line("</details>")
+    w.line("")
+
+
+def _plan_row(result: Dict[str, Any]) -> List[str]:
+    if "error" in result:
+        return [f"| `{result['path']}` | `ERROR` | - | - | - |"]
+    stats = result["stats"]
+    # Counts of a partial scan are lower bounds
+    more = "+" if stats.get("partial") else ""
+    return [
+        f"| `{result['path']}` | `{result['level']}` | {result['score']} "
+        f"| {stats['total_resources']}{more} | {stats['deletes']}{more} |"
+    ]
+
+
+def _error_row(result: Dict[str, Any]) -> List[str]:
+    return [f"- `{result['path']}`: {result['error']}"]
+
+
+def _plan_level(result: Dict[str, Any]) -> str:
+    return "ERROR" if "error" in result else str(result["level"])
+
+
+def _write_result_body(
+    w: MarkdownWriter, result: Dict[str, Any], details_path: Optional[str]
+) -> None:
+    """Write the change summary, reasons and detail sections of a result."""
     stats = result["stats"]
     reasons = result["reasons"]
 
-    lines = []
-    lines.append("### Terraform Plan Risk Assessment")
-    lines.append("")
-    lines.append(f"**Risk Level:** `{level}` (score: {result['score']})")
-    lines.append("")
-    lines.append("**Change Summary:**")
-    lines.append(f"- Total resources with changes: `{stats['total_resources']}`")
-    lines.append(f"- Creates: `{stats['creates']}`")
-    lines.append(f"- Updates: `{stats['updates']}`")
-    lines.append(f"- Deletes: `{stats['deletes']}`")
-    lines.append(f"- High risk changes: `{stats['high_risk_changes']}`")
-    lines.append(f"- Critical changes: `{stats['critical_changes']}`")
-    lines.append(f"- High risk deletes: `{stats['high_risk_deletes']}`")
-    lines.append(f"- Critical deletes: `{stats['critical_deletes']}`")
-    lines.append("")
+    if stats.get("partial"):
+        w.line("**Change Summary (partial):**")
+        w.line(
+            f"- Scan stopped after `{stats['scanned']}` resource change(s), once the fail-on "
+            f"threshold was certain. Counts are lower bounds."
+        )
+    else:
+        w.line("**Change Summary:**")
+    w.line(f"- Total resources with changes: `{stats['total_resources']}`")
+    w.line(f"- Creates: `{stats['creates']}`")
+    w.line(f"- Updates: `{stats['updates']}`")
+    w.line(f"- Deletes: `{stats['deletes']}`")
+    w.line(f"- High risk changes: `{stats['high_risk_changes']}`")
+    w.line(f"- Critical changes: `{stats['critical_changes']}`")
+    w.line(f"- High risk deletes: `{stats['high_risk_deletes']}`")
+    w.line(f"- Critical deletes: `{stats['critical_deletes']}`")
+    if stats.get("blast_radius") is not None:
+        w.line(f"- Blast radius: `{stats['blast_radius']}` existing resource(s)")
+    if stats.get("drifted_resources"):
+        w.line(
+            f"- Changed outside of Terraform: `{stats['drifted_resources']}` resource(s), "
+            f"`{stats['sensitive_drifts']}` HIGH or CRITICAL risk"
+        )
+    if stats.get("unmasked_outputs"):
+        w.line(f"- Outputs no longer sensitive: `{stats['unmasked_outputs']}`")
+    baseline = stats.get("baseline")
+    if baseline:
+        removed = baseline["removed"]
+        w.line(
+            f"- Since baseline: `{baseline['new']}` new, `{baseline['escalated']}` escalated, "
+            f"`{baseline['reviewed']}` already reviewed (not scored)"
+            + (f", `{removed}` no longer planned" if removed is not None else "")
+        )
+    w.line("")
     if reasons:
-        lines.append("**Reasons / Signals:**")
+        w.line("**Reasons / Signals:**")
         for r in reasons:
-            lines.append(f"- {r}")
-        lines.append("")
-    sens_details = stats.get("sensitive_details", [])
-    if sens_details:
-        lines.append("<details>")
-        lines.append("<summary>Sensitive resource changes</summary>")
-        lines.append("")
-        for rtype, address, risk_level, actions in sens_details:
-            act_str = ",".join(actions)
-            lines.append(f"- `{rtype}` `{address}` ({risk_level}) actions: `{act_str}`")
-        lines.append("")
-        lines.append("</details>")
-
-    return "\n".join(lines)
+            w.line(f"- {r}")
+        w.line("")
+
+    # Collapsible sections: (title, rows, render, group, row limit)
+    sections: List[Any] = []
+    for title, rollup, separator in (
+        ("Risk by module", stats.get("module_rollup"), "."),
+        ("Risk by provider", stats.get("provider_rollup"), "_"),
+    ):
+        if rollup:
+            tree = RiskTree.from_rollup(rollup, separator)
+            if tree.root.children:
+                nodes = sorted(tree.root.children.values(), key=TreeNode.rank, reverse=True)
+                sections.append((title, nodes, _tree_block, _node_level, TREE_TOP))
+    for title, key, render, group in (
+        ("Sensitive resource changes", "sensitive_details", _change_row, _first),
+        ("Risky attribute changes", "attribute_changes", _attribute_row, _address_type),
+        ("Deleted resources with dependents", "top_dependents", _dependents_row, _address_type),
+        ("Escalated since baseline", "escalated_changes", _escalation_row, _address_type),
+        ("Sensitive resources changed outside of Terraform", "drift_details", _change_row, _first),
+        ("Output sensitivity changes", "output_flips", _output_row, _flip),
+        (
+            "Sensitive changes already reviewed in baseline",
+            "reviewed_details",
+            _change_row,
+            _first,
+        ),
+    ):
+        rows = stats.get(key)
+        if rows:
+            sections.append((title, rows, render, group, None))
+
+    for i, (title, rows, render, group, limit) in enumerate(sections):
+        if i:
+            w.line("")
+        w.line("<details>")
+        w.line(f"<summary>{title}</summary>")
+        w.line("")
+        reserve = (len(sections) - i) * SECTION_RESERVE
+        overflow = _write_rows(w, rows, render, group, limit, reserve)
+        if overflow:
+            # Roll-up trees are cut at ``limit`` nodes in the full details too
+            w.line(_overflow_line(overflow, details_path if limit is None else None))
+        w.line("")
+        w.line("</details>")
+
+
+def _write_rows(
+    w: MarkdownWriter,
+    rows: Iterable[Row],
+    render: Callable[[Row], List[str]],
+    group: Callable[[Row], str],
+    limit: Optional[int],
+    reserve: int,
+) -> "Counter[str]":
+    """Write the lines of rows while they fit, keeping ``reserve`` bytes free.
+
+    Returns:
+        The number of rows left out per group: the rows past the first one
+        that does not fit, and past ``limit`` rows.
+    """
+    overflow: Counter[str] = Counter()
+    for i, row in enumerate(rows):
+        if not overflow and (limit is None or i < limit):
+            lines = render(row)
+            if w.fits(sum(_nbytes(text) + 1 for text in lines), reserve):
+                w.lines(lines)
+                continue
+        overflow[group(row)] += 1
+    return overflow
+
+
+def _overflow_line(
+    overflow: "Counter[str]",
+    details_path: Optional[str],
+    noun: str = "",
+    qualifier: str = "",
+) -> str:
+    """Return the line summarizing rows left out, naming the largest groups."""
+    total = sum(overflow.values())
+    lead = " ".join(part for part in (f"- …and {total:,} more", noun, qualifier) if part)
+    where = f" (full list in `{details_path}`)" if details_path else ""
+    groups = overflow.most_common(OVERFLOW_GROUPS)
+    while True:
+        named = [f"{count:,} `{name}`" for name, count in groups]
+        others = total - sum(count for _, count in groups)
+        if others:
+            named.append(f"{others:,} other(s)")
+        text = lead + (f": {', '.join(named)}" if groups else "") + where
+        if _nbytes(text) <= SECTION_RESERVE // 2 or not groups:
+            return text
+        groups = groups[:-1]
+
+
+def _change_row(row: Sequence[Any]) -> List[str]:
+    rtype, address, risk_level, actions = row
+    return [f"- `{rtype}` `{address}` ({risk_level}) actions: `{','.join(actions)}`"]
+
+
+def _attribute_row(row: Sequence[Any]) -> List[str]:
+    address, attribute, risk_level, reason = row
+    return [f"- `{address}` `{attribute}` ({risk_level}): {reason}"]
+
+
+def _dependents_row(row: Sequence[Any]) -> List[str]:
+    address, action, dependents = row
+    return [f"- `{address}` ({action}): {dependents} dependent resource(s)"]
+
+
+def _escalation_row(row: Sequence[Any]) -> List[str]:
+    address, old_actions, actions, old_level, risk_level = row
+    return [f"- `{address}`: `{old_actions}` ({old_level}) -> `{actions}` ({risk_level})"]
+
+
+def _output_row(row: Sequence[Any]) -> List[str]:
+    name, flip = row
+    state = "no longer sensitive" if flip == "unmasked" else "now sensitive"
+    return [f"- `output.{name}`: {state}"]
+
+
+def _flip(row: Sequence[Any]) -> str:
+    return str(row[1])
+
+
+def _first(row: Sequence[Any]) -> str:
+    return str(row[0])
+
+
+def _address_type(row: Sequence[Any]) -> str:
+    return resource_type(row[0])
+
+
+def _node_level(node: TreeNode) -> str:
+    return node.risk_level
+
+
+def _tree_block(node: TreeNode) -> List[str]:
+    """Return the line of a top-level node of a roll-up tree, or its collapsible subtree.
+
+    A node with children is a collapsible subtree of its riskiest
+    descendants, down to ``TREE_DEPTH`` levels. Chains of only children are
+    shown as their last node.
+    """
+    node = node.collapsed()
+    if not node.children:
+        return [f"- `{node.path}`: {_node_counts(node)}"]
+    lines = ["", "<details>", f"<summary><code>{node.path}</code>: {_node_counts(node)}</summary>"]
+    lines.append("")
+    _subtree_lines(node, lines, 0)
+    lines.extend(("", "</details>", ""))
+    return lines
+
+
+def _subtree_lines(node: TreeNode, lines: List[str], indent: int) -> None:
+    """Append nested bullets of the riskiest descendants of ``node``."""
+    children = sorted(node.children.values(), key=TreeNode.rank, reverse=True)
+    prefix = "  " * indent
+    for child in (child.collapsed() for child in children[:TREE_TOP]):
+        lines.append(f"{prefix}- `{child.path}`: {_node_counts(child)}")
+        if indent + 1 < TREE_DEPTH - 1:
+            _subtree_lines(child, lines, indent + 1)
+    if len(children) > TREE_TOP:
+        lines.append(f"{prefix}- …and {len(children) - TREE_TOP} more")
+
+
+def _node_counts(node: TreeNode) -> str:
+    return (
+        f"{node.risk_level}, {node.changes} change(s), {node.sensitive} sensitive, "
+        f"{node.deletes} delete(s)"
+    )
+
+
+def _nbytes(text: str) -> int:
+    return len(text) if text.isascii() else len(text.encode())
@@ -2,62 +2,682 @@
 
 This module handles posting risk assessment summaries as comments on
 GitHub Pull Requests when running in GitHub Actions environments.
+
+By default every run posts a new comment. In sticky mode, the summary is
+kept in a single comment per pull request instead, found again by a hidden
+marker and updated in place:
+
+1. The comment ID and a digest of the last posted body are cached on disk.
+   If the rendered summary has not changed, no API call is made at all.
+2. Otherwise the cached comment is updated with a PATCH.
+3. Without a usable cache entry, the pull request's comments are listed
+   page by page to find the marker in a comment of the token's own user
+   (or of ``github-actions[bot]``); the comment is updated if found and
+   created otherwise. Markers in comments of other users are ignored.
+
+A run can also report as a Check Run on the pull request's head commit, or
+keep one sticky comment per assessed plan. The pull request's comments are
+then listed once for all plans, and the writes are sent from a bounded
+thread pool.
+
+All requests share one pooled ``requests.Session`` and go through
+``request``, which waits out rate limits (``Retry-After``, or
+``X-RateLimit-Remaining`` and ``X-RateLimit-Reset``) in every thread and
+retries server errors of idempotent requests with exponential backoff. The API root is taken from
+``GITHUB_API_URL`` (set by GitHub Actions, and pointing at the instance's
+API on GitHub Enterprise Server), so the backend can also be run against a
+local mock server.
 """
 
+import hashlib
 import json
 import os
+import random
 import sys
+import tempfile
+import threading
+import time
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Dict,
+    FrozenSet,
+    List,
+    Mapping,
+    NamedTuple,
+    Optional,
+    Sequence,
+    Tuple,
+)
+
+from terraguard.config import GITHUB_REPORT_MODES
+
+if TYPE_CHECKING:
+    import requests
+
+DEFAULT_API_URL = "https://api.github.com"
+
+# Seconds to wait for each GitHub API request.
+REQUEST_TIMEOUT = 10
+
+# Attempts per request, and the longest rate limit wait sat out before a
+# request is given up.
+MAX_ATTEMPTS = 5
+MAX_RATE_LIMIT_WAIT = 60.0
+
+# First backoff delay after a server error or connection failure, in seconds.
+BACKOFF_SECONDS = 1.0
+
+# Methods whose requests can be sent again after a server error or a
+# connection failure. A POST may have been applied before it failed, and
+# sending it again would create a second comment or Check Run.
+IDEMPOTENT_METHODS = frozenset({"GET", "HEAD", "PUT", "PATCH", "DELETE"})
+
+# Concurrent requests when posting several comments. GitHub's secondary rate
+# limits penalize bursts of concurrent writes, so keep this small.
+DEFAULT_MAX_WORKERS = 4
+
+# Comments per page when searching for the sticky comment (the API maximum).
+COMMENTS_PER_PAGE = 100
+
+# Longest Check Run output summary accepted by the API.
+CHECK_RUN_SUMMARY_LIMIT = 65535
+
+DEFAULT_COMMENT_KEY = "default"
+CHECK_RUN_NAME = "terraguard"
+
+_STICKY_MARKER = "<!-- terraguard:sticky-comment:{key} -->"
+_COMMENT_CACHE_FILE = "github-comments.json"
 
-import requests
+# Author of comments posted with the GITHUB_TOKEN of GitHub Actions, which
+# cannot read its own login from the API.
+ACTIONS_BOT_LOGIN = "github-actions[bot]"
 
+# Logins whose comments may be taken over, per API root and authorization.
+_own_logins: Dict[Tuple[str, str], FrozenSet[str]] = {}
 
-def maybe_post_github_comment(summary_markdown: str) -> None:
+_session: Optional["requests.Session"] = None
+
+# Monotonic time before which no request is sent, after a rate limit was hit.
+_pause_until = 0.0
+_pause_lock = threading.Lock()
+
+
+class PullRequest(NamedTuple):
+    """Pull request a run reports to."""
+
+    # Repository full name, e.g. "owner/repo".
+    repo: str
+    number: int
+    # Head commit SHA, needed for Check Runs.
+    head_sha: Optional[str] = None
+
+
+def get_session(token: Optional[str] = None) -> "requests.Session":
+    """Return the pooled session shared by all GitHub API requests.
+
+    Args:
+        token: GitHub token to authenticate with. Replaces the token of
+            earlier calls when given.
     """
-    If running in GitHub Actions on a PR event, post a comment to the PR.
-    Uses GITHUB_TOKEN and GITHUB_EVENT_PATH.
+    global _session
+    if _session is None:
+        # requests (and urllib3 behind it) is only imported once a comment is posted.
+        import requests
+        from requests.adapters import HTTPAdapter
+
+        _session = requests.Session()
+        # One connection per worker, so that concurrent writes reuse connections.
+        adapter = HTTPAdapter(pool_maxsize=DEFAULT_MAX_WORKERS * 2)
+        _session.mount("https://", adapter)
+        _session.mount("http://", adapter)
+        _session.headers.update(
+            {
+                "Accept": "application/vnd.github+json",
+                "X-GitHub-Api-Version": "2022-11-28",
+                "User-Agent": "terraguard",
+            }
+        )
+    if token:
+        _session.headers["Authorization"] = f"Bearer {token}"
+    return _session
+
+
+def request(
+    session: "requests.Session", method: str, url: str, **kwargs: Any
+) -> "requests.Response":
+    """Send a GitHub API request, waiting out rate limits and retrying server errors.
+
+    A rate limited response (403 or 429 with ``Retry-After``, or with
+    ``X-RateLimit-Remaining: 0``) pauses the requests of all threads until
+    the limit resets, then the request is retried. A successful response
+    using up the rate limit pauses later requests the same way. Server errors
+    and connection failures are retried with exponential backoff, for the
+    ``IDEMPOTENT_METHODS`` only: a POST is only sent again after a rate
+    limited response, which GitHub did not act on. Each attempt is counted
+    in the run metrics, if collected (see ``terraguard.outputs.metrics``).
+
+    Args:
+        session: Session from ``get_session``.
+        method: HTTP method.
+        url: Absolute URL.
+        **kwargs: Passed to ``session.request``.
+
+    Returns:
+        The response. It is an error response if the request still failed
+        after ``MAX_ATTEMPTS`` attempts (after one for a server error to a
+        POST), or if the rate limit resets later than ``MAX_RATE_LIMIT_WAIT``
+        seconds from now.
+
+    Raises:
+        requests.ConnectionError: If the last attempt could not connect.
+        requests.Timeout: If the last attempt timed out.
     """
-    gh_token = os.getenv("GITHUB_TOKEN")
-    event_path = os.getenv("GITHUB_EVENT_PATH")
+    import requests
 
-    if not gh_token or not event_path:
-        # Not running in GitHub Actions, or no token.
-        return
+    # Imported here: the metrics module is only needed once a request is sent.
+    from terraguard.outputs.metrics import observe_github_request
+
+    kwargs.setdefault("timeout", REQUEST_TIMEOUT)
+    delay = BACKOFF_SECONDS
+    retry_failures = method.upper() in IDEMPOTENT_METHODS
+    attempt = 1
+    while True:
+        _wait_for_rate_limit()
+        started = time.monotonic()
+        try:
+            resp = session.request(method, url, **kwargs)
+        except (requests.ConnectionError, requests.Timeout):
+            observe_github_request(method, "error", time.monotonic() - started)
+            if not retry_failures or attempt >= MAX_ATTEMPTS:
+                raise
+        else:
+            observe_github_request(method, str(resp.status_code), time.monotonic() - started)
+            wait = _rate_limit_wait(resp)
+            if wait is not None:
+                if wait > MAX_RATE_LIMIT_WAIT:
+                    return resp
+                _pause(wait)
+                if resp.status_code not in (403, 429) or attempt >= MAX_ATTEMPTS:
+                    return resp
+                attempt += 1
+                continue
+            if resp.status_code < 500 or not retry_failures or attempt >= MAX_ATTEMPTS:
+                return resp
+        time.sleep(delay * random.uniform(1.0, 1.5))
+        delay *= 2
+        attempt += 1
+
+
+def _rate_limit_wait(resp: "requests.Response") -> Optional[float]:
+    """Return the seconds to wait before the next request if ``resp`` hit a rate limit."""
+    limited = resp.status_code in (403, 429)
+    retry_after = resp.headers.get("Retry-After")
+    if limited and retry_after is not None:
+        try:
+            return max(0.0, float(retry_after))
+        except ValueError:
+            pass
+    if resp.headers.get("X-RateLimit-Remaining") == "0":
+        try:
+            return max(0.0, float(resp.headers["X-RateLimit-Reset"]) - time.time())
+        except (KeyError, ValueError):
+            return None if not limited else MAX_RATE_LIMIT_WAIT
+    if limited and "rate limit" in resp.text.lower():
+        # Secondary rate limit without Retry-After: GitHub asks to wait at least a minute.
+        return MAX_RATE_LIMIT_WAIT
+    return None
 
+
+def _pause(seconds: float) -> None:
+    """Hold back the requests of all threads for ``seconds``."""
+    global _pause_until
+    with _pause_lock:
+        _pause_until = max(_pause_until, time.monotonic() + seconds)
+
+
+def _wait_for_rate_limit() -> None:
+    while True:
+        with _pause_lock:
+            remaining = _pause_until - time.monotonic()
+        if remaining <= 0:
+            return
+        time.sleep(remaining)
+
+
+def pull_request_from_event(event_path: str) -> Optional[PullRequest]:
+    """Return the pull request of a GitHub Actions event.
+
+    Args:
+        event_path: Path to the GitHub Actions event JSON.
+
+    Returns:
+        The pull request, or None if the event cannot be read or is not a
+        pull request event.
+    """
     try:
         with open(event_path, encoding="utf-8") as f:
             event = json.load(f)
     except Exception:
-        return
+        return None
 
     # Support pull_request and pull_request_target events
     pr = event.get("pull_request")
     if not pr:
         # Not a PR event; nothing to comment on
-        return
+        return None
 
     repo = event.get("repository", {})
     full_name = repo.get("full_name")  # e.g. "owner/repo"
-    if not full_name:
+    pr_number = pr.get("number")
+    if not full_name or not pr_number:
+        return None
+    return PullRequest(full_name, int(pr_number), (pr.get("head") or {}).get("sha"))
+
+
+def maybe_post_github_comment(
+    summary_markdown: str,
+    sticky: bool = False,
+    key: str = DEFAULT_COMMENT_KEY,
+    cache_dir: Optional[str] = None,
+) -> None:
+    """
+    If running in GitHub Actions on a PR event, post a comment to the PR.
+    Uses GITHUB_TOKEN, GITHUB_EVENT_PATH and GITHUB_API_URL.
+
+    Args:
+        summary_markdown: Comment body.
+        sticky: Update a single comment per pull request instead of posting
+            a new one (see ``upsert_sticky_comment``).
+        key: Sticky comment key, to keep several sticky comments on one pull
+            request (e.g. one per stack assessed by separate jobs).
+        cache_dir: Directory of the sticky comment ID cache. Defaults to
+            ``default_cache_dir()``.
+    """
+    maybe_post_github_report(summary_markdown, sticky=sticky, key=key, cache_dir=cache_dir)
+
+
+def maybe_post_github_report(
+    summary_markdown: str,
+    mode: str = "comment",
+    failed: bool = False,
+    plan_summaries: Optional[Sequence[Tuple[str, str]]] = None,
+    sticky: bool = False,
+    key: str = DEFAULT_COMMENT_KEY,
+    cache_dir: Optional[str] = None,
+    max_workers: int = DEFAULT_MAX_WORKERS,
+) -> None:
+    """If running in GitHub Actions on a PR event, report an assessment to the PR.
+
+    Uses GITHUB_TOKEN, GITHUB_EVENT_PATH and GITHUB_API_URL. Failures are
+    printed as warnings.
+
+    Args:
+        summary_markdown: Summary of the run; for a batch run, the merged
+            summary of all plans.
+        mode: One of GITHUB_REPORT_MODES. "comment" posts ``summary_markdown`` as a
+            comment (sticky if ``sticky``). "check-run" reports it as a
+            completed Check Run on the head commit. "plan-comments" keeps one
+            sticky comment per entry of ``plan_summaries``, or one sticky
+            comment with ``summary_markdown`` without them.
+        failed: Whether the run fails the threshold: the Check Run conclusion.
+        plan_summaries: (plan path, summary) of each plan of a batch run.
+        sticky: Update a single comment in "comment" mode.
+        key: Sticky comment key. Per-plan comment keys are derived from it.
+        cache_dir: Directory of the sticky comment ID cache. Defaults to
+            ``default_cache_dir()``.
+        max_workers: Maximum concurrent requests.
+
+    Raises:
+        ValueError: If ``mode`` is not one of GITHUB_REPORT_MODES.
+    """
+    if mode not in GITHUB_REPORT_MODES:
+        raise ValueError(
+            f"Invalid GitHub report mode '{mode}'. Must be one of {GITHUB_REPORT_MODES}."
+        )
+    gh_token = os.getenv("GITHUB_TOKEN")
+    event_path = os.getenv("GITHUB_EVENT_PATH")
+
+    if not gh_token or not event_path:
+        # Not running in GitHub Actions, or no token.
         return
 
-    pr_number = pr.get("number")
-    if not pr_number:
+    pull_request = pull_request_from_event(event_path)
+    if pull_request is None:
         return
+    api_url = os.getenv("GITHUB_API_URL") or DEFAULT_API_URL
+    session = get_session(gh_token)
 
-    url = f"https://api.github.com/repos/{full_name}/issues/{pr_number}/comments"
-    headers = {
-        "Authorization": f"Bearer {gh_token}",
-        "Accept": "application/vnd.github+json",
-    }
-    payload = {"body": summary_markdown}
+    # Imported here: requests is only needed once a comment is posted.
+    import requests
 
     try:
-        resp = requests.post(url, headers=headers, json=payload, timeout=10)
-        if resp.status_code >= 300:
-            print(
-                f"WARNING: Failed to post GitHub comment "
-                f"(status={resp.status_code}): {resp.text}",
-                file=sys.stderr,
+        if mode == "check-run":
+            post_check_run(session, api_url, pull_request, summary_markdown, failed)
+        elif sticky or mode == "plan-comments":
+            if mode == "plan-comments" and plan_summaries:
+                summaries = {plan_comment_key(key, path): s for path, s in plan_summaries}
+            else:
+                summaries = {key: summary_markdown}
+            cache = CommentCache(
+                os.path.join(cache_dir or default_cache_dir(), _COMMENT_CACHE_FILE)
             )
+            upsert_sticky_comments(session, api_url, pull_request, summaries, cache, max_workers)
+        else:
+            url = f"{api_url}/repos/{pull_request.repo}/issues/{pull_request.number}/comments"
+            request(session, "POST", url, json={"body": summary_markdown}).raise_for_status()
+    except requests.HTTPError as e:
+        resp = e.response
+        print(
+            f"WARNING: Failed to post GitHub comment "
+            f"(status={resp.status_code if resp is not None else '?'}): "
+            f"{resp.text if resp is not None else e}",
+            file=sys.stderr,
+        )
     except Exception as e:
         print(f"WARNING: Exception posting GitHub comment: {e}", file=sys.stderr)
+
+
+def plan_comment_key(key: str, plan_path: str) -> str:
+    """Return the sticky comment key of a plan's comment in "plan-comments" mode."""
+    return f"{key}:{hashlib.sha256(plan_path.encode('utf-8')).hexdigest()[:16]}"
+
+
+def default_cache_dir() -> str:
+    """Return TERRAGUARD_CACHE_DIR, or the terraguard directory of the user cache."""
+    cache_dir = os.getenv("TERRAGUARD_CACHE_DIR")
+    if cache_dir:
+        return cache_dir
+    base = os.getenv("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(base, "terraguard")
+
+
+class CommentCache:
+    """IDs and body digests of sticky comments, in a JSON file.
+
+    Changes are kept in memory until ``save``.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._entries: Optional[Dict[str, Dict[str, Any]]] = None
+        self._dirty = False
+
+    def _load(self) -> Dict[str, Dict[str, Any]]:
+        if self._entries is None:
+            try:
+                with open(self.path, encoding="utf-8") as f:
+                    entries = json.load(f)
+                self._entries = entries if isinstance(entries, dict) else {}
+            except (OSError, ValueError):
+                self._entries = {}
+        return self._entries
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Return the entry ({"id", "digest"}) cached for ``key``, if any."""
+        return self._load().get(key)
+
+    def put(self, key: str, comment_id: int, digest: str) -> None:
+        """Cache the ID and body digest of a comment."""
+        self._load()[key] = {"id": comment_id, "digest": digest}
+        self._dirty = True
+
+    def discard(self, key: str) -> None:
+        """Forget the entry of ``key``."""
+        if self._load().pop(key, None) is not None:
+            self._dirty = True
+
+    def save(self) -> None:
+        """Write the entries atomically, if changed. Write errors are ignored."""
+        if not self._dirty or self._entries is None:
+            return
+        directory = os.path.dirname(self.path) or "."
+        try:
+            os.makedirs(directory, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(self._entries, f)
+            os.replace(tmp_path, self.path)
+            self._dirty = False
+        except OSError:
+            pass
+
+
+def upsert_sticky_comment(
+    session: "requests.Session",
+    api_url: str,
+    pull_request: PullRequest,
+    summary_markdown: str,
+    key: str = DEFAULT_COMMENT_KEY,
+    cache: Optional[CommentCache] = None,
+) -> str:
+    """Create or update the sticky comment of a pull request.
+
+    Args:
+        session: Session authenticated for the GitHub API.
+        api_url: API root, e.g. "https://api.github.com".
+        pull_request: Pull request to comment on.
+        summary_markdown: Comment body. The hidden marker is prepended to it.
+        key: Sticky comment key.
+        cache: Optional cache of comment IDs and body digests.
+
+    Returns:
+        "unchanged", "updated" or "created".
+
+    Raises:
+        requests.HTTPError: If a request fails.
+    """
+    return upsert_sticky_comments(session, api_url, pull_request, {key: summary_markdown}, cache)[
+        key
+    ]
+
+
+def upsert_sticky_comments(
+    session: "requests.Session",
+    api_url: str,
+    pull_request: PullRequest,
+    summaries: Mapping[str, str],
+    cache: Optional[CommentCache] = None,
+    max_workers: int = DEFAULT_MAX_WORKERS,
+) -> Dict[str, str]:
+    """Create or update several sticky comments of a pull request.
+
+    Comments whose cached digest matches their body are left alone without
+    a request. Comments with a cache entry are updated directly; the pull
+    request's comments are listed once for all the others (and for cached
+    comments that were deleted meanwhile). Writes are sent concurrently from
+    a pool of ``max_workers`` threads.
+
+    Args:
+        session: Session authenticated for the GitHub API.
+        api_url: API root, e.g. "https://api.github.com".
+        pull_request: Pull request to comment on.
+        summaries: Comment body per sticky comment key. The hidden marker of
+            the key is prepended to each body.
+        cache: Optional cache of comment IDs and body digests. It is saved
+            before returning, also when a request fails.
+        max_workers: Maximum concurrent requests.
+
+    Returns:
+        "unchanged", "updated" or "created" per key.
+
+    Raises:
+        requests.HTTPError: If a request fails. The comments written until
+            then are cached.
+    """
+    repo, number = pull_request.repo, pull_request.number
+    comments_url = f"{api_url}/repos/{repo}/issues/comments"
+    cache_prefix = f"{api_url}/repos/{repo}/issues/{number}#"
+    bodies = {key: f"{_STICKY_MARKER.format(key=key)}\n{s}" for key, s in summaries.items()}
+    digests = {key: hashlib.sha256(b.encode("utf-8")).hexdigest() for key, b in bodies.items()}
+    results: Dict[str, str] = {}
+
+    try:
+        patches: List[Tuple[str, str, str]] = []
+        for key in bodies:
+            entry = cache.get(cache_prefix + key) if cache is not None else None
+            if entry is None:
+                continue
+            if entry.get("digest") == digests[key]:
+                results[key] = "unchanged"
+            else:
+                patches.append((key, "PATCH", f"{comments_url}/{entry['id']}"))
+        for key, resp in _send_comments(session, patches, bodies, max_workers):
+            if resp.status_code in (404, 410):
+                # Deleted meanwhile: search for it again below.
+                if cache is not None:
+                    cache.discard(cache_prefix + key)
+                continue
+            resp.raise_for_status()
+            results[key] = "updated"
+            if cache is not None:
+                cache.put(cache_prefix + key, int(resp.json()["id"]), digests[key])
+
+        missing = [key for key in bodies if key not in results]
+        if not missing:
+            return results
+        found = _find_comments(session, api_url, pull_request, missing)
+        writes: List[Tuple[str, str, str]] = []
+        for key in missing:
+            if key not in found:
+                writes.append((key, "POST", f"{api_url}/repos/{repo}/issues/{number}/comments"))
+            elif found[key][1] == bodies[key]:
+                results[key] = "unchanged"
+                if cache is not None:
+                    cache.put(cache_prefix + key, found[key][0], digests[key])
+            else:
+                writes.append((key, "PATCH", f"{comments_url}/{found[key][0]}"))
+        for key, resp in _send_comments(session, writes, bodies, max_workers):
+            resp.raise_for_status()
+            results[key] = "created" if resp.request.method == "POST" else "updated"
+            if cache is not None:
+                cache.put(cache_prefix + key, int(resp.json()["id"]), digests[key])
+        return results
+    finally:
+        if cache is not None:
+            cache.save()
+
+
+def _send_comments(
+    session: "requests.Session",
+    writes: Sequence[Tuple[str, str, str]],
+    bodies: Mapping[str, str],
+    max_workers: int,
+) -> List[Tuple[str, "requests.Response"]]:
+    """Send (key, method, url) comment writes, from a thread pool if there are several.
+
+    Returns:
+        (key, response) per write, in order.
+    """
+
+    def send(write: Tuple[str, str, str]) -> Tuple[str, "requests.Response"]:
+        key, method, url = write
+        return key, request(session, method, url, json={"body": bodies[key]})
+
+    if len(writes) <= 1 or max_workers <= 1:
+        return [send(write) for write in writes]
+
+    # Imported here: threads are only needed for batch reports.
+    from concurrent.futures import ThreadPoolExecutor
+
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(writes))) as pool:
+        return list(pool.map(send, writes))
+
+
+def _find_comments(
+    session: "requests.Session", api_url: str, pull_request: PullRequest, keys: Sequence[str]
+) -> Dict[str, Tuple[int, str]]:
+    """Return the ID and body of the last comment carrying the marker of each key found.
+
+    Only comments posted by the authenticated user (see ``own_logins``) are
+    considered: anyone taking part in the pull request can write the marker.
+    Follows the ``Link: rel="next"`` headers through all pages of comments.
+    """
+    markers = {_STICKY_MARKER.format(key=key): key for key in keys}
+    authors = own_logins(session, api_url)
+    url: Optional[str] = (
+        f"{api_url}/repos/{pull_request.repo}/issues/{pull_request.number}/comments"
+    )
+    params: Optional[Dict[str, int]] = {"per_page": COMMENTS_PER_PAGE}
+    found: Dict[str, Tuple[int, str]] = {}
+    while url:
+        resp = request(session, "GET", url, params=params)
+        resp.raise_for_status()
+        for comment in resp.json():
+            body = comment.get("body") or ""
+            key = markers.get(body.split("\n", 1)[0])
+            if key is not None and (comment.get("user") or {}).get("login") in authors:
+                found[key] = (int(comment["id"]), body)
+        url = resp.links.get("next", {}).get("url")
+        # The next page's URL carries the query string.
+        params = None
+    return found
+
+
+def own_logins(session: "requests.Session", api_url: str) -> FrozenSet[str]:
+    """Return the logins of the comments the session's token may take over as sticky comments.
+
+    These are the login of the authenticated user (``GET /user``), if the
+    token can read it, and ``ACTIONS_BOT_LOGIN``. The result is memoized per
+    API root and token.
+
+    Raises:
+        requests.ConnectionError: If the API cannot be reached.
+        requests.Timeout: If the request timed out.
+    """
+    memo_key = (api_url, str(session.headers.get("Authorization", "")))
+    logins = _own_logins.get(memo_key)
+    if logins is None:
+        resp = request(session, "GET", f"{api_url}/user")
+        login = None
+        if resp.ok:
+            try:
+                login = resp.json().get("login")
+            except ValueError:
+                pass
+        # A GitHub Actions token is refused (403): its comments are the bot's
+        logins = frozenset(filter(None, (login, ACTIONS_BOT_LOGIN)))
+        _own_logins[memo_key] = logins
+    return logins
+
+
+def post_check_run(
+    session: "requests.Session",
+    api_url: str,
+    pull_request: PullRequest,
+    summary_markdown: str,
+    failed: bool,
+    name: str = CHECK_RUN_NAME,
+) -> None:
+    """Report an assessment as a completed Check Run on the head commit of a pull request.
+
+    The token needs the ``checks: write`` permission.
+
+    Args:
+        session: Session authenticated for the GitHub API.
+        api_url: API root, e.g. "https://api.github.com".
+        pull_request: Pull request, with its head commit SHA.
+        summary_markdown: Check Run output. Truncated to the API limit.
+        failed: Whether the run fails the threshold: "failure" conclusion,
+            else "success".
+        name: Check Run name.
+
+    Raises:
+        ValueError: If the head commit SHA of the pull request is unknown.
+        requests.HTTPError: If the request fails.
+    """
+    if not pull_request.head_sha:
+        raise ValueError("The pull request event has no head commit SHA.")
+    if len(summary_markdown) > CHECK_RUN_SUMMARY_LIMIT:
+        note = "\n\n_Summary truncated._"
+        summary_markdown = summary_markdown[: CHECK_RUN_SUMMARY_LIMIT - len(note)] + note
+    title = summary_markdown.split("\n", 1)[0].lstrip("# ").strip() or name
+    payload = {
+        "name": name,
+        "head_sha": pull_request.head_sha,
+        "status": "completed",
+        "conclusion": "failure" if failed else "success",
+        "output": {"title": title, "summary": summary_markdown},
+    }
+    url = f"{api_url}/repos/{pull_request.repo}/check-runs"
+    request(session, "POST", url, json=payload).raise_for_status()
@@ -0,0 +1,345 @@
+"""Run metrics for Prometheus: a textfile for node_exporter, or a push.
+
+With ``--metrics-file`` or ``--metrics-url``, a ``tguard`` run collects
+counters and histograms of what it did:
+
+- ``terraguard_plans_total{outcome}``: plans assessed, by risk level, or
+  "error" for plans that could not be read
+- ``terraguard_cache_requests_total{result}``: result cache hits and misses
+- ``terraguard_patterns_evaluated_total``: risk patterns tested against
+  resource types (by this process; not those of batch workers)
+- ``terraguard_github_requests_total{method,status}``: GitHub API requests,
+  "error" standing for a failure to connect or a timeout
+- ``terraguard_plan_bytes``: size of the plan files
+- ``terraguard_plan_resource_changes``: resource changes read per plan
+- ``terraguard_run_duration_seconds``: wall time of the run
+- ``terraguard_stage_duration_seconds{stage}``: wall time of each stage
+  of the run (see ``terraguard.profiling``)
+- ``terraguard_github_request_duration_seconds{method}``: latency of each
+  GitHub API request attempt
+
+A metrics file is meant for node_exporter's textfile collector, which reads
+the Prometheus text format: the run's metrics are added to those already in
+the file, so counters and histograms accumulate over the runs on a host, and
+the file is replaced atomically. Runs updating the same file take turns
+(on systems with ``fcntl``). A push sends the metrics of the run alone in
+the OpenMetrics text format, for an endpoint that aggregates them.
+
+Nothing is collected when neither is given: the CLI only imports this module
+then, and ``observe_github_request`` returns at once.
+"""
+
+import contextlib
+import os
+import re
+import tempfile
+import threading
+from typing import Any, Dict, Iterator, List, Mapping, Optional, Sequence, Set, Tuple
+
+from terraguard.config import STDIN
+
+# Content type of pushed metrics.
+OPENMETRICS_CONTENT_TYPE = "application/openmetrics-text; version=1.0.0; charset=utf-8"
+
+# Seconds to wait for the push endpoint.
+PUSH_TIMEOUT = 5.0
+
+_BYTES_BUCKETS = tuple(float(1024 * 4**k) for k in range(11))
+_COUNT_BUCKETS = (1.0, 10.0, 30.0, 100.0, 300.0, 1e3, 3e3, 1e4, 3e4, 1e5, 3e5, 1e6)
+_SECONDS_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+_LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Type, help text and histogram buckets of each metric family, in output order.
+METRICS: Dict[str, Tuple[str, str, Tuple[float, ...]]] = {
+    "terraguard_plans": ("counter", "Plans assessed, by outcome.", ()),
+    "terraguard_cache_requests": ("counter", "Result cache lookups, by result.", ()),
+    "terraguard_patterns_evaluated": (
+        "counter",
+        "Risk patterns tested against resource types.",
+        (),
+    ),
+    "terraguard_github_requests": ("counter", "GitHub API requests, by method and status.", ()),
+    "terraguard_plan_bytes": ("histogram", "Size of the plan files assessed.", _BYTES_BUCKETS),
+    "terraguard_plan_resource_changes": (
+        "histogram",
+        "Resource changes read per plan.",
+        _COUNT_BUCKETS,
+    ),
+    "terraguard_run_duration_seconds": ("histogram", "Wall time of runs.", _SECONDS_BUCKETS),
+    "terraguard_stage_duration_seconds": (
+        "histogram",
+        "Wall time of the stages of runs, by stage.",
+        _SECONDS_BUCKETS,
+    ),
+    "terraguard_github_request_duration_seconds": (
+        "histogram",
+        "Latency of GitHub API requests, by method.",
+        _LATENCY_BUCKETS,
+    ),
+}
+
+# Sorted (name, value) label pairs of a series.
+Labels = Tuple[Tuple[str, str], ...]
+
+_SAMPLE = re.compile(r"([a-zA-Z_:][a-zA-Z0-9_:]*)(?:\{(.*)\})?[ \t]+(\S+)")
+_LABEL = re.compile(r'([a-zA-Z_][a-zA-Z0-9_]*)="((?:[^"\\]|\\.)*)"')
+_UNESCAPE = re.compile(r"\\(.)")
+
+# Metrics of the running CLI, if collected (see ``activate``).
+_active: Optional["RunMetrics"] = None
+_lock = threading.Lock()
+
+
+class RunMetrics:
+    """Counters and histograms of one or more runs."""
+
+    def __init__(self) -> None:
+        self.counters: Dict[str, Dict[Labels, float]] = {}
+        # Cumulative count of each bucket, then the +Inf bucket (the total
+        # count), then the sum of the observations, per series.
+        self.histograms: Dict[str, Dict[Labels, List[float]]] = {}
+
+    def inc(self, name: str, value: float = 1.0, **labels: str) -> None:
+        """Add ``value`` to a counter."""
+        series = self.counters.setdefault(name, {})
+        key = tuple(sorted(labels.items()))
+        series[key] = series.get(key, 0.0) + value
+
+    def observe(self, name: str, value: float, **labels: str) -> None:
+        """Add an observation to a histogram."""
+        buckets = METRICS[name][2]
+        series = self.histograms.setdefault(name, {})
+        key = tuple(sorted(labels.items()))
+        counts = series.get(key)
+        if counts is None:
+            counts = series[key] = [0.0] * (len(buckets) + 2)
+        for i, bound in enumerate(buckets):
+            if value <= bound:
+                counts[i] += 1
+        counts[-2] += 1
+        counts[-1] += value
+
+    def observe_result(self, result: Dict[str, Any]) -> None:
+        """Add an assessed plan.
+
+        Args:
+            result: Assessment result, or dictionary with "path" and "error"
+                keys (see ``batch.assess_plan_file``).
+        """
+        if "error" in result:
+            self.inc("terraguard_plans", outcome="error")
+            return
+        self.inc("terraguard_plans", outcome=result["level"])
+        if "cached" in result:
+            self.inc("terraguard_cache_requests", result="hit" if result["cached"] else "miss")
+        self.observe("terraguard_plan_resource_changes", result["stats"].get("scanned", 0))
+        if result["path"] != STDIN:
+            try:
+                self.observe("terraguard_plan_bytes", os.path.getsize(result["path"]))
+            except OSError:
+                pass
+
+    def observe_run(self, timings: Mapping[str, float], patterns_evaluated: int) -> None:
+        """Add the stage timings of a run (see ``Profiler.timings``) and its pattern tests."""
+        for stage, seconds in timings.items():
+            if stage == "total":
+                self.observe("terraguard_run_duration_seconds", seconds)
+            else:
+                self.observe("terraguard_stage_duration_seconds", seconds, stage=stage)
+        self.inc("terraguard_patterns_evaluated", patterns_evaluated)
+
+    def merge(self, other: "RunMetrics") -> None:
+        """Add the counters and histograms of ``other``."""
+        for name, series in other.counters.items():
+            mine = self.counters.setdefault(name, {})
+            for key, value in series.items():
+                mine[key] = mine.get(key, 0.0) + value
+        for name, hseries in other.histograms.items():
+            hmine = self.histograms.setdefault(name, {})
+            for key, counts in hseries.items():
+                current = hmine.get(key)
+                if current is None:
+                    hmine[key] = list(counts)
+                else:
+                    for i, count in enumerate(counts):
+                        current[i] += count
+
+    def render(self, openmetrics: bool = False) -> str:
+        """Return the metrics in the Prometheus text format, or in OpenMetrics."""
+        lines = []
+        for name, (kind, help_text, buckets) in METRICS.items():
+            if kind == "counter" and name in self.counters:
+                # Prometheus names the counter family after its sample
+                family = name if openmetrics else f"{name}_total"
+                lines.append(f"# HELP {family} {help_text}")
+                lines.append(f"# TYPE {family} counter")
+                for key, value in sorted(self.counters[name].items()):
+                    lines.append(f"{name}_total{_labels(key)} {_number(value)}")
+            elif kind == "histogram" and name in self.histograms:
+                lines.append(f"# HELP {name} {help_text}")
+                lines.append(f"# TYPE {name} histogram")
+                for key, counts in sorted(self.histograms[name].items()):
+                    for bound, count in zip((*buckets, float("inf")), counts):
+                        le = (("le", "+Inf" if bound == float("inf") else repr(bound)),)
+                        lines.append(f"{name}_bucket{_labels(key + le)} {_number(count)}")
+                    lines.append(f"{name}_count{_labels(key)} {_number(counts[-2])}")
+                    lines.append(f"{name}_sum{_labels(key)} {_number(counts[-1])}")
+        if openmetrics:
+            lines.append("# EOF")
+        return "\n".join(lines) + "\n"
+
+    @classmethod
+    def parse(cls, text: str) -> "RunMetrics":
+        """Read metrics rendered by ``render``.
+
+        Samples of families not in ``METRICS``, or of histograms with other
+        buckets, are left out.
+        """
+        metrics = cls()
+        # Histogram series written with other buckets; their counts cannot be added to
+        skipped: Set[Tuple[str, Labels]] = set()
+        for line in text.splitlines():
+            match = _SAMPLE.fullmatch(line.strip())
+            if match is None:
+                continue
+            sample, label_text, value_text = match.groups()
+            try:
+                value = float(value_text)
+            except ValueError:
+                continue
+            labels = {
+                label: _UNESCAPE.sub(_unescape, raw)
+                for label, raw in _LABEL.findall(label_text or "")
+            }
+            name, _, suffix = sample.rpartition("_")
+            spec = METRICS.get(name)
+            if spec is None:
+                continue
+            if spec[0] == "counter" and suffix == "total":
+                metrics.counters.setdefault(name, {})[tuple(sorted(labels.items()))] = value
+            elif spec[0] == "histogram" and suffix in ("bucket", "sum"):
+                le = labels.pop("le", None)
+                key = tuple(sorted(labels.items()))
+                if (name, key) in skipped:
+                    continue
+                counts = metrics.histograms.setdefault(name, {}).setdefault(
+                    key, [0.0] * (len(spec[2]) + 2)
+                )
+                bounds = [repr(bound) for bound in spec[2]]
+                if suffix == "sum":
+                    counts[-1] = value
+                elif le == "+Inf":
+                    counts[-2] = value
+                elif le in bounds:
+                    counts[bounds.index(le)] = value
+                else:
+                    skipped.add((name, key))
+                    del metrics.histograms[name][key]
+        return metrics
+
+
+def activate(metrics: Optional[RunMetrics]) -> None:
+    """Collect the metrics of this process in ``metrics``, or stop collecting with None.
+
+    ``observe_results`` and ``observe_github_request`` add to the active
+    metrics; the CLI activates them when they are to be exported.
+    """
+    global _active
+    _active = metrics
+
+
+def observe_results(results: Sequence[Dict[str, Any]]) -> None:
+    """Add assessed plans to the collected metrics, if any (see ``RunMetrics.observe_result``)."""
+    if _active is None:
+        return
+    with _lock:
+        for result in results:
+            _active.observe_result(result)
+
+
+def observe_github_request(method: str, status: str, seconds: float) -> None:
+    """Count a GitHub API request attempt, if metrics are collected. Thread-safe."""
+    if _active is None:
+        return
+    with _lock:
+        _active.inc("terraguard_github_requests", method=method, status=status)
+        _active.observe("terraguard_github_request_duration_seconds", seconds, method=method)
+
+
+def write_textfile(metrics: RunMetrics, path: str) -> None:
+    """Add metrics to those of a textfile, replacing it atomically.
+
+    Raises:
+        OSError: If the file cannot be read or written.
+    """
+    directory = os.path.dirname(path) or "."
+    with _locked(path):
+        previous = RunMetrics()
+        try:
+            with open(path, encoding="utf-8") as f:
+                previous = RunMetrics.parse(f.read())
+        except FileNotFoundError:
+            pass
+        previous.merge(metrics)
+        # Hidden and not ending in .prom, so the collector skips it
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                f.write(previous.render())
+            os.chmod(tmp_path, 0o644)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+
+def push(metrics: RunMetrics, url: str, timeout: float = PUSH_TIMEOUT) -> None:
+    """POST metrics in the OpenMetrics text format to ``url``.
+
+    Raises:
+        OSError: If the request fails.
+        ValueError: If the URL is invalid.
+    """
+    # Imported here: urllib.request is only needed for pushes.
+    import urllib.request
+
+    request = urllib.request.Request(
+        url,
+        data=metrics.render(openmetrics=True).encode(),
+        headers={"Content-Type": OPENMETRICS_CONTENT_TYPE},
+        method="POST",
+    )
+    with urllib.request.urlopen(request, timeout=timeout) as response:
+        response.read()
+
+
+@contextlib.contextmanager
+def _locked(path: str) -> Iterator[None]:
+    """Hold an exclusive lock on ``path``'s lock file, where ``fcntl`` is available."""
+    try:
+        import fcntl
+    except ImportError:
+        yield
+        return
+    with open(f"{path}.lock", "a") as lock:
+        fcntl.flock(lock.fileno(), fcntl.LOCK_EX)
+        yield
+
+
+def _labels(key: Labels) -> str:
+    if not key:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in key) + "}"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _unescape(match: "re.Match[str]") -> str:
+    char = match.group(1)
+    return "\n" if char == "n" else char
+
+
+def _number(value: float) -> str:
+    return str(int(value)) if value.is_integer() and abs(value) < 1e15 else repr(value)
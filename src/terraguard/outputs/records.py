@@ -0,0 +1,230 @@
+"""Machine-readable outputs: JSON Lines and SARIF.
+
+Both are written record by record to a text stream as each plan's changes
+are read from its ``ChangeTable``, so memory use does not grow with the
+number of resources:
+
+- JSON Lines (``JsonLinesWriter``): one ``"resource"`` record per changed
+  resource, then one ``"summary"`` record per plan (or ``"error"`` record for
+  a plan that could not be read), and in batch mode a final ``"aggregate"``
+  record with the overall verdict.
+- SARIF 2.1.0 (``SarifWriter``): one result per MEDIUM, HIGH or CRITICAL
+  risk resource change, for code scanning tools. The results array is
+  streamed; the plan summaries, which are small, are written after it in the
+  properties of the run.
+
+Changes already reviewed in a baseline plan are flagged ``"reviewed"`` in
+JSON Lines and left out of SARIF.
+"""
+
+import json
+from abc import ABC, abstractmethod
+from typing import IO, Any, Dict, List, Optional
+
+from terraguard.config import RESOURCE_RISK_LEVEL_ORDER
+from terraguard.terraform_plan.table import (
+    CHANGED,
+    CREATE,
+    DELETE,
+    DESTROY,
+    LEVEL_MASK,
+    MEDIUM,
+    REVIEWED,
+    UPDATE,
+    ChangeTable,
+    actions_from_bits,
+)
+
+SARIF_SCHEMA = "https://json.schemastore.org/sarif-2.1.0.json"
+
+# Statistics copied to summary records; the detail lists are left out, the
+# resource records holding the same information.
+SUMMARY_STATS = (
+    "total_resources",
+    "creates",
+    "updates",
+    "deletes",
+    "high_risk_changes",
+    "critical_changes",
+    "high_risk_deletes",
+    "critical_deletes",
+    "blast_radius",
+    "drifted_resources",
+    "sensitive_drifts",
+    "unmasked_outputs",
+    "baseline",
+    "partial",
+    "scanned",
+)
+
+# SARIF rule of each resource risk level reported: (id, level, description)
+_SARIF_RULES = {
+    "CRITICAL": ("critical-resource-change", "error", "A CRITICAL risk resource changes."),
+    "HIGH": ("high-risk-resource-change", "warning", "A HIGH risk resource changes."),
+    "MEDIUM": ("medium-risk-resource-change", "note", "A MEDIUM risk resource changes."),
+}
+
+_encode = json.JSONEncoder(ensure_ascii=False, separators=(",", ":")).encode
+
+
+class RecordWriter(ABC):
+    """Base class of the record writers.
+
+    Call ``write_result`` for each assessed plan, then ``close`` once.
+    """
+
+    def __init__(self, out: IO[str]) -> None:
+        self.out = out
+
+    @abstractmethod
+    def write_result(self, result: Dict[str, Any], table: Optional[ChangeTable]) -> None:
+        """Write the records of one plan.
+
+        Args:
+            result: Assessment result with a "path" key, or a dictionary
+                with "path" and "error" keys.
+            table: Change table of the plan, or None to write its summary
+                only.
+        """
+
+    def close(self, aggregate: Optional[Dict[str, Any]] = None) -> None:
+        """Finish the output, with the overall verdict of a batch if given."""
+        self.out.flush()
+
+
+class JsonLinesWriter(RecordWriter):
+    """Writes one JSON object per line."""
+
+    def write_result(self, result: Dict[str, Any], table: Optional[ChangeTable]) -> None:
+        path = result["path"]
+        write = self.out.write
+        if "error" in result:
+            write(_encode({"record": "error", "plan": path, "error": result["error"]}) + "\n")
+            return
+        if table is not None:
+            # Rows with the same code share their level and actions
+            fields: Dict[int, Dict[str, Any]] = {}
+            codes = table.codes
+            for row in table.select(CHANGED, reviewed=None):
+                code = codes[row]
+                shared = fields.get(code)
+                if shared is None:
+                    shared = fields[code] = {
+                        "actions": actions_from_bits(code),
+                        "risk_level": RESOURCE_RISK_LEVEL_ORDER[code & LEVEL_MASK],
+                        "reviewed": bool(code & REVIEWED),
+                    }
+                record = {
+                    "record": "resource",
+                    "plan": path,
+                    "address": table.address(row),
+                    "type": table.rtype(row),
+                    "module": table.module(row),
+                }
+                record.update(shared)
+                write(_encode(record) + "\n")
+        write(_encode(summary_record(result)) + "\n")
+
+    def close(self, aggregate: Optional[Dict[str, Any]] = None) -> None:
+        if aggregate is not None:
+            self.out.write(_encode({"record": "aggregate", **aggregate}) + "\n")
+        self.out.flush()
+
+
+class SarifWriter(RecordWriter):
+    """Writes a SARIF 2.1.0 log with one run, streaming its results."""
+
+    def __init__(self, out: IO[str]) -> None:
+        super().__init__(out)
+        self._summaries: List[Dict[str, Any]] = []
+        self._first = True
+        rules = [
+            {
+                "id": rule_id,
+                "shortDescription": {"text": description},
+                "defaultConfiguration": {"level": level},
+            }
+            for rule_id, level, description in _SARIF_RULES.values()
+        ]
+        driver = {"name": "terraguard", "rules": rules}
+        # The results array and the log are closed by close()
+        out.write(
+            f'{{"$schema":{_encode(SARIF_SCHEMA)},"version":"2.1.0",'
+            f'"runs":[{{"tool":{_encode({"driver": driver})},"results":['
+        )
+
+    def write_result(self, result: Dict[str, Any], table: Optional[ChangeTable]) -> None:
+        if "error" in result:
+            self._summaries.append(
+                {"record": "error", "plan": result["path"], "error": result["error"]}
+            )
+            return
+        self._summaries.append(summary_record(result))
+        if table is None:
+            return
+        path = result["path"]
+        codes = table.codes
+        write = self.out.write
+        for row in table.select(CHANGED, MEDIUM):
+            code = codes[row]
+            risk_level = RESOURCE_RISK_LEVEL_ORDER[code & LEVEL_MASK]
+            rule_id, level, _ = _SARIF_RULES[risk_level]
+            address = table.address(row)
+            sarif_result = {
+                "ruleId": rule_id,
+                "level": level,
+                "message": {
+                    "text": f"{risk_level} risk resource `{address}` ({table.rtype(row)}) "
+                    f"will be {_past_tense(code)}."
+                },
+                "locations": [
+                    {
+                        "physicalLocation": {"artifactLocation": {"uri": path}},
+                        "logicalLocations": [{"fullyQualifiedName": address, "kind": "resource"}],
+                    }
+                ],
+                "partialFingerprints": {"resourceAddress/v1": address},
+            }
+            write(_encode(sarif_result) if self._first else "," + _encode(sarif_result))
+            self._first = False
+
+    def close(self, aggregate: Optional[Dict[str, Any]] = None) -> None:
+        properties: Dict[str, Any] = {"plans": self._summaries}
+        if aggregate is not None:
+            properties["aggregate"] = aggregate
+        self.out.write('],"properties":' + _encode(properties) + "}]}\n")
+        self.out.flush()
+
+
+def record_writer(output_format: str, out: IO[str]) -> RecordWriter:
+    """Return the writer of an output format (one of ``config.RECORD_FORMATS``)."""
+    if output_format == "jsonl":
+        return JsonLinesWriter(out)
+    if output_format == "sarif":
+        return SarifWriter(out)
+    raise ValueError(f"Unknown output format {output_format!r}")
+
+
+def summary_record(result: Dict[str, Any]) -> Dict[str, Any]:
+    """Return the summary record of an assessment result."""
+    stats = result["stats"]
+    return {
+        "record": "summary",
+        "plan": result["path"],
+        "level": result["level"],
+        "score": result["score"],
+        "reasons": result["reasons"],
+        "stats": {key: stats.get(key) for key in SUMMARY_STATS},
+    }
+
+
+def _past_tense(code: int) -> str:
+    if code & DESTROY:
+        return "deleted"
+    if code & DELETE:
+        return "replaced"
+    if code & CREATE:
+        return "created"
+    if code & UPDATE:
+        return "updated"
+    return "changed"
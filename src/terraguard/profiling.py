@@ -0,0 +1,234 @@
+"""Per-stage timing and memory instrumentation.
+
+A ``Profiler`` records the wall time, CPU time and peak allocation of named
+stages of a run::
+
+    profiler = Profiler(enabled=True)
+    profiler.start()
+    with profiler.stage("parse"):
+        ...
+    profiler.stop()
+    print(profiler.format_report())
+
+When disabled, ``stage`` returns a shared no-op context manager, so
+instrumented code paths cost one method call per stage. Peak allocation is
+measured with ``tracemalloc``, which slows the profiled run down; wall and
+CPU times of a profiled run are therefore only comparable with each other.
+A profiler created with ``trace_memory=False`` only records times, at no
+noticeable cost, e.g. for the run history (see ``terraguard.history``).
+"""
+
+import contextlib
+import json
+import sys
+import time
+import tracemalloc
+from dataclasses import asdict, dataclass
+from typing import Any, ContextManager, Dict, Iterable, Iterator, List, Optional, TypeVar
+
+_NULL_STAGE: ContextManager[None] = contextlib.nullcontext()
+
+T = TypeVar("T")
+
+
+@dataclass
+class StageRecord:
+    """Measurements of one stage."""
+
+    name: str
+    wall_seconds: float
+    cpu_seconds: float
+    # Highest traced memory above the level at stage start, in bytes; None for
+    # stages interleaved with others (see Profiler.timed_iter) and when memory is
+    # not traced.
+    peak_alloc_bytes: Optional[int]
+    # Nesting depth; 0 for top-level stages.
+    depth: int = 0
+
+
+class Profiler:
+    """Collects per-stage measurements, optionally with a cProfile dump."""
+
+    def __init__(
+        self, enabled: bool = False, dump_path: Optional[str] = None, trace_memory: bool = True
+    ) -> None:
+        """Create a profiler.
+
+        Args:
+            enabled: Whether to record stages. A profiler with a ``dump_path``
+                is always enabled.
+            dump_path: Optional path to write cProfile statistics of the whole
+                run to, readable with ``python -m pstats`` or snakeviz.
+            trace_memory: Whether to measure peak allocations; stages of a
+                profiler created without are only timed.
+        """
+        self.enabled = enabled or dump_path is not None
+        self.dump_path = dump_path
+        self.trace_memory = trace_memory
+        self._running = False
+        self.records: List[StageRecord] = []
+        self._depth = 0
+        # Peak traced memory of the enclosing stages, folded in as nested stages end.
+        self._outer_peaks: List[int] = []
+        # Highest traced memory seen before the last peak reset.
+        self._max_peak = 0
+        self._cprofile: Any = None
+        self._started_wall = 0.0
+        self._started_cpu = 0.0
+        self._total: Optional[StageRecord] = None
+
+    def start(self) -> None:
+        """Start tracing memory (and cProfile, if dumping). No-op when disabled."""
+        if not self.enabled:
+            return
+        if self.trace_memory:
+            tracemalloc.start()
+        if self.dump_path is not None:
+            # Imported here: cProfile is only needed for dumps.
+            import cProfile
+
+            self._cprofile = cProfile.Profile()
+            self._cprofile.enable()
+        self._started_wall = time.perf_counter()
+        self._started_cpu = time.process_time()
+        self._running = True
+
+    def stop(self) -> None:
+        """Stop tracing and write the cProfile dump, if any. No-op when disabled."""
+        if not self._running:
+            return
+        self._running = False
+        if self._cprofile is not None:
+            self._cprofile.disable()
+            self._cprofile.dump_stats(self.dump_path)
+        peak = None
+        if tracemalloc.is_tracing():
+            peak = max(self._max_peak, tracemalloc.get_traced_memory()[1])
+            tracemalloc.stop()
+        self._total = StageRecord(
+            name="total",
+            wall_seconds=time.perf_counter() - self._started_wall,
+            cpu_seconds=time.process_time() - self._started_cpu,
+            peak_alloc_bytes=peak,
+        )
+
+    def stage(self, name: str) -> ContextManager[None]:
+        """Return a context manager measuring the stage ``name``.
+
+        Stages may be nested; a stage's peak allocation includes that of its
+        nested stages.
+        """
+        if not self.enabled:
+            return _NULL_STAGE
+        return self._measure(name)
+
+    @contextlib.contextmanager
+    def _measure(self, name: str) -> Iterator[None]:
+        tracing = tracemalloc.is_tracing()
+        base = 0
+        if tracing:
+            base, peak = tracemalloc.get_traced_memory()
+            if self._outer_peaks:
+                self._outer_peaks[-1] = max(self._outer_peaks[-1], peak)
+            self._max_peak = max(self._max_peak, peak)
+            _reset_peak()
+        self._outer_peaks.append(0)
+        record = StageRecord(name, 0.0, 0.0, 0 if tracing else None, self._depth)
+        self.records.append(record)
+        self._depth += 1
+        wall, cpu = time.perf_counter(), time.process_time()
+        try:
+            yield
+        finally:
+            record.wall_seconds = time.perf_counter() - wall
+            record.cpu_seconds = time.process_time() - cpu
+            self._depth -= 1
+            nested_peak = self._outer_peaks.pop()
+            if tracing and tracemalloc.is_tracing():
+                peak = max(nested_peak, tracemalloc.get_traced_memory()[1])
+                record.peak_alloc_bytes = max(0, peak - base)
+                if self._outer_peaks:
+                    self._outer_peaks[-1] = max(self._outer_peaks[-1], peak)
+                self._max_peak = max(self._max_peak, peak)
+
+    def timed_iter(self, name: str, iterable: Iterable[T]) -> Iterable[T]:
+        """Wrap ``iterable`` to record the time spent producing its items as stage ``name``.
+
+        For producers interleaved with their consumer, such as a streaming
+        parser feeding the summarizer. The stage is recorded as nested in the
+        stage active when iteration starts; its peak allocation is not
+        measured separately. Returns ``iterable`` unchanged when disabled.
+        """
+        if not self.enabled:
+            return iterable
+        return self._timed_iter(name, iterable)
+
+    def _timed_iter(self, name: str, iterable: Iterable[T]) -> Iterator[T]:
+        record = StageRecord(name, 0.0, 0.0, None, self._depth)
+        self.records.append(record)
+        iterator = iter(iterable)
+        perf_counter, process_time = time.perf_counter, time.process_time
+        while True:
+            wall, cpu = perf_counter(), process_time()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                return
+            finally:
+                record.wall_seconds += perf_counter() - wall
+                record.cpu_seconds += process_time() - cpu
+            yield item
+
+    def timings(self) -> Dict[str, float]:
+        """Return the wall time of each stage so far, in seconds, and of the run as "total".
+
+        The times of stages of the same name, such as those of each plan of
+        a batch, are added up.
+        """
+        timings: Dict[str, float] = {}
+        for record in self.records:
+            timings[record.name] = timings.get(record.name, 0.0) + record.wall_seconds
+        if self._total is not None:
+            timings["total"] = self._total.wall_seconds
+        elif self._running:
+            timings["total"] = time.perf_counter() - self._started_wall
+        return timings
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Return the measurements as a JSON-serializable dictionary."""
+        return {
+            "stages": [asdict(record) for record in self.records],
+            "total": asdict(self._total) if self._total else None,
+            "cprofile_dump": self.dump_path,
+        }
+
+    def format_report(self, fmt: str = "text") -> str:
+        """Format the measurements as a text table or, with ``fmt="json"``, as JSON."""
+        if fmt == "json":
+            return json.dumps(self.to_dict(), indent=2)
+        records = self.records + ([self._total] if self._total else [])
+        width = max([len(r.name) + 2 * r.depth for r in records] + [5])
+        lines = [f"{'stage':<{width}}  {'wall ms':>10}  {'cpu ms':>10}  {'peak KiB':>10}"]
+        for r in records:
+            label = "  " * r.depth + r.name
+            lines.append(
+                f"{label:<{width}}  {r.wall_seconds * 1000:>10.2f}  "
+                f"{r.cpu_seconds * 1000:>10.2f}  {_kib(r.peak_alloc_bytes):>10}"
+            )
+        if self.dump_path:
+            lines.append(f"cProfile statistics written to {self.dump_path}")
+        return "\n".join(lines)
+
+
+def _kib(size: Optional[int]) -> str:
+    return "-" if size is None else f"{size / 1024:.1f}"
+
+
+def _reset_peak() -> None:
+    """Reset the traced memory peak (tracemalloc.reset_peak needs Python 3.9)."""
+    if sys.version_info >= (3, 9):
+        tracemalloc.reset_peak()
+
+
+# Shared disabled profiler, used when callers do not pass one.
+NULL_PROFILER = Profiler()
@@ -1,4 +1,18 @@
-from .risk import load_risk_config
-from .rules import assess_risk
+from .attributes import AttributeMatcher
+from .layers import RiskConfigError, load_layered_config, merge_layers
+from .risk import RiskMatcher, get_risk_matcher, load_risk_config
+from .rules import RuleEngine, assess_many, assess_risk, get_rule_engine
 
-__all__ = ["load_risk_config", "assess_risk"]
+__all__ = [
+    "load_risk_config",
+    "load_layered_config",
+    "merge_layers",
+    "RiskConfigError",
+    "get_risk_matcher",
+    "RiskMatcher",
+    "AttributeMatcher",
+    "assess_risk",
+    "assess_many",
+    "get_rule_engine",
+    "RuleEngine",
+]
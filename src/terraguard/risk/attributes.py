@@ -0,0 +1,283 @@
+"""Attribute-level risk rules.
+
+Attribute rules raise the risk level of a resource change when specific
+attributes change, e.g. ``storage_encrypted`` on an ``aws_db_instance``
+rather than any of its tags. They are declared in the risk configuration::
+
+    "attribute_risk_rules": [
+      {
+        "resource_pattern": "^aws_db_instance$",
+        "attribute": "publicly_accessible",
+        "risk_level": "CRITICAL",
+        "reason": "Database exposure changes."
+      }
+    ]
+
+Attribute paths are dot-separated keys and list indices, with ``*`` matching
+any key or index (``ingress.*.cidr_blocks``). An attribute counts as changed
+if its value differs between ``change.before`` and ``change.after``, if it is
+marked in ``change.after_unknown``, or if its marking in
+``change.before_sensitive`` and ``change.after_sensitive`` differs.
+
+The rule paths applying to a resource type are merged into a trie, and the
+before/after bodies are only walked along the trie: subtrees no rule refers
+to are never visited, so large nested bodies (IAM policy documents,
+Kubernetes manifests) cost nothing unless a rule points into them.
+"""
+
+from typing import Any, Callable, Dict, Iterable, List, Mapping, Optional, Sequence, Tuple
+
+from terraguard.config import RESOURCE_RISK_LEVEL_ORDER
+
+# (risk_level, reason, changed attribute path) of a matched rule.
+AttributeMatch = Tuple[str, str, str]
+
+
+class _PathNode:
+    """Node of the attribute path trie of a resource type."""
+
+    __slots__ = ("children", "wildcard", "rules", "is_leaf")
+
+    def __init__(self) -> None:
+        self.children: Dict[str, _PathNode] = {}
+        self.wildcard: Optional[_PathNode] = None
+        # Positions (in priority order) of the rules ending at this node.
+        self.rules: List[int] = []
+        self.is_leaf = True
+
+    def insert(self, path: Sequence[str], position: int) -> None:
+        node = self
+        for key in path:
+            node.is_leaf = False
+            if key == "*":
+                if node.wildcard is None:
+                    node.wildcard = _PathNode()
+                node = node.wildcard
+            else:
+                node = node.children.setdefault(key, _PathNode())
+        node.rules.append(position)
+
+
+class AttributeMatcher:
+    """Compiled ``attribute_risk_rules`` of a risk configuration."""
+
+    def __init__(
+        self,
+        rules: Sequence[Mapping[str, Any]],
+        compile_pattern: Callable[[str], Tuple[Optional[str], Callable[[str], Any]]],
+    ) -> None:
+        """Compile attribute rules.
+
+        Args:
+            rules: The ``attribute_risk_rules`` list of a configuration.
+            compile_pattern: Function compiling a resource type pattern into
+                (exact literal or None, match function), as used for
+                ``resource_risk_patterns``.
+
+        Raises:
+            ValueError: If a rule has no attribute or an unknown risk level.
+            re.error: If a resource pattern is not a valid regular expression.
+        """
+        candidates = []
+        for index, rule in enumerate(rules):
+            attribute = rule.get("attribute")
+            if not attribute:
+                raise ValueError(f"Attribute risk rule #{index + 1} has no 'attribute'.")
+            level = rule.get("risk_level", "LOW")
+            if level not in RESOURCE_RISK_LEVEL_ORDER:
+                raise ValueError(
+                    f"Invalid risk level '{level}'. Must be one of {RESOURCE_RISK_LEVEL_ORDER}."
+                )
+            _, match = compile_pattern(rule.get("resource_pattern", ".*"))
+            actions = rule.get("actions")
+            candidates.append(
+                (
+                    -RESOURCE_RISK_LEVEL_ORDER.index(level),
+                    -index,
+                    match,
+                    attribute.split("."),
+                    frozenset(actions) if actions is not None else None,
+                    (level, rule.get("reason", f"Attribute '{attribute}' changed.")),
+                )
+            )
+        # Highest level first and, within a level, the rule listed last first.
+        candidates.sort(key=lambda c: (c[0], c[1]))
+        self._rules = [(c[2], c[3], c[4], c[5]) for c in candidates]
+        self._tries: Dict[str, Tuple[Optional[_PathNode], bool]] = {}
+
+    def _trie(self, rtype: str) -> Tuple[Optional[_PathNode], bool]:
+        """Return the path trie of the rules applying to ``rtype`` (memoized).
+
+        Returns:
+            The trie root, or None if no rule applies, and whether any of the
+            rules has an ``actions`` list.
+        """
+        entry = self._tries.get(rtype)
+        if entry is not None:
+            return entry
+        root: Optional[_PathNode] = None
+        with_actions = False
+        for position, (match, path, actions, _) in enumerate(self._rules):
+            if match(rtype):
+                if root is None:
+                    root = _PathNode()
+                root.insert(path, position)
+                with_actions = with_actions or actions is not None
+        entry = self._tries[rtype] = (root, with_actions)
+        return entry
+
+    def match(
+        self, rtype: str, actions: Sequence[str], change: Mapping[str, Any]
+    ) -> Optional[AttributeMatch]:
+        """Return the highest-level rule matched by a resource change, if any.
+
+        Rules without an ``actions`` list only apply to changes that have both
+        a ``before`` and an ``after`` body (updates and replacements).
+
+        Args:
+            rtype: Terraform resource type.
+            actions: The change's actions.
+            change: The ``change`` object of the resource change.
+
+        Returns:
+            (risk_level, reason, attribute path) of the matched rule, or None.
+        """
+        root, with_actions = self._trie(rtype)
+        if root is None:
+            return None
+        before = change.get("before")
+        after = change.get("after")
+        both = before is not None and after is not None
+        if not both and not with_actions:
+            # Creates and deletes: only rules with an actions list apply.
+            return None
+        hits: Dict[int, str] = {}
+        _walk(
+            root,
+            before,
+            after,
+            _marker(change.get("after_unknown")),
+            _marker(change.get("before_sensitive")),
+            _marker(change.get("after_sensitive")),
+            [],
+            hits,
+        )
+        for position in sorted(hits):
+            _, _, rule_actions, (level, reason) = self._rules[position]
+            if rule_actions is None and not both:
+                continue
+            if rule_actions is not None and rule_actions.isdisjoint(actions):
+                continue
+            return level, reason, hits[position]
+        return None
+
+
+def _child(value: Any, key: str) -> Any:
+    """Return ``value[key]`` for a dict key or list index, or None."""
+    if isinstance(value, dict):
+        return value.get(key)
+    if isinstance(value, list) and key.isdigit():
+        index = int(key)
+        return value[index] if index < len(value) else None
+    return None
+
+
+def _marker(value: Any) -> Any:
+    """Normalize an after_unknown / *_sensitive subtree: None if it marks nothing directly."""
+    if value is True or (value and isinstance(value, (dict, list))):
+        return value
+    return None
+
+
+def _marker_child(marker: Any, key: str) -> Any:
+    """Like ``_child`` for normalized markers, which mark whole subtrees with True."""
+    if marker is None or marker is True:
+        return marker
+    return _marker(_child(marker, key))
+
+
+def _keys(*values: Any) -> List[str]:
+    """Return the union of the keys and list indices of ``values``, as strings."""
+    keys: Dict[str, None] = {}
+    for value in values:
+        if isinstance(value, dict):
+            keys.update(dict.fromkeys(value))
+        elif isinstance(value, list):
+            keys.update(dict.fromkeys(map(str, range(len(value)))))
+    return list(keys)
+
+
+def _marked(value: Any) -> bool:
+    """Return whether an after_unknown / *_sensitive subtree marks anything."""
+    if value is True:
+        return True
+    if isinstance(value, dict):
+        return any(_marked(v) for v in value.values())
+    if isinstance(value, list):
+        return any(_marked(v) for v in value)
+    return False
+
+
+def _changed(
+    before: Any, after: Any, unknown: Any, before_sensitive: Any, after_sensitive: Any
+) -> bool:
+    """Return whether an attribute changed, given its values and normalized markers."""
+    return (
+        before != after
+        or (unknown is not None and _marked(unknown))
+        or (
+            before_sensitive is not after_sensitive
+            and _marked(before_sensitive) != _marked(after_sensitive)
+        )
+    )
+
+
+def _walk(
+    node: _PathNode,
+    before: Any,
+    after: Any,
+    unknown: Any,
+    before_sensitive: Any,
+    after_sensitive: Any,
+    path: List[str],
+    hits: Dict[int, str],
+) -> None:
+    """Record in ``hits`` the rules of ``node`` and its descendants whose paths changed."""
+    if node.rules and _changed(before, after, unknown, before_sensitive, after_sensitive):
+        for position in node.rules:
+            hits.setdefault(position, ".".join(path))
+
+    edges: Iterable[Tuple[str, _PathNode]] = node.children.items()
+    if node.wildcard is not None:
+        wildcard = node.wildcard
+        edges = list(edges) + [(key, wildcard) for key in _keys(before, after, unknown)]
+    for key, child in edges:
+        child_before = before.get(key) if type(before) is dict else _child(before, key)
+        child_after = after.get(key) if type(after) is dict else _child(after, key)
+        child_unknown = _marker_child(unknown, key)
+        child_before_sensitive = _marker_child(before_sensitive, key)
+        child_after_sensitive = _marker_child(after_sensitive, key)
+        if child.is_leaf:
+            # Most rule paths end here; avoid a recursive call.
+            if _changed(
+                child_before,
+                child_after,
+                child_unknown,
+                child_before_sensitive,
+                child_after_sensitive,
+            ):
+                for position in child.rules:
+                    hits.setdefault(position, ".".join(path + [key]))
+            continue
+        path.append(key)
+        _walk(
+            child,
+            child_before,
+            child_after,
+            child_unknown,
+            child_before_sensitive,
+            child_after_sensitive,
+            path,
+            hits,
+        )
+        path.pop()
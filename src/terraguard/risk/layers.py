@@ -0,0 +1,274 @@
+"""Layered risk configurations and their compiled cache.
+
+A risk configuration can be assembled from several files, or layers: the
+shared base configuration, then for instance the organization's, the
+repository's and the stack's overrides. Layers are merged in order, each
+taking precedence over the ones before it:
+
+- ``resource_risk_patterns`` are appended, an entry whose ``pattern`` is
+  already listed replacing the earlier entry;
+- ``attribute_risk_rules`` are appended likewise, entries being identified
+  by their ``resource_pattern`` and ``attribute``;
+- any other key, ``scoring_rules`` included, replaces the earlier value.
+
+Each layer is validated when read, so that an error names the file and the
+pattern or rule at fault rather than surfacing later as a failed match.
+
+With a cache directory, the merged configuration is written to a JSON
+file::
+
+    <cache_dir>/risk-config-v3/<key>.json
+
+the key being derived from the paths of the layers. Later runs with the
+same layers load it without reading, parsing, validating or merging the
+layers. The entry records the modification time, size and SHA-256 hash of
+every layer: a layer whose modification time and size are unchanged is
+trusted, one with a new modification time is hashed, and the entry is only
+discarded if the hash differs.
+
+The entry holds data only. Cache directories are shared between CI jobs,
+so nothing read from them is executed: the scoring rules are compiled
+again from the cached configuration on first use, by ``get_rule_engine``,
+and patterns by ``get_risk_matcher``.
+"""
+
+import hashlib
+import json
+import os
+import re
+import tempfile
+import time
+from typing import Any, Dict, List, Mapping, Optional, Sequence, Tuple
+
+from terraguard.config import RESOURCE_RISK_LEVEL_ORDER
+
+# Bump when the layout or the content of cache entries changes.
+CACHE_FORMAT = 3
+
+# Fields identifying the entries of the merged lists, with their defaults.
+_ENTRY_KEYS: Dict[str, Tuple[Tuple[str, Optional[str]], ...]] = {
+    "resource_risk_patterns": (("pattern", None),),
+    "attribute_risk_rules": (("resource_pattern", ".*"), ("attribute", None)),
+}
+
+# Layers modified less than this before an entry is written may change again
+# within the resolution of their modification time; they are hashed on the
+# next load.
+_RACY_NS = 2_000_000_000
+
+# (path, mtime_ns, size, sha256) of a layer.
+Source = Tuple[str, int, int, str]
+
+
+class RiskConfigError(ValueError):
+    """Raised when a risk configuration layer cannot be read or is invalid."""
+
+    def __init__(self, path: str, message: str) -> None:
+        super().__init__(f"Risk configuration {path}: {message}")
+        self.path = path
+
+
+def load_layered_config(paths: Sequence[str], cache_dir: Optional[str] = None) -> Dict[str, Any]:
+    """Load, validate and merge risk configuration layers.
+
+    Args:
+        paths: Paths of the layers, the base configuration first.
+        cache_dir: Optional directory of the compiled configuration cache.
+
+    Returns:
+        The merged configuration dictionary.
+
+    Raises:
+        RiskConfigError: If a layer cannot be read or is invalid.
+    """
+    paths = [os.path.abspath(path) for path in paths]
+    cache_path = _cache_path(cache_dir, paths) if cache_dir else None
+    if cache_path is not None:
+        config = _load_cached(cache_path, paths)
+        if config is not None:
+            return config
+
+    layers = []
+    sources: List[Source] = []
+    for path in paths:
+        layer, source = _read_layer(path)
+        validate_layer(path, layer)
+        layers.append(layer)
+        sources.append(source)
+    config = merge_layers(layers)
+    if cache_path is not None:
+        _write_cached(cache_path, sources, config)
+    return config
+
+
+def merge_layers(layers: Sequence[Mapping[str, Any]]) -> Dict[str, Any]:
+    """Merge risk configuration layers, later layers taking precedence.
+
+    See the module docstring for the merge rules.
+    """
+    merged: Dict[str, Any] = {}
+    for layer in layers:
+        for key, value in layer.items():
+            fields = _ENTRY_KEYS.get(key)
+            if fields is not None and key in merged:
+                overridden = {_entry_key(entry, fields) for entry in value}
+                value = [
+                    entry for entry in merged[key] if _entry_key(entry, fields) not in overridden
+                ] + list(value)
+            merged[key] = value
+    return merged
+
+
+def validate_layer(path: str, config: Mapping[str, Any]) -> None:
+    """Check a risk configuration layer.
+
+    Args:
+        path: Path of the layer, for error messages.
+        config: The parsed layer.
+
+    Raises:
+        RiskConfigError: If a risk level, pattern or rule is invalid.
+    """
+    if "default_risk_level" in config:
+        _check_level(path, "default_risk_level", config["default_risk_level"])
+    for index, item in enumerate(_entries(path, config, "resource_risk_patterns")):
+        pattern = _check_pattern(path, f"resource_risk_patterns[{index}]", item.get("pattern"))
+        _check_level(path, f"pattern '{pattern}'", item.get("risk_level", "LOW"))
+    for index, rule in enumerate(_entries(path, config, "attribute_risk_rules")):
+        where = f"attribute_risk_rules[{index}]"
+        pattern = _check_pattern(path, where, rule.get("resource_pattern", ".*"))
+        where = f"{where} (resource pattern '{pattern}')"
+        attribute = rule.get("attribute")
+        if not isinstance(attribute, str) or not attribute:
+            raise RiskConfigError(path, f"{where} has no 'attribute'.")
+        _check_level(path, where, rule.get("risk_level", "LOW"))
+        actions = rule.get("actions")
+        if actions is not None and (
+            not isinstance(actions, list) or not all(isinstance(a, str) for a in actions)
+        ):
+            raise RiskConfigError(path, f"{where}: 'actions' must be a list of strings.")
+    if "scoring_rules" in config:
+        rules = _entries(path, config, "scoring_rules")
+        # Imported here: the rule compiler is not needed when the cache is used.
+        from terraguard.risk.scoring import compile_rules
+
+        try:
+            compile_rules(rules)
+        except ValueError as e:
+            raise RiskConfigError(path, str(e)) from None
+
+
+def _entries(path: str, config: Mapping[str, Any], key: str) -> List[Dict[str, Any]]:
+    entries = config.get(key, [])
+    if not isinstance(entries, list) or not all(isinstance(entry, dict) for entry in entries):
+        raise RiskConfigError(path, f"'{key}' must be a list of objects.")
+    return entries
+
+
+def _check_level(path: str, where: str, level: Any) -> None:
+    if level not in RESOURCE_RISK_LEVEL_ORDER:
+        raise RiskConfigError(
+            path,
+            f"Invalid risk level '{level}' in {where}. Must be one of {RESOURCE_RISK_LEVEL_ORDER}.",
+        )
+
+
+def _check_pattern(path: str, where: str, pattern: Any) -> str:
+    if not isinstance(pattern, str):
+        raise RiskConfigError(path, f"{where}: expected a pattern string, got {pattern!r}.")
+    try:
+        re.compile(pattern)
+    except re.error as e:
+        raise RiskConfigError(path, f"{where}: invalid pattern '{pattern}': {e}.") from None
+    return pattern
+
+
+def _entry_key(entry: Mapping[str, Any], fields: Sequence[Tuple[str, Optional[str]]]) -> Any:
+    return tuple(entry.get(name, default) for name, default in fields)
+
+
+def _read_layer(path: str) -> Tuple[Dict[str, Any], Source]:
+    """Read and parse a layer, returning it with its source record."""
+    try:
+        with open(path, "rb") as f:
+            data = f.read()
+            st = os.fstat(f.fileno())
+    except FileNotFoundError:
+        raise RiskConfigError(path, "file not found.") from None
+    except OSError as e:
+        raise RiskConfigError(path, f"cannot be read: {e.strerror}.") from None
+    try:
+        layer = json.loads(data)
+    except ValueError as e:
+        raise RiskConfigError(path, f"invalid JSON: {e}.") from None
+    if not isinstance(layer, dict):
+        raise RiskConfigError(path, "expected a JSON object.")
+    return layer, (path, st.st_mtime_ns, st.st_size, hashlib.sha256(data).hexdigest())
+
+
+def _cache_path(cache_dir: str, paths: Sequence[str]) -> str:
+    key = hashlib.sha256("\0".join(paths).encode()).hexdigest()[:32]
+    return os.path.join(cache_dir, f"risk-config-v{CACHE_FORMAT}", f"{key}.json")
+
+
+def _load_cached(cache_path: str, paths: Sequence[str]) -> Optional[Dict[str, Any]]:
+    """Return the configuration of a cache entry, or None if missing or out of date."""
+    try:
+        with open(cache_path, encoding="utf-8") as f:
+            entry = json.load(f)
+        sources: List[Source] = [
+            (str(path), int(mtime_ns), int(size), str(digest))
+            for path, mtime_ns, size, digest in entry["sources"]
+        ]
+        config = entry["config"]
+    except (OSError, ValueError, TypeError, KeyError):
+        return None
+    if [source[0] for source in sources] != list(paths) or not isinstance(config, dict):
+        return None
+
+    # Layers whose modification time changed are hashed
+    current: List[Source] = []
+    touched = False
+    for path, mtime_ns, size, digest in sources:
+        try:
+            st = os.stat(path)
+            if st.st_size != size:
+                return None
+            if st.st_mtime_ns != mtime_ns:
+                with open(path, "rb") as f:
+                    if hashlib.sha256(f.read()).hexdigest() != digest:
+                        return None
+                touched = True
+        except OSError:
+            return None
+        current.append((path, st.st_mtime_ns, size, digest))
+
+    if touched:
+        # Record the new modification times, so the layers are not hashed again
+        _write_cached(cache_path, current, config)
+    return config
+
+
+def _write_cached(cache_path: str, sources: Sequence[Source], config: Dict[str, Any]) -> None:
+    """Write a cache entry atomically. Failures are ignored; the cache is an optimization only."""
+    now = time.time_ns()
+    entry = {
+        # A zero modification time forces layers modified just now to be hashed
+        "sources": [
+            (path, mtime_ns if now - mtime_ns > _RACY_NS else 0, size, digest)
+            for path, mtime_ns, size, digest in sources
+        ],
+        "config": config,
+    }
+    try:
+        os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(cache_path), suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(entry, f, separators=(",", ":"))
+            os.replace(tmp_path, cache_path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+    except (OSError, ValueError):
+        return
@@ -8,9 +8,20 @@ import json
 import os
 import re
 import sys
-from typing import Any, Dict, Tuple, cast
+from typing import Any, Callable, Dict, List, Optional, Tuple, cast
 
-from terraguard.config import RISK_LEVEL_ORDER
+from terraguard.config import RESOURCE_RISK_LEVEL_ORDER
+from terraguard.risk.attributes import AttributeMatcher
+
+# Patterns made of a literal, optionally anchored with "^", followed by an
+# optional ".*" and an optional "$". These are matched with plain string
+# operations instead of the regex engine.
+_LITERAL_PATTERN = re.compile(r"\^?([A-Za-z0-9_\-]*)(\.\*)?(\$)?\Z")
+
+# Number of distinct configurations whose compiled matchers are kept around.
+_MATCHER_CACHE_SIZE = 8
+
+_matcher_cache: Dict[int, Tuple[Dict[str, Any], "RiskMatcher"]] = {}
 
 
 def load_risk_config(path: str) -> Dict[str, Any]:
@@ -56,13 +67,152 @@ def max_level(current: str, new: str) -> str:
         current otherwise).
 
     Note:
-        Risk levels are compared using their order in RISK_LEVEL_ORDER.
+        Risk levels are compared using their order in RESOURCE_RISK_LEVEL_ORDER.
     """
-    if RISK_LEVEL_ORDER.index(new) > RISK_LEVEL_ORDER.index(current):
+    if RESOURCE_RISK_LEVEL_ORDER.index(new) > RESOURCE_RISK_LEVEL_ORDER.index(current):
         return new
     return current
 
 
+def _level_rank(level: str) -> int:
+    try:
+        return RESOURCE_RISK_LEVEL_ORDER.index(level)
+    except ValueError:
+        raise ValueError(
+            f"Invalid risk level '{level}'. Must be one of {RESOURCE_RISK_LEVEL_ORDER}."
+        ) from None
+
+
+def _compile_pattern(pattern: str) -> Tuple[Optional[str], Callable[[str], Any]]:
+    """Compile a pattern into a match function with ``re.match`` semantics.
+
+    Returns:
+        A tuple of (exact literal or None, match function). The literal is set
+        when the pattern only matches that one resource type.
+    """
+    literal = _LITERAL_PATTERN.match(pattern)
+    if literal is None:
+        return None, re.compile(pattern).match
+    prefix, any_suffix, anchored = literal.groups()
+    if anchored and not any_suffix:
+        return prefix, prefix.__eq__
+    return None, lambda rtype: rtype.startswith(prefix)
+
+
+class RiskMatcher:
+    """Precompiled matcher for the ``resource_risk_patterns`` of a configuration.
+
+    Patterns are compiled once and ordered so that the first match found is
+    the one ``map_risk_level`` selects: highest risk level first and, within a
+    level, the pattern listed last in the configuration first. Exact literal
+    patterns are looked up in a dictionary, literal prefixes are checked with
+    ``str.startswith`` and only the remaining patterns use the regex engine.
+    Results are memoized per resource type.
+
+    The configuration's ``attribute_risk_rules``, if any, are compiled into
+    ``attributes`` (see ``terraguard.risk.attributes``).
+    """
+
+    def __init__(self, config: Dict[str, Any]) -> None:
+        """Compile the patterns of a risk configuration.
+
+        Args:
+            config: Risk configuration dictionary (see ``map_risk_level``).
+
+        Raises:
+            ValueError: If a risk level is unknown.
+            re.error: If a pattern is not a valid regular expression.
+        """
+        default_level = config.get("default_risk_level", "LOW")
+        default_rank = _level_rank(default_level)
+        self._default = (default_level, "No specific pattern matched.")
+
+        candidates = []
+        for index, item in enumerate(config.get("resource_risk_patterns", [])):
+            level = item.get("risk_level", "LOW")
+            rank = _level_rank(level)
+            if rank < default_rank:
+                # Can never be selected over the default level.
+                continue
+            literal, match = _compile_pattern(item.get("pattern"))
+            reason = item.get("reason", "Pattern matched.")
+            candidates.append((-rank, -index, literal, match, level, reason))
+        candidates.sort(key=lambda c: (c[0], c[1]))
+
+        self._results: List[Tuple[str, str]] = []
+        self._exact: Dict[str, int] = {}
+        self._others: List[Tuple[int, Callable[[str], Any]]] = []
+        for position, (_, _, literal, match, level, reason) in enumerate(candidates):
+            self._results.append((level, reason))
+            if literal is not None:
+                self._exact.setdefault(literal, position)
+            else:
+                self._others.append((position, match))
+        self._cache: Dict[str, Tuple[str, str]] = {}
+        # Patterns tested with str.startswith or the regex engine so far
+        self.patterns_evaluated = 0
+
+        rules = config.get("attribute_risk_rules")
+        self.attributes = AttributeMatcher(rules, _compile_pattern) if rules else None
+
+    def match(self, rtype: str) -> Tuple[str, str]:
+        """Return the (risk_level, reason) of a resource type.
+
+        Args:
+            rtype: Terraform resource type string (e.g., "aws_s3_bucket").
+
+        Returns:
+            The same tuple ``map_risk_level`` returns for this configuration.
+        """
+        result = self._cache.get(rtype)
+        if result is None:
+            result = self._cache[rtype] = self._evaluate(rtype)
+        return result
+
+    def _evaluate(self, rtype: str) -> Tuple[str, str]:
+        best = self._exact.get(rtype, len(self._results))
+        tested = 0
+        for position, match in self._others:
+            if position >= best:
+                break
+            tested += 1
+            if match(rtype):
+                best = position
+                break
+        self.patterns_evaluated += tested
+        if best < len(self._results):
+            return self._results[best]
+        return self._default
+
+
+def get_risk_matcher(config: Dict[str, Any]) -> RiskMatcher:
+    """Return the compiled matcher of a risk configuration.
+
+    Matchers are cached per configuration object, so repeated calls with the
+    same dictionary reuse the compiled patterns and the per-type results.
+    The configuration must not be mutated after its first use.
+
+    Args:
+        config: Risk configuration dictionary.
+
+    Returns:
+        The RiskMatcher for ``config``.
+    """
+    entry = _matcher_cache.get(id(config))
+    if entry is not None and entry[0] is config:
+        return entry[1]
+    matcher = RiskMatcher(config)
+    if len(_matcher_cache) >= _MATCHER_CACHE_SIZE:
+        _matcher_cache.clear()
+    _matcher_cache[id(config)] = (config, matcher)
+    return matcher
+
+
+def patterns_evaluated() -> int:
+    """Return the number of patterns tested by the matchers of this process so far."""
+    return sum(matcher.patterns_evaluated for _, matcher in _matcher_cache.values())
+
+
 def map_risk_level(rtype: str, config: Dict[str, Any]) -> Tuple[str, str]:
     """Map a Terraform resource type to its risk level using regex patterns.
 
@@ -82,22 +232,9 @@ def map_risk_level(rtype: str, config: Dict[str, Any]) -> Tuple[str, str]:
         A tuple of (risk_level, reason) where:
         - risk_level: The highest matching risk level string
         - reason: The reason string for the matched pattern, or default message
-    """
-
-    # Default to LOW if no match is found
-    highest_level = config.get("default_risk_level", "LOW")
-    highest_reason = "No specific pattern matched."
-
-    # Iterate through patterns defined in the configuration
-    for item in config.get("resource_risk_patterns", []):
-        pattern = item.get("pattern")
-        level = item.get("risk_level", "LOW")
-        reason = item.get("reason", "Pattern matched.")
 
-        if re.match(pattern, rtype):
-            # Use the max_level helper function to find the most severe match
-            if max_level(highest_level, level) == level:
-                highest_level = level
-                highest_reason = reason
-
-    return highest_level, highest_reason
+    Note:
+        Patterns are compiled once per configuration and results are memoized
+        per resource type (see ``get_risk_matcher``).
+    """
+    return get_risk_matcher(config).match(rtype)
@@ -2,19 +2,157 @@
 
 This module implements the core risk assessment algorithm that evaluates
 Terraform plan statistics and determines an overall risk level and score.
+
+The rules are data: a list of scoring rules, taken from the
+``scoring_rules`` of the risk configuration or, without them, of the
+bundled ``risk_config.json``.
+Each rule has conditions on signals of the statistics, and an optional
+resulting level, reason template and score weight, e.g.::
+
+    {
+        "when": ["critical_deletes > 0"],
+        "level": "HIGH",
+        "reason": "{critical_deletes} CRITICAL resource(s) will be **deleted**.",
+        "weight": 0
+    }
+
+``when`` is a list of clauses of which at least one must hold, each clause
+being one or more ``signal op number`` conditions joined by ``and``. A rule
+that holds raises the level to its ``level``, adds its ``reason`` and adds
+its ``weight`` to the score of the level. Reasons are listed in rule order.
+
+The rules are compiled once per configuration into tuples (see
+``risk.scoring``), which a ``RuleEngine`` tests in turn against the signal
+values of each statistics dictionary. Nothing is generated or executed.
 """
 
-from typing import Any, Dict, List
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from terraguard.config import LEVEL_SCORES, RISK_LEVEL_ORDER
+from terraguard.risk.scoring import (
+    ACTIVITY,
+    CompiledRule,
+    compile_rules,
+    default_scoring_rules,
+    signal_values,
+)
+
+# Number of distinct configurations whose compiled rules are kept around.
+_ENGINE_CACHE_SIZE = 8
+
+_engine_cache: Dict[int, Tuple[Dict[str, Any], "RuleEngine"]] = {}
+_default_engine: Optional["RuleEngine"] = None
+
+
+class RuleEngine:
+    """Scoring rules compiled into tuples, tested in turn."""
+
+    def __init__(self, rules: Sequence[CompiledRule]) -> None:
+        """Initialize the engine.
+
+        Args:
+            rules: Rules compiled by ``risk.scoring.compile_rules``.
+        """
+        self.rules = tuple(rules)
+
+    def assess(self, stats: Dict[str, Any]) -> Dict[str, Any]:
+        """Score statistics (see ``assess_risk``)."""
+        values = signal_values(stats)
+        if not any(values[index] for index in ACTIVITY):
+            return _no_changes(stats)
+        rank = 0
+        weight = 0
+        reasons = []
+        for clauses, rule_rank, reason, rule_weight in self.rules:
+            for clause in clauses:
+                for index, op, threshold in clause:
+                    if not op(values[index], threshold):
+                        break
+                else:
+                    break
+            else:
+                # No clause holds
+                continue
+            if rule_rank > rank:
+                rank = rule_rank
+            if reason is not None:
+                reasons.append(reason.format(*values))
+            weight += rule_weight
+        return {
+            "level": RISK_LEVEL_ORDER[rank],
+            "score": max(0, min(100, LEVEL_SCORES[rank] + weight)),
+            "reasons": reasons,
+            "stats": stats,
+        }
+
+    def assess_many(self, stats_list: Sequence[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Score many statistics dictionaries, in order."""
+        return [self.assess(stats) for stats in stats_list]
+
+
+def _no_changes(stats: Dict[str, Any]) -> Dict[str, Any]:
+    """Return the result of statistics without changes."""
+    if stats.get("partial"):
+        # Nothing is known of the changes not read
+        reasons = []
+    elif stats.get("baseline"):
+        reasons = ["No new or escalated resource changes since the baseline plan."]
+    else:
+        reasons = ["No resource changes detected in plan."]
+    return {
+        "level": RISK_LEVEL_ORDER[0],
+        "score": LEVEL_SCORES[0],
+        "reasons": reasons,
+        "stats": stats,
+    }
+
+
+def get_rule_engine(risk_config: Optional[Dict[str, Any]] = None) -> RuleEngine:
+    """Return the compiled scoring rules of a risk configuration.
+
+    Engines are cached per configuration object, like ``get_risk_matcher``'s
+    matchers; configurations without ``scoring_rules`` share the engine of
+    the default rules.
 
-from terraguard.config import RISK_LEVEL_ORDER
+    Args:
+        risk_config: Optional risk configuration dictionary.
+
+    Returns:
+        The RuleEngine of the configuration.
 
+    Raises:
+        ValueError: If a scoring rule is invalid.
+    """
+    global _default_engine
+    rules = risk_config.get("scoring_rules") if risk_config is not None else None
+    if rules is None:
+        if _default_engine is None:
+            _default_engine = RuleEngine(compile_rules(default_scoring_rules()))
+        return _default_engine
+    assert risk_config is not None
+    entry = _engine_cache.get(id(risk_config))
+    if entry is not None and entry[0] is risk_config:
+        return entry[1]
+    engine = RuleEngine(compile_rules(rules))
+    if len(_engine_cache) >= _ENGINE_CACHE_SIZE:
+        _engine_cache.clear()
+    _engine_cache[id(risk_config)] = (risk_config, engine)
+    return engine
 
-def assess_risk(stats: Dict[str, Any]) -> Dict[str, Any]:
+
+def assess_risk(
+    stats: Dict[str, Any], risk_config: Optional[Dict[str, Any]] = None
+) -> Dict[str, Any]:
     """Assess overall risk level based on Terraform plan statistics.
 
     Evaluates various risk signals including critical/high risk changes,
-    deletions, and blast radius (total change count) to determine an
-    overall risk level.
+    deletions, and blast radius to determine an overall risk level.
+
+    The blast radius is the number of existing resources changed or
+    depending on a changed resource, as computed from the plan's dependency
+    graph, plus the dependents of each deleted or replaced resource. Plans
+    summarized without a configuration block fall back to the total change
+    count.
 
     Args:
         stats: Dictionary containing plan statistics:
@@ -26,75 +164,70 @@ def assess_risk(stats: Dict[str, Any]) -> Dict[str, Any]:
             - critical_changes: Number of CRITICAL risk resources changing
             - high_risk_deletes: Number of HIGH risk resources being deleted
             - critical_deletes: Number of CRITICAL risk resources being deleted
+            - blast_radius: Optional number of existing resources changed or
+                depending on a changed resource
+            - top_dependents: Optional list of tuples (address, action,
+                dependents), highest first
+            - baseline: Optional counts of new, escalated, reviewed and
+                removed changes. With a baseline, the other statistics only
+                cover new and escalated changes, so only those are scored.
+            - partial: Optional flag set when the scan stopped early (see
+                ``guaranteed_level``), with the number of resource changes
+                read in "scanned".
+        risk_config: Optional risk configuration whose ``scoring_rules``
+            replace the default rules.
 
     Returns:
         A dictionary containing:
             - level: Risk level string (LOW, MEDIUM, HIGH)
-            - score: Numeric risk score (10, 50, or 90)
+            - score: Numeric risk score (10, 50, or 90, plus the weights of
+              the rules that hold, within 0 and 100)
             - reasons: List of reason strings explaining the assessment
             - stats: The original stats dictionary
     """
-    level = "LOW"
-    reasons: List[str] = []
-    deletes = stats["deletes"]
-    total = stats["total_resources"]
-
-    # 💥 USE NEW STATS 💥
-    high_changes = stats["high_risk_changes"]
-    crit_changes = stats["critical_changes"]
-    high_deletes = stats["high_risk_deletes"]
-    crit_deletes = stats["critical_deletes"]
-
-    # 1. Base Signals (for informational purposes)
-    if total > 0:
-        reasons.append(f"{total} resource(s) will be changed (create/update/delete).")
-    if deletes > 0:
-        reasons.append(f"{deletes} resource(s) will be deleted.")
-
-    # 2. Risk Rules (Tuned to prioritize CRITICAL changes)
-
-    # A. No changes at all
-    if total == 0:
-        level = "LOW"
-        reasons = ["No resource changes detected in plan."]
-        return {
-            "level": level,
-            "score": score_from_level(level),
-            "reasons": reasons,
-            "stats": stats,
-        }
+    return get_rule_engine(risk_config).assess(stats)
 
-    # B. CRITICAL Resource Rules (Highest Priority)
-    if crit_deletes > 0:
-        level = max_level(level, "HIGH")
-        reasons.append(f"{crit_deletes} CRITICAL resource(s) will be **deleted**.")
-    if crit_changes > 0:
-        level = max_level(level, "MEDIUM")
-        reasons.append(f"{crit_changes} CRITICAL resource(s) will be changed.")
-
-    # C. HIGH Resource Rules
-    if high_deletes > 0:
-        level = max_level(level, "MEDIUM")
-        reasons.append(f"{high_deletes} HIGH risk resource(s) will be deleted.")
-    if high_changes > 0:
-        level = max_level(level, "LOW")  # Bump to MEDIUM if LOW, but keep it if already MEDIUM/HIGH
-        reasons.append(f"{high_changes} HIGH risk resource(s) will be changed.")
-
-    # D. Blast Radius Rules (Optional, remains similar)
-    if total > 20 or deletes > 5:
-        level = max_level(level, "HIGH")
-        reasons.append("High count of changes or deletions (Blast Radius).")
-    elif total > 5:
-        level = max_level(level, "MEDIUM")
-
-    score = score_from_level(level)
 
-    return {
-        "level": level,
-        "score": score,
-        "reasons": reasons,
-        "stats": stats,
-    }
+def assess_many(
+    stats_list: Sequence[Dict[str, Any]], risk_config: Optional[Dict[str, Any]] = None
+) -> List[Dict[str, Any]]:
+    """Assess many statistics dictionaries with one configuration, as ``assess_risk`` does.
+
+    Args:
+        stats_list: Statistics dictionaries, e.g. of the plans of a batch.
+        risk_config: Optional risk configuration (see ``assess_risk``).
+
+    Returns:
+        One result per statistics dictionary, in order.
+    """
+    return get_rule_engine(risk_config).assess_many(stats_list)
+
+
+def guaranteed_level(stats: Dict[str, Any], risk_config: Optional[Dict[str, Any]] = None) -> str:
+    """Return the lowest level ``assess_risk`` can return once the whole plan is read.
+
+    The default rules raise the level as a count grows and none lowers it,
+    so scoring the changes read so far gives a lower bound, provided the
+    blast radius, only known at the end of the plan, is taken as zero. As
+    custom rules may score plans with and without a dependency graph
+    differently, the lower of both levels is returned. Custom rules should
+    only compare counts with ``>`` or ``>=`` for the bound to hold.
+
+    Args:
+        stats: Change counts of the resource changes read so far (see
+            ``assess_risk``).
+        risk_config: Optional risk configuration (see ``assess_risk``).
+
+    Returns:
+        The risk level string.
+    """
+    engine = get_rule_engine(risk_config)
+    # Blast radius and dependents are only known once the whole plan is read
+    levels = (
+        engine.assess({**stats, "blast_radius": 0, "top_dependents": []})["level"],
+        engine.assess({**stats, "blast_radius": None, "top_dependents": []})["level"],
+    )
+    return str(min(levels, key=RISK_LEVEL_ORDER.index))
 
 
 def max_level(current: str, new: str) -> str:
@@ -125,10 +258,6 @@ def score_from_level(level: str) -> int:
     Returns:
         Numeric score: 10 for LOW, 50 for MEDIUM, 90 for HIGH, 0 for unknown.
     """
-    if level == "LOW":
-        return 10
-    if level == "MEDIUM":
-        return 50
-    if level == "HIGH":
-        return 90
+    if level in RISK_LEVEL_ORDER:
+        return LEVEL_SCORES[RISK_LEVEL_ORDER.index(level)]
     return 0
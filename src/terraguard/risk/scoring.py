@@ -0,0 +1,204 @@
+"""Compilation of scoring rules into plain data.
+
+``compile_rules`` checks scoring rules (see ``risk.rules``) and turns each
+into a tuple of its clauses of ``(signal index, operator, threshold)``
+conditions, its level ordinal, its reason template, with the fields
+replaced by signal indexes, and its weight. ``signal_values`` reads the
+signals of statistics in the same order, for ``risk.rules.RuleEngine`` to
+test the conditions and format the reasons.
+
+The default rules are the ``scoring_rules`` of the bundled
+``risk_config.json``.
+"""
+
+import json
+import operator
+import os
+import re
+import string
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from terraguard.config import RISK_LEVEL_ORDER
+
+DEFAULT_RISK_CONFIG_PATH = os.path.join(os.path.dirname(__file__), "risk_config.json")
+
+# Signals rules can test, all integers:
+# - the counts of the statistics;
+# - graph: 1 when the blast radius is known (the plan has a configuration
+#   block), 0 otherwise, blast_radius then being 0;
+# - max_dependents: dependents of the deleted or replaced resource with the
+#   most of them;
+# - baseline_reviewed, baseline_escalated: counts of the baseline diff, 0
+#   without a baseline;
+# - drifted_resources, sensitive_drifts, unmasked_outputs: the drift and
+#   output signals (see ``terraform_plan.sections``).
+SIGNALS: Tuple[str, ...] = (
+    "total_resources",
+    "creates",
+    "updates",
+    "deletes",
+    "high_risk_changes",
+    "critical_changes",
+    "high_risk_deletes",
+    "critical_deletes",
+    "graph",
+    "blast_radius",
+    "max_dependents",
+    "baseline_reviewed",
+    "baseline_escalated",
+    "drifted_resources",
+    "sensitive_drifts",
+    "unmasked_outputs",
+)
+
+# Reason template fields besides the signals: the address of the resource
+# with the most dependents, and its action in the past tense.
+FIELDS: Tuple[str, ...] = SIGNALS + ("top_address", "top_action")
+
+# Signals any of which makes a plan worth scoring: with none of them, the
+# plan has nothing to report.
+ACTIVITY: Tuple[int, ...] = tuple(
+    SIGNALS.index(signal) for signal in ("total_resources", "drifted_resources", "unmasked_outputs")
+)
+
+_PAST_TENSE = {"delete": "deleted", "replace": "replaced"}
+
+_OPS: Dict[str, Callable[[Any, Any], bool]] = {
+    ">=": operator.ge,
+    "<=": operator.le,
+    "==": operator.eq,
+    "!=": operator.ne,
+    ">": operator.gt,
+    "<": operator.lt,
+}
+
+_CONDITION = re.compile(rf"\s*([a-z_]+)\s*({'|'.join(_OPS)})\s*(-?\d+)\s*")
+
+# Format specs allowed in reason templates: no nested fields, quotes or escapes.
+_FORMAT_SPEC = re.compile(r"[^{}'\"\\]*")
+
+# (signal index, operator, threshold) of a condition.
+Condition = Tuple[int, Callable[[Any, Any], bool], int]
+# (clauses, level ordinal or -1, reason template or None, weight) of a rule,
+# a clause being a tuple of conditions which must all hold.
+CompiledRule = Tuple[Tuple[Tuple[Condition, ...], ...], int, Optional[str], int]
+
+
+def default_scoring_rules() -> List[Dict[str, Any]]:
+    """Return the ``scoring_rules`` of the bundled risk configuration."""
+    with open(DEFAULT_RISK_CONFIG_PATH, encoding="utf-8") as f:
+        return list(json.load(f)["scoring_rules"])
+
+
+def compile_rules(rules: Sequence[Dict[str, Any]]) -> Tuple[CompiledRule, ...]:
+    """Compile scoring rules into tuples.
+
+    Args:
+        rules: Scoring rules (see ``risk.rules``).
+
+    Returns:
+        One ``CompiledRule`` per rule, in order.
+
+    Raises:
+        ValueError: If a rule has no condition, an invalid condition or
+            an unknown signal, level or reason field.
+    """
+    compiled = []
+    for index, rule in enumerate(rules):
+        where = f"scoring rule {index}"
+        when = rule.get("when")
+        if isinstance(when, str):
+            when = [when]
+        if not when:
+            raise ValueError(f"Invalid {where}: 'when' must list at least one condition.")
+        clauses = tuple(_compile_clause(clause, where) for clause in when)
+        level = rule.get("level")
+        rank = -1
+        if level is not None:
+            if level not in RISK_LEVEL_ORDER:
+                raise ValueError(
+                    f"Invalid level '{level}' in {where}. Must be one of {RISK_LEVEL_ORDER}."
+                )
+            rank = RISK_LEVEL_ORDER.index(level)
+        reason = rule.get("reason")
+        template = _compile_reason(reason, where) if reason is not None else None
+        compiled.append((clauses, rank, template, int(rule.get("weight", 0))))
+    return tuple(compiled)
+
+
+def signal_values(stats: Dict[str, Any]) -> List[Any]:
+    """Return the values of ``FIELDS`` for statistics (see ``risk.rules.assess_risk``)."""
+    top = stats.get("top_dependents")
+    baseline = stats.get("baseline")
+    blast_radius = stats.get("blast_radius")
+    return [
+        stats["total_resources"],
+        stats["creates"],
+        stats["updates"],
+        stats["deletes"],
+        stats["high_risk_changes"],
+        stats["critical_changes"],
+        stats["high_risk_deletes"],
+        stats["critical_deletes"],
+        int(blast_radius is not None),
+        blast_radius or 0,
+        top[0][2] if top else 0,
+        baseline["reviewed"] if baseline else 0,
+        baseline["escalated"] if baseline else 0,
+        # Results cached before these signals existed lack them
+        stats.get("drifted_resources", 0),
+        stats.get("sensitive_drifts", 0),
+        stats.get("unmasked_outputs", 0),
+        top[0][0] if top else "",
+        _PAST_TENSE.get(top[0][1], top[0][1]) if top else "",
+    ]
+
+
+def _compile_clause(clause: str, where: str) -> Tuple[Condition, ...]:
+    """Compile a clause of conditions joined by "and"."""
+    if not isinstance(clause, str):
+        raise ValueError(f"Invalid condition {clause!r} in {where}: expected a string.")
+    conditions = []
+    for text in clause.split(" and "):
+        condition = _CONDITION.fullmatch(text)
+        if condition is None:
+            raise ValueError(
+                f"Invalid condition '{text.strip()}' in {where}. "
+                f"Expected 'signal op number', op being one of {tuple(_OPS)}."
+            )
+        signal, op, threshold = condition.groups()
+        if signal not in SIGNALS:
+            raise ValueError(f"Unknown signal '{signal}' in {where}. Must be one of {SIGNALS}.")
+        conditions.append((SIGNALS.index(signal), _OPS[op], int(threshold)))
+    return tuple(conditions)
+
+
+def _compile_reason(template: str, where: str) -> str:
+    """Replace the fields of a reason template by their index in ``FIELDS``."""
+    parts = []
+    try:
+        fields = list(string.Formatter().parse(template))
+    except ValueError as e:
+        raise ValueError(f"Invalid reason of {where}: {e}") from None
+    for literal, field, spec, conversion in fields:
+        parts.append(literal.replace("{", "{{").replace("}", "}}"))
+        if field is None:
+            continue
+        if field not in FIELDS:
+            raise ValueError(
+                f"Unknown field '{{{field}}}' in the reason of {where}. Must be one of {FIELDS}."
+            )
+        conversion = f"!{conversion}" if conversion else ""
+        spec = f":{spec}" if spec else ""
+        part = f"{{{FIELDS.index(field)}{conversion}{spec}}}"
+        try:
+            if conversion not in ("", "!s", "!r", "!a") or not _FORMAT_SPEC.fullmatch(spec):
+                raise ValueError
+            # Signals are integers, the other fields strings
+            part.format(*[0] * len(SIGNALS), "", "")
+        except ValueError:
+            raise ValueError(
+                f"Invalid format of field '{{{field}}}' in the reason of {where}."
+            ) from None
+        parts.append(part)
+    return "".join(parts)
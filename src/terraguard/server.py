@@ -0,0 +1,363 @@
+"""Long-running assessment server for shared CI runners.
+
+``tguard-server`` keeps loaded risk configurations and their compiled
+patterns in memory and assesses plans on request, so that clients (see
+``terraguard.client``) pay neither the interpreter and import cost nor the
+configuration loading of a fresh ``tguard`` process.
+
+The server speaks HTTP with JSON bodies, over a Unix domain socket or a
+loopback TCP port:
+
+- ``POST /assess`` with ``{"plan_path": ..., "risk_config_path": ...,
+  "risk_config_layers": [...]}`` assesses a plan file readable by the server.
+- ``POST /assess/body[?risk_config_path=...&risk_config_layer=...]``
+  assesses the plan JSON sent
+  as the request body, optionally gzip, xz or bzip2 compressed, streamed as
+  it arrives.
+- ``GET /health`` reports that the server is up.
+
+Assessments answer ``{"result": ..., "summary_markdown": ...}``, where
+``result`` is the dictionary ``assess_risk`` produces. Plans that cannot be
+read answer 400 with ``{"error": ...}``.
+
+The server reads any file its clients name, with its own permissions. TCP
+addresses are therefore restricted to loopback interfaces, and Unix sockets
+are only accessible to the user running the server.
+"""
+
+import argparse
+import io
+import ipaddress
+import json
+import os
+import signal
+import socket
+import socketserver
+import stat
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import IO, Any, Dict, Optional, Sequence, Tuple, cast
+from urllib.parse import parse_qs, urlsplit
+
+from terraguard.batch import assess_plan_file
+from terraguard.cache import DEFAULT_MAX_BYTES, ResultCache
+from terraguard.client import DEFAULT_ADDRESS, parse_address
+from terraguard.outputs.formatter import format_summary_markdown
+from terraguard.risk.layers import load_layered_config
+from terraguard.risk.risk import get_risk_matcher
+from terraguard.risk.rules import assess_risk
+from terraguard.terraform_plan.graph import DependencyGraph
+from terraguard.terraform_plan.loader import decompressing, iter_resource_changes_from_file
+from terraguard.terraform_plan.sections import SectionSignals
+from terraguard.terraform_plan.summarizer import summarize_resource_changes
+
+DEFAULT_RISK_CONFIG_PATH = os.path.join(os.path.dirname(__file__), "risk", "risk_config.json")
+
+
+class AssessmentService:
+    """Assesses plans with risk configurations kept loaded and compiled."""
+
+    def __init__(
+        self,
+        default_risk_config_path: str = DEFAULT_RISK_CONFIG_PATH,
+        cache: Optional[ResultCache] = None,
+    ) -> None:
+        """Create a service.
+
+        Args:
+            default_risk_config_path: Risk configuration used by requests that
+                do not name one. Loaded and compiled immediately.
+            cache: Optional result cache for plans assessed by path.
+        """
+        self.default_risk_config_path = os.path.abspath(default_risk_config_path)
+        self.cache = cache
+        # Merged configuration per tuple of layer paths, with their modification times
+        self._configs: Dict[Tuple[str, ...], Tuple[Tuple[float, ...], Dict[str, Any]]] = {}
+        self._lock = threading.Lock()
+        self.risk_config(None)
+
+    def risk_config(self, path: Optional[str], layers: Sequence[str] = ()) -> Dict[str, Any]:
+        """Return the loaded risk configuration at ``path`` (or the default one).
+
+        Configurations are reloaded when the modification time of one of
+        their files changes.
+
+        Args:
+            path: Base risk configuration path, or None for the default one.
+            layers: Paths of the layers merged over the base configuration
+                (see ``risk.layers.load_layered_config``).
+
+        Raises:
+            ValueError: If the configuration cannot be loaded or is invalid.
+        """
+        base = os.path.abspath(path) if path else self.default_risk_config_path
+        paths = (base, *(os.path.abspath(layer) for layer in layers))
+        mtimes = []
+        for config_path in paths:
+            try:
+                mtimes.append(os.stat(config_path).st_mtime)
+            except OSError as e:
+                raise ValueError(f"Risk configuration file not found at path: {config_path}") from e
+        with self._lock:
+            entry = self._configs.get(paths)
+            if entry is not None and entry[0] == tuple(mtimes):
+                return entry[1]
+            config = load_layered_config(list(paths))
+            get_risk_matcher(config)
+            self._configs[paths] = (tuple(mtimes), config)
+            return config
+
+    def assess_path(
+        self,
+        plan_path: str,
+        risk_config_path: Optional[str] = None,
+        risk_config_layers: Sequence[str] = (),
+    ) -> Dict[str, Any]:
+        """Assess a plan file.
+
+        Returns:
+            A dictionary with "result" and "summary_markdown".
+
+        Raises:
+            ValueError: If the plan or the risk configuration cannot be read.
+        """
+        config = self.risk_config(risk_config_path, risk_config_layers)
+        result = assess_plan_file(plan_path, config, self.cache)
+        if "error" in result:
+            raise ValueError(result["error"])
+        del result["path"]
+        result.pop("cached", None)
+        return {"result": result, "summary_markdown": format_summary_markdown(result)}
+
+    def assess_file(
+        self,
+        fp: IO[bytes],
+        risk_config_path: Optional[str] = None,
+        risk_config_layers: Sequence[str] = (),
+    ) -> Dict[str, Any]:
+        """Assess the plan JSON read from a buffered binary file object.
+
+        Compressed plans are decompressed as they are read, as by ``open_plan``.
+
+        Returns:
+            A dictionary with "result" and "summary_markdown".
+
+        Raises:
+            ValueError: If the plan is not valid JSON or the risk
+                configuration cannot be read.
+        """
+        config = self.risk_config(risk_config_path, risk_config_layers)
+        graph = DependencyGraph()
+        signals = SectionSignals(config)
+        plan = decompressing(cast(io.BufferedReader, fp))
+        changes = iter_resource_changes_from_file(plan, graph, signals)
+        stats = summarize_resource_changes(changes, config, graph, signals=signals)
+        result = assess_risk(stats, config)
+        return {"result": result, "summary_markdown": format_summary_markdown(result)}
+
+
+class _BodyReader(io.RawIOBase):
+    """Readable view of a request body, sized by Content-Length or chunked."""
+
+    def __init__(self, rfile: io.BufferedIOBase, length: Optional[int]) -> None:
+        self._rfile = rfile
+        self._chunked = length is None
+        self._remaining = 0 if length is None else length
+        self._done = False
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer: Any) -> int:
+        if self._remaining == 0 and self._chunked and not self._done:
+            self._next_chunk()
+        n = min(len(buffer), self._remaining)
+        if n == 0:
+            return 0
+        data = self._rfile.read(n)
+        if not data:
+            raise OSError("Request body ended prematurely")
+        buffer[: len(data)] = data
+        self._remaining -= len(data)
+        if self._chunked and self._remaining == 0:
+            self._rfile.readline()  # CRLF after the chunk data
+        return len(data)
+
+    def _next_chunk(self) -> None:
+        line = self._rfile.readline()
+        try:
+            self._remaining = int(line.split(b";", 1)[0], 16)
+        except ValueError:
+            raise OSError("Malformed chunked request body") from None
+        if self._remaining == 0:
+            self._done = True
+            while self._rfile.readline() not in (b"\r\n", b"\n", b""):
+                pass  # trailer headers
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server_version = "terraguard"
+
+    def do_GET(self) -> None:
+        if urlsplit(self.path).path != "/health":
+            self._reply(404, {"error": f"Unknown path {self.path}"})
+            return
+        self._reply(200, {"status": "ok"})
+
+    def do_POST(self) -> None:
+        url = urlsplit(self.path)
+        service = cast(_ServiceMixin, self.server).service
+        length = self.headers.get("Content-Length")
+        body = cast(
+            IO[bytes], io.BufferedReader(_BodyReader(self.rfile, int(length) if length else None))
+        )
+        try:
+            if url.path == "/assess":
+                request = json.load(body)
+                payload = service.assess_path(
+                    request["plan_path"],
+                    request.get("risk_config_path"),
+                    request.get("risk_config_layers", []),
+                )
+            elif url.path == "/assess/body":
+                query = parse_qs(url.query)
+                risk_config_path = query.get("risk_config_path", [None])[0]
+                layers = query.get("risk_config_layer", [])
+                payload = service.assess_file(body, risk_config_path, layers)
+            else:
+                self._reply(404, {"error": f"Unknown path {url.path}"})
+                return
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            self._reply(400, {"error": str(e)})
+            return
+        except Exception as e:
+            self._reply(500, {"error": f"{type(e).__name__}: {e}"})
+            return
+        self._reply(200, payload)
+
+    def _reply(self, status: int, payload: Dict[str, Any]) -> None:
+        data = json.dumps(payload, separators=(",", ":")).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def address_string(self) -> str:
+        # Unix socket peers have no address.
+        return str(self.client_address[0]) if self.client_address else "unix"
+
+
+class _ServiceMixin:
+    service: AssessmentService
+
+
+class _TCPServer(_ServiceMixin, ThreadingHTTPServer):
+    daemon_threads = True
+
+
+class _UnixServer(_ServiceMixin, socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+def create_server(address: str, service: AssessmentService) -> socketserver.BaseServer:
+    """Bind a threaded server for ``service`` to ``address``.
+
+    Args:
+        address: Unix socket path or loopback ``host:port`` (see
+            ``terraguard.client.parse_address``).
+        service: Service handling the requests.
+
+    Raises:
+        ValueError: If a TCP address is not a loopback address.
+        OSError: If the address cannot be bound.
+    """
+    target = parse_address(address)
+    server: _ServiceMixin
+    if isinstance(target, str):
+        if os.path.exists(target) and stat.S_ISSOCK(os.stat(target).st_mode):
+            probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            try:
+                probe.connect(target)
+            except OSError:
+                os.unlink(target)  # left behind by a server that did not shut down cleanly
+            else:
+                raise OSError(f"Another server is already listening on {target}.")
+            finally:
+                probe.close()
+        old_umask = os.umask(0o177)
+        try:
+            server = _UnixServer(target, _Handler)
+        finally:
+            os.umask(old_umask)
+    else:
+        host = target[0]
+        if host != "localhost" and not ipaddress.ip_address(host).is_loopback:
+            raise ValueError(f"Refusing to listen on non-loopback address {host}.")
+        server = _TCPServer(target, _Handler)
+    server.service = service
+    return cast(socketserver.BaseServer, server)
+
+
+def _raise_keyboard_interrupt(signum: int, frame: Any) -> None:
+    raise KeyboardInterrupt
+
+
+def main() -> None:
+    """Entry point of ``tguard-server``."""
+    parser = argparse.ArgumentParser(
+        description="Serve Terraform plan risk assessments to tguard-client."
+    )
+    parser.add_argument(
+        "--listen",
+        default=os.getenv("TERRAGUARD_SERVER", DEFAULT_ADDRESS),
+        help=(
+            "Unix socket path (unix:/path or any path with a '/') or loopback host:port. "
+            f"Default: env TERRAGUARD_SERVER or {DEFAULT_ADDRESS}."
+        ),
+    )
+    parser.add_argument(
+        "--risk-config-path",
+        default=os.getenv("RISK_CONFIG_PATH", DEFAULT_RISK_CONFIG_PATH),
+        help="Risk configuration used when a request names none. Loaded at startup.",
+    )
+    parser.add_argument(
+        "--cache-dir",
+        default=os.getenv("TERRAGUARD_CACHE_DIR"),
+        help="Directory of an on-disk result cache. Default: no cache.",
+    )
+    parser.add_argument(
+        "--cache-max-mb",
+        type=float,
+        default=float(os.getenv("TERRAGUARD_CACHE_MAX_MB", DEFAULT_MAX_BYTES / (1024 * 1024))),
+        help="Evict least recently used cache entries above this size. Default: 256.",
+    )
+    args = parser.parse_args()
+
+    cache = None
+    if args.cache_dir:
+        cache = ResultCache(args.cache_dir, max_bytes=int(args.cache_max_mb * 1024 * 1024))
+    try:
+        service = AssessmentService(args.risk_config_path, cache)
+        server = create_server(args.listen, service)
+    except (OSError, ValueError) as e:
+        print(f"ERROR: {e}", file=sys.stderr)
+        sys.exit(1)
+
+    # Shut down cleanly (and remove the Unix socket) when stopped by a service manager.
+    signal.signal(signal.SIGTERM, _raise_keyboard_interrupt)
+    print(f"Listening on {args.listen}", file=sys.stderr)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        target = parse_address(args.listen)
+        if isinstance(target, str) and os.path.exists(target):
+            os.unlink(target)
+
+
+if __name__ == "__main__":
+    main()
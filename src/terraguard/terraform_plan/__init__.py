@@ -1,4 +1,69 @@
-from .loader import load_plan_json
-from .summarizer import summarize_changes
+from importlib import import_module
+from typing import TYPE_CHECKING, Any, List
 
-__all__ = ["load_plan_json", "summarize_changes"]
+if TYPE_CHECKING:
+    from .baseline import Baseline, BaselineDiff, load_baseline, write_digest
+    from .graph import DependencyGraph
+    from .loader import iter_resource_changes, iter_resource_changes_from_file, load_plan_json
+    from .sections import SectionSignals
+    from .summarizer import (
+        match_resource_changes,
+        summarize_changes,
+        summarize_matched_changes,
+        summarize_resource_changes,
+    )
+    from .table import ChangeTable
+    from .tree import RiskTree, build_trees
+
+__all__ = [
+    "Baseline",
+    "BaselineDiff",
+    "load_baseline",
+    "write_digest",
+    "DependencyGraph",
+    "load_plan_json",
+    "iter_resource_changes",
+    "iter_resource_changes_from_file",
+    "summarize_changes",
+    "summarize_resource_changes",
+    "match_resource_changes",
+    "summarize_matched_changes",
+    "SectionSignals",
+    "ChangeTable",
+    "RiskTree",
+    "build_trees",
+]
+
+# Public names and the submodules defining them. They are imported on first
+# access, so that importing a light submodule (e.g. the risk tree, used by
+# the summary formatter) does not load the plan reader and the risk matcher.
+_EXPORTS = {
+    "Baseline": ".baseline",
+    "BaselineDiff": ".baseline",
+    "load_baseline": ".baseline",
+    "write_digest": ".baseline",
+    "DependencyGraph": ".graph",
+    "load_plan_json": ".loader",
+    "iter_resource_changes": ".loader",
+    "iter_resource_changes_from_file": ".loader",
+    "summarize_changes": ".summarizer",
+    "summarize_resource_changes": ".summarizer",
+    "match_resource_changes": ".summarizer",
+    "summarize_matched_changes": ".summarizer",
+    "SectionSignals": ".sections",
+    "ChangeTable": ".table",
+    "RiskTree": ".tree",
+    "build_trees": ".tree",
+}
+
+
+def __getattr__(name: str) -> Any:
+    if name not in _EXPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(import_module(_EXPORTS[name], __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__() -> List[str]:
+    return sorted(list(globals()) + __all__)
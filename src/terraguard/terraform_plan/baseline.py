@@ -0,0 +1,299 @@
+"""Baseline diff: score only what changed since a previously reviewed plan.
+
+Large stacks are re-planned on every commit, and most of their resource
+changes are the same as in the last plan that was reviewed. Given that
+plan, or a compact digest of it, ``BaselineDiff`` classifies every change of
+the current plan by address:
+
+- new: the address had no change in the baseline;
+- escalated: the change gained actions (an update became a replacement, a
+  replacement a plain delete, ...) or its resource risk level went up;
+- reviewed: the same change, or a subset of it, was already in the
+  baseline.
+
+Reviewed changes are left out of the statistics, and therefore of the
+score, and listed separately. The comparison is one dictionary lookup per
+change, so a diff is linear in the size of both plans.
+
+A digest is a gzip-compressed JSON document holding, per plan, the sorted
+addresses of its changes and one integer per address packing the action
+set and the resource risk level, as in a ``ChangeTable`` code. It is written
+with ``write_digest`` and is small enough (a few bytes per resource once
+compressed) to be kept as a CI artifact of the approved run::
+
+    {"format": "terraguard-digest", "version": 1,
+     "plans": {"<plan path>": {"addresses": [...], "codes": [...]}}}
+"""
+
+import hashlib
+import json
+from typing import Any, Dict, List, Mapping, Optional, Tuple
+
+from terraguard.config import RESOURCE_RISK_LEVEL_ORDER
+from terraguard.terraform_plan.table import (
+    ACTION_MASK,
+    CREATE,
+    DELETE,
+    DESTROY,
+    LEVEL_MASK,
+    UPDATE,
+)
+
+DIGEST_FORMAT = "terraguard-digest"
+DIGEST_VERSION = 1
+
+# Classification of a change against the baseline.
+NEW = 0
+ESCALATED = 1
+REVIEWED = 2
+
+# Bits of a change code kept in a digest: the level and actions of a
+# ChangeTable code, without the create-before-destroy ordering and flags. A
+# delete that is not part of a replacement sets DESTROY, so that a
+# replacement turning into a plain delete escalates.
+_DIGEST_BITS = LEVEL_MASK | CREATE | UPDATE | DELETE | DESTROY
+
+# (address, baseline actions, actions, baseline risk level, risk level)
+Escalation = Tuple[str, str, str, str, str]
+
+_GZIP_MAGIC = b"\x1f\x8b"
+# Start of a digest once decompressed, telling it from a gzip-compressed plan.
+_DIGEST_HEAD = f'{{"format":"{DIGEST_FORMAT}"'.encode()
+
+
+def _actions_label(code: int) -> str:
+    if code & DESTROY:
+        return "delete"
+    if code & (CREATE | DELETE) == CREATE | DELETE:
+        return "replace"
+    return ",".join(name for bit, name in ((CREATE, "create"), (UPDATE, "update")) if code & bit)
+
+
+class BaselineDiff:
+    """Classifies the changes of one plan against its baseline, and records them."""
+
+    def __init__(self, codes: Optional[Mapping[str, int]] = None, record: bool = False) -> None:
+        """Create a diff.
+
+        Args:
+            codes: Change code per address of the baseline plan (see
+                ``Baseline.for_plan``), or None to classify every change as
+                new (for recording only).
+            record: Whether to record the codes of the classified changes,
+                to write them as a digest (see ``codes``).
+        """
+        self._baseline = codes
+        self._recorded: Optional[Dict[str, int]] = {} if record else None
+        self.new = 0
+        self.escalated = 0
+        self.reviewed = 0
+        self._matched = 0
+        self.escalations: List[Escalation] = []
+
+    def classify(self, address: str, code: int) -> int:
+        """Classify a change as NEW, ESCALATED or REVIEWED.
+
+        No-op and read changes are always NEW, and are not recorded.
+
+        Args:
+            address: Resource instance address.
+            code: Change code of the change (see ``terraform_plan.table``):
+                its resource risk level, attribute rules included, and action
+                bits.
+        """
+        code &= _DIGEST_BITS
+        if not code & ACTION_MASK:
+            return NEW
+        if self._recorded is not None:
+            self._recorded[address] = code
+        if self._baseline is None:
+            return NEW
+        base_code = self._baseline.get(address)
+        if base_code is None:
+            self.new += 1
+            return NEW
+        self._matched += 1
+        level = code & LEVEL_MASK
+        base_level = base_code & LEVEL_MASK
+        if code & ACTION_MASK & ~base_code or level > base_level:
+            self.escalated += 1
+            self.escalations.append(
+                (
+                    address,
+                    _actions_label(base_code),
+                    _actions_label(code),
+                    RESOURCE_RISK_LEVEL_ORDER[base_level],
+                    RESOURCE_RISK_LEVEL_ORDER[level],
+                )
+            )
+            return ESCALATED
+        self.reviewed += 1
+        return REVIEWED
+
+    def stats(self) -> Optional[Dict[str, int]]:
+        """Return the counts of new, escalated and reviewed changes.
+
+        Returns:
+            A dictionary with "new", "escalated", "reviewed" and "removed"
+            (changes of the baseline no longer in the plan), or None without
+            a baseline.
+        """
+        if self._baseline is None:
+            return None
+        return {
+            "new": self.new,
+            "escalated": self.escalated,
+            "reviewed": self.reviewed,
+            "removed": len(self._baseline) - self._matched,
+        }
+
+    def codes(self) -> Dict[str, int]:
+        """Return the change code per address recorded so far."""
+        if self._recorded is None:
+            raise ValueError("This baseline diff does not record changes.")
+        return self._recorded
+
+
+class Baseline:
+    """Change codes of the plans of a digest or baseline plan."""
+
+    def __init__(self, plans: Mapping[str, Mapping[str, int]]) -> None:
+        self.plans = plans
+        self._fingerprints: Dict[str, str] = {}
+
+    def for_plan(self, path: str) -> Mapping[str, int]:
+        """Return the change codes of the baseline of the plan at ``path``.
+
+        The plan is looked up by path. A baseline holding a single plan is
+        the baseline of any plan; a plan missing from a baseline of several
+        gets an empty one, so all its changes are new.
+        """
+        codes = self.plans.get(path)
+        if codes is None:
+            codes = next(iter(self.plans.values())) if len(self.plans) == 1 else {}
+        return codes
+
+    def fingerprint(self, path: str) -> str:
+        """Return a hash of the baseline of the plan at ``path``, for cache keys."""
+        fingerprint = self._fingerprints.get(path)
+        if fingerprint is None:
+            codes = self.for_plan(path)
+            digest = hashlib.sha256()
+            for address in sorted(codes):
+                digest.update(f"{address}\0{codes[address]}\0".encode())
+            fingerprint = self._fingerprints[path] = digest.hexdigest()
+        return fingerprint
+
+
+def load_baseline(path: str, risk_config: Dict[str, Any]) -> Baseline:
+    """Load a digest, or compute the baseline of a plan JSON file.
+
+    Args:
+        path: Path to a digest written by ``write_digest``, or to a plan JSON
+            file, which may be compressed. A plan's risk levels are computed
+            with ``risk_config``.
+        risk_config: Risk configuration dictionary.
+
+    Raises:
+        ValueError: If the file is neither a digest nor a plan.
+        OSError: If the file cannot be read.
+    """
+    if _is_digest(path):
+        return read_digest(path)
+
+    # Imported here: the summarizer depends on this module.
+    from terraguard.terraform_plan.loader import iter_resource_changes
+    from terraguard.terraform_plan.summarizer import summarize_resource_changes
+
+    diff = BaselineDiff(record=True)
+    summarize_resource_changes(iter_resource_changes(path), risk_config, baseline=diff)
+    return Baseline({path: diff.codes()})
+
+
+def _is_digest(path: str) -> bool:
+    """Tell a digest from a plan, which may be gzip-compressed too."""
+    with open(path, "rb") as f:
+        if f.read(2) != _GZIP_MAGIC:
+            return False
+        f.seek(0)
+        # Imported here: gzip is only needed for digests and compressed plans.
+        import gzip
+
+        try:
+            with gzip.GzipFile(fileobj=f) as g:
+                return g.read(len(_DIGEST_HEAD)) == _DIGEST_HEAD
+        except (EOFError, OSError):
+            # Left to read_digest to report
+            return True
+
+
+def read_digest(path: str) -> Baseline:
+    """Read a digest written by ``write_digest``.
+
+    Raises:
+        ValueError: If the file is not a digest of a supported version, or
+            one of its entries is malformed.
+        OSError: If the file cannot be read.
+    """
+    # Imported here: gzip is only needed for digests.
+    import gzip
+
+    try:
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            document = json.load(f)
+    except (EOFError, gzip.BadGzipFile) as e:
+        raise ValueError(f"Invalid digest {path}: {e}") from e
+    if not isinstance(document, dict) or document.get("format") != DIGEST_FORMAT:
+        raise ValueError(f"{path} is not a terraguard digest.")
+    if document.get("version") != DIGEST_VERSION:
+        raise ValueError(
+            f"Unsupported digest version {document.get('version')} in {path} "
+            f"(expected {DIGEST_VERSION})."
+        )
+    entries = document.get("plans", {})
+    if not isinstance(entries, dict):
+        raise ValueError(f'Invalid digest {path}: "plans" is not an object.')
+    plans: Dict[str, Dict[str, int]] = {}
+    for plan, entry in entries.items():
+        addresses = entry.get("addresses") if isinstance(entry, dict) else None
+        codes = entry.get("codes") if isinstance(entry, dict) else None
+        if (
+            not isinstance(addresses, list)
+            or not isinstance(codes, list)
+            or len(addresses) != len(codes)
+            or not all(isinstance(address, str) for address in addresses)
+            or not all(type(code) is int for code in codes)
+        ):
+            raise ValueError(
+                f"Invalid digest {path}: the entry of plan {plan} is not an object with "
+                f'"addresses" and "codes" lists of the same length.'
+            )
+        plans[plan] = dict(zip(addresses, codes))
+    return Baseline(plans)
+
+
+def write_digest(path: str, plans: Mapping[str, Mapping[str, int]]) -> None:
+    """Write the change codes of plans as a digest.
+
+    Args:
+        path: Output path.
+        plans: Change codes per address (see ``BaselineDiff.codes``), per plan path.
+
+    Raises:
+        OSError: If the file cannot be written.
+    """
+    import gzip
+
+    document: Dict[str, Any] = {"format": DIGEST_FORMAT, "version": DIGEST_VERSION, "plans": {}}
+    for plan, codes in plans.items():
+        addresses = sorted(codes)
+        document["plans"][plan] = {
+            "addresses": addresses,
+            "codes": [codes[address] for address in addresses],
+        }
+    # mtime=0 keeps the digest of an unchanged plan byte-identical. Level 9
+    # takes eight times as long for a digest only 15% smaller.
+    with open(path, "wb") as raw, gzip.GzipFile(
+        fileobj=raw, mode="wb", compresslevel=6, mtime=0
+    ) as f:
+        f.write(json.dumps(document, separators=(",", ":")).encode("utf-8"))
@@ -0,0 +1,347 @@
+"""Resource dependency graph and blast radius of a Terraform plan.
+
+The ``configuration`` block of a plan lists, for every resource, the
+expressions of its arguments with the references they contain
+(``aws_vpc.this``, ``var.vpc_id``, ``module.network.vpc_id``, ...), along
+with the inputs and outputs of every module call. ``DependencyGraph`` turns
+those references into edges from each dependency to its dependents:
+
+- resource references link resources of the same module;
+- ``var.<name>`` links a module's resources to the expression passed for
+  that input by the calling module, and ``module.<name>.<output>`` links the
+  calling module to the expression of the child module's output, so that
+  dependencies are followed across module boundaries;
+- ``depends_on``, ``count`` and ``for_each`` of resources and module calls
+  are edges too.
+
+Locals do not appear in the plan's configuration block: references going
+through a ``local.<name>`` cannot be followed and are ignored.
+
+Nodes are configuration addresses (``module.network.aws_subnet.private``),
+so a resource with ``count`` or ``for_each`` is one node. The resource
+changes fed with ``add_instance`` attach instances to the nodes: a node
+counts as many existing resources as it has instances that are not being
+created, and is a source of the blast radius when any of its instances is
+updated, deleted or replaced.
+
+Nodes are interned into integer ids and edges kept in adjacency lists, so
+building the graph is linear in the number of references, and the blast
+radius of all changes is one multi-source traversal, linear in the size of
+the graph.
+"""
+
+import re
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Tuple, cast
+
+from terraguard.terraform_plan.stream import JsonStream
+
+# Reference roots that never name a resource.
+_NON_RESOURCE_ROOTS = frozenset(("local", "each", "count", "path", "terraform", "self"))
+
+# Instance keys of a resource address: [0] or ["key"], which may contain dots.
+_INSTANCE_KEY = re.compile(r'\[(?:"(?:[^"\\]|\\.)*"|[^\]"]*)\]')
+
+# Node change flags.
+_UPDATE = 1
+_DELETE = 2
+_REPLACE = 4
+
+# Number of deleted or replaced resources whose own dependents are counted.
+# Each count is a traversal of its own; the blast radius of all changes
+# together is always computed.
+MAX_TRACED_DELETES = 100
+
+# Number of entries of the "top_dependents" statistic.
+TOP_DEPENDENTS = 10
+
+# (configuration address, "delete" or "replace", number of dependent resources)
+Dependents = Tuple[str, str, int]
+
+
+class DependencyGraph:
+    """Dependency graph of the resources of a plan's configuration."""
+
+    def __init__(self) -> None:
+        self._ids: Dict[str, int] = {}
+        self._keys: List[str] = []
+        # Dependents of each node.
+        self._edges: List[List[int]] = []
+        # Existing (not created) and changed (updated, deleted or replaced)
+        # instances of resource nodes.
+        self._existing: List[int] = []
+        self._changed: List[int] = []
+        self._flags: Dict[int, int] = {}
+        self.loaded = False
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def _node(self, key: str) -> int:
+        node = self._ids.get(key)
+        if node is None:
+            node = self._ids[key] = len(self._keys)
+            self._keys.append(key)
+            self._edges.append([])
+            self._existing.append(0)
+            self._changed.append(0)
+        return node
+
+    def _link(self, dependencies: Iterable[Optional[str]], dependent: str) -> None:
+        """Add edges from the nodes of ``dependencies`` (None entries ignored) to ``dependent``."""
+        node = self._node(dependent)
+        keys = set(dependencies)
+        keys.discard(None)
+        keys.discard(dependent)
+        edges = self._edges
+        for key in keys:
+            edges[self._node(cast(str, key))].append(node)
+
+    # ------------------------------------------------------------------ #
+    # Configuration
+    # ------------------------------------------------------------------ #
+
+    def add_configuration(self, configuration: Mapping[str, Any]) -> None:
+        """Add the resources and module calls of a decoded ``configuration`` block."""
+        self.loaded = True
+        root = configuration.get("root_module")
+        if isinstance(root, dict):
+            self._add_module(root, "")
+
+    def read_configuration(self, stream: JsonStream) -> None:
+        """Add the ``configuration`` block at the current position of ``stream``.
+
+        The block is read one resource, output and module call at a time, so
+        only the references of the resources are kept in memory.
+        """
+        self.loaded = True
+        for key in stream.iter_object():
+            if key == "root_module":
+                self._read_module(stream, "")
+            else:
+                stream.skip_value()
+
+    def _add_module(self, module: Mapping[str, Any], prefix: str) -> None:
+        for resource in module.get("resources", ()):
+            self.add_resource(prefix, resource)
+        if prefix:
+            self.add_outputs(prefix, module.get("outputs", {}))
+        for name, call in module.get("module_calls", {}).items():
+            self.add_module_call(prefix, name, call)
+            child = call.get("module")
+            if isinstance(child, dict):
+                self._add_module(child, f"{prefix}module.{name}.")
+
+    def _read_module(self, stream: JsonStream, prefix: str) -> None:
+        for key in stream.iter_object():
+            if key == "resources":
+                for _ in stream.iter_array():
+                    self.add_resource(prefix, stream.read_value())
+            elif key == "outputs" and prefix:
+                self.add_outputs(prefix, stream.read_value())
+            elif key == "module_calls":
+                for name in stream.iter_object():
+                    call: Dict[str, Any] = {}
+                    for call_key in stream.iter_object():
+                        if call_key == "module":
+                            self._read_module(stream, f"{prefix}module.{name}.")
+                        else:
+                            call[call_key] = stream.read_value()
+                    self.add_module_call(prefix, name, call)
+            else:
+                stream.skip_value()
+
+    def add_resource(self, prefix: str, resource: Mapping[str, Any]) -> None:
+        """Add a resource of the ``configuration`` block.
+
+        Args:
+            prefix: Address of the module declaring the resource followed by
+                a dot (``module.network.``), or "" for the root module.
+            resource: The resource entry, with its module-relative address.
+        """
+        key = f"R:{prefix}{resource['address']}"
+        references = _references(
+            resource.get("expressions"),
+            resource.get("count_expression"),
+            resource.get("for_each_expression"),
+        )
+        references.extend(resource.get("depends_on", ()))
+        dependencies = [_reference_key(prefix, reference) for reference in references]
+        if prefix:
+            # The module call's count, for_each and depends_on apply to all its resources.
+            dependencies.append(f"M:{prefix}")
+            self._edges[self._node(key)].append(self._node(f"A:{prefix}"))
+        self._link(dependencies, key)
+
+    def add_outputs(self, prefix: str, outputs: Mapping[str, Any]) -> None:
+        """Add the outputs of the non-root module at ``prefix``."""
+        for name, output in outputs.items():
+            references = _references(output)
+            self._link((_reference_key(prefix, r) for r in references), f"O:{prefix}{name}")
+
+    def add_module_call(self, prefix: str, name: str, call: Mapping[str, Any]) -> None:
+        """Add the inputs, count, for_each and depends_on of a module call.
+
+        Args:
+            prefix: Address prefix of the calling module ("" for the root).
+            name: Name of the module call.
+            call: The module call entry. Its ``module`` is not read.
+        """
+        child = f"{prefix}module.{name}."
+        for variable, expression in call.get("expressions", {}).items():
+            dependencies = [_reference_key(prefix, r) for r in _references(expression)]
+            self._link((d for d in dependencies if d is not None), f"V:{child}{variable}")
+        dependencies = [
+            _reference_key(prefix, reference)
+            for reference in _references(
+                call.get("count_expression"), call.get("for_each_expression")
+            )
+        ]
+        dependencies.extend(_reference_key(prefix, r) for r in call.get("depends_on", ()))
+        if prefix:
+            dependencies.append(f"M:{prefix}")
+            # Depending on a module means depending on its nested modules too.
+            self._link([f"A:{child}"], f"A:{prefix}")
+        self._link((d for d in dependencies if d is not None), f"M:{child}")
+
+    # ------------------------------------------------------------------ #
+    # Resource changes
+    # ------------------------------------------------------------------ #
+
+    def add_instance(self, address: str, actions: List[str], changed: bool = True) -> None:
+        """Attach a resource change to the node of its configuration address.
+
+        Args:
+            address: Resource instance address, e.g. ``module.a["x"].aws_subnet.b[0]``.
+            actions: The change's actions.
+            changed: Whether the change is a source of the blast radius. A
+                change that is not (e.g. one already reviewed in a baseline
+                plan) still counts as an existing resource.
+        """
+        if "[" in address:
+            address = _INSTANCE_KEY.sub("", address)
+        node = self._node(f"R:{address}")
+        if "read" in actions or actions == ["create"]:
+            return
+        self._existing[node] += 1
+        if not changed:
+            return
+        flags = 0
+        if "delete" in actions:
+            flags = _REPLACE if "create" in actions else _DELETE
+        elif "update" in actions:
+            flags = _UPDATE
+        if flags:
+            self._changed[node] += 1
+            self._flags[node] = self._flags.get(node, 0) | flags
+
+    # ------------------------------------------------------------------ #
+    # Traversal
+    # ------------------------------------------------------------------ #
+
+    def blast_radius(self) -> Dict[str, Any]:
+        """Compute the blast radius of the resource changes added so far.
+
+        Returns:
+            A dictionary containing:
+                - blast_radius: Number of existing resources that are updated,
+                  deleted or replaced, or that depend on such a resource,
+                  directly or transitively
+                - top_dependents: List of tuples (address, "delete" or
+                  "replace", dependents) for the deleted and replaced
+                  resources with the most dependent existing resources,
+                  highest first. Resources without dependents are left out.
+        """
+        edges = self._edges
+        existing = self._existing
+        sources = list(self._flags)
+
+        # 0: not reached, 1: changed resource, 2: dependent of a changed resource.
+        state = bytearray(len(self._keys))
+        for node in sources:
+            state[node] = 1
+        reached: List[int] = []
+        stack = list(sources)
+        while stack:
+            for dependent in edges[stack.pop()]:
+                if state[dependent] != 2:
+                    if state[dependent] == 0:
+                        stack.append(dependent)
+                    state[dependent] = 2
+                    reached.append(dependent)
+        blast = sum(existing[node] for node in reached)
+        blast += sum(self._changed[node] for node in sources if state[node] == 1)
+
+        deletes = [node for node in sources if self._flags[node] & (_DELETE | _REPLACE)]
+        # Resources with the most direct dependents first, when not all are traced.
+        deletes.sort(key=lambda node: -len(edges[node]))
+        top: List[Dependents] = []
+        marks = [0] * len(self._keys)
+        for mark, source in enumerate(deletes[:MAX_TRACED_DELETES], start=1):
+            dependents = self._count_dependents(source, marks, mark)
+            if dependents:
+                action = "replace" if self._flags[source] & _REPLACE else "delete"
+                top.append((self._keys[source][2:], action, dependents))
+        top.sort(key=lambda entry: (-entry[2], entry[0]))
+        return {"blast_radius": blast, "top_dependents": top[:TOP_DEPENDENTS]}
+
+    def _count_dependents(self, source: int, marks: List[int], mark: int) -> int:
+        """Return the number of existing resources transitively depending on ``source``.
+
+        ``marks`` is shared by successive traversals, each with its own ``mark``,
+        so that it does not need to be cleared.
+        """
+        edges = self._edges
+        existing = self._existing
+        marks[source] = mark
+        stack = [source]
+        count = 0
+        while stack:
+            for dependent in edges[stack.pop()]:
+                if marks[dependent] != mark:
+                    marks[dependent] = mark
+                    count += existing[dependent]
+                    stack.append(dependent)
+        return count
+
+
+def _references(*expressions: Any) -> List[str]:
+    """Return the references found in configuration expressions, nested blocks included."""
+    found: List[str] = []
+    pending = [e for e in expressions if isinstance(e, (dict, list))]
+    while pending:
+        value = pending.pop()
+        if isinstance(value, dict):
+            for key, item in value.items():
+                if key == "references":
+                    found.extend(item)
+                elif key != "constant_value" and isinstance(item, (dict, list)):
+                    pending.append(item)
+        else:
+            pending.extend(item for item in value if isinstance(item, (dict, list)))
+    return found
+
+
+def _reference_key(prefix: str, reference: str) -> Optional[str]:
+    """Return the node key a reference made in the module at ``prefix`` points to.
+
+    Returns:
+        The key, or None for references that cannot be followed (locals,
+        ``each``, ``count``, ...).
+    """
+    parts = reference.split(".", 3)
+    root = parts[0]
+    if len(parts) < 2 or root in _NON_RESOURCE_ROOTS:
+        return None
+    if root == "var":
+        return f"V:{prefix}{_strip_key(parts[1])}"
+    if root == "module":
+        child = f"{prefix}module.{_strip_key(parts[1])}."
+        return f"O:{child}{_strip_key(parts[2])}" if len(parts) > 2 else f"A:{child}"
+    if root == "data":
+        return f"R:{prefix}data.{parts[1]}.{_strip_key(parts[2])}" if len(parts) > 2 else None
+    return f"R:{prefix}{root}.{_strip_key(parts[1])}"
+
+
+def _strip_key(name: str) -> str:
+    """Drop the instance key of a reference segment: ``this[0]`` -> ``this``."""
+    return name.split("[", 1)[0]
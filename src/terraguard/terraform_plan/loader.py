@@ -2,17 +2,143 @@
 
 This module provides functionality to load and parse Terraform plan JSON files
 generated from `terraform show -json`.
+
+Plans are opened with ``open_plan``, which reads ``-`` from stdin and
+decompresses gzip, xz and bzip2 plans on the fly, as detected from their
+first bytes. Decompressed and plain bytes are fed to the parser in chunks,
+so no temporary file is written; large plain files are memory-mapped
+rather than copied through a read buffer.
 """
 
+import contextlib
+import io
 import json
-from typing import Any, Dict, cast
+import mmap
+import os
+import sys
+from typing import IO, Any, Dict, Iterator, Optional, Tuple, Type, Union, cast
+
+from terraguard.config import STDIN
+from terraguard.terraform_plan.graph import DependencyGraph
+from terraguard.terraform_plan.sections import SectionSignals
+from terraguard.terraform_plan.stream import JsonStream
+
+# Fields of a resource change entry (and of its "change" object) that the
+# summarizer relies on.
+_RESOURCE_CHANGE_FIELDS = ("address", "module_address", "type", "name")
+_CHANGE_FIELDS = (
+    "actions",
+    "before",
+    "after",
+    "after_unknown",
+    "before_sensitive",
+    "after_sensitive",
+)
+
+
+# File name suffixes of plans, searched for in batch mode directories.
+PLAN_SUFFIXES = (".json", ".json.gz", ".json.xz", ".json.bz2")
+
+# Plain files at least this large are memory-mapped.
+MMAP_THRESHOLD = 1 << 20
+
+# Magic number of each compression format, and the module reading it.
+_COMPRESSIONS = ((b"\x1f\x8b", "gzip"), (b"\xfd7zXZ\x00", "lzma"), (b"BZh", "bz2"))
+
+PlanFile = Union[IO[bytes], mmap.mmap]
+
+
+class _Decompressed:
+    """Binary reader over a decompressed stream, reporting corrupt data as ValueError."""
+
+    def __init__(self, fp: io.BufferedIOBase, errors: Tuple[Type[Exception], ...]) -> None:
+        self._fp = fp
+        self._errors = errors
+
+    def read(self, size: int = -1) -> bytes:
+        try:
+            return self._fp.read(size)
+        except self._errors as e:
+            raise ValueError(f"Corrupt compressed plan: {e}") from None
+
+    def close(self) -> None:
+        self._fp.close()
+
+
+@contextlib.contextmanager
+def open_plan(path: str) -> Iterator[PlanFile]:
+    """Open a Terraform plan JSON file for reading as bytes.
+
+    gzip, xz and bzip2 plans are decompressed as they are read, whatever
+    their name. Plain files of ``MMAP_THRESHOLD`` bytes or more are
+    memory-mapped.
+
+    Args:
+        path: File system path to the plan, or ``STDIN`` ("-") to read it
+            from standard input. Standard input is not closed.
+
+    Yields:
+        A binary file object, or a read-only memory map.
+
+    Raises:
+        FileNotFoundError: If the file does not exist.
+        OSError: If the file cannot be read.
+    """
+    if path == STDIN:
+        yield decompressing(cast(io.BufferedReader, sys.stdin.buffer))
+        return
+    with open(path, "rb") as raw:
+        fp = decompressing(raw)
+        if fp is not raw:
+            with contextlib.closing(fp):
+                yield fp
+        elif os.fstat(raw.fileno()).st_size >= MMAP_THRESHOLD:
+            with mmap.mmap(raw.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                yield mapped
+        else:
+            yield raw
+
+
+def decompressing(raw: io.BufferedReader) -> IO[bytes]:
+    """Return a decompressing reader over ``raw`` if it starts with a known magic number.
+
+    Args:
+        raw: Buffered binary file object positioned at the start of the plan.
+
+    Returns:
+        A reader of the decompressed bytes, or ``raw`` itself if the plan is
+        not compressed.
+    """
+    # peek() returns at least the bytes of one read without consuming them
+    head = raw.peek(8)
+    for magic, name in _COMPRESSIONS:
+        if head.startswith(magic):
+            # Imported here: the compression modules are only needed for compressed plans.
+            if name == "gzip":
+                import gzip
+                import zlib
+
+                return cast(
+                    IO[bytes], _Decompressed(gzip.GzipFile(fileobj=raw), (EOFError, zlib.error))
+                )
+            if name == "lzma":
+                import lzma
+
+                return cast(
+                    IO[bytes], _Decompressed(lzma.LZMAFile(raw), (EOFError, lzma.LZMAError))
+                )
+            import bz2
+
+            return cast(IO[bytes], _Decompressed(bz2.BZ2File(raw), (EOFError,)))
+    return raw
 
 
 def load_plan_json(path: str) -> Dict[str, Any]:
     """Load and parse a Terraform plan JSON file.
 
     Args:
-        path: File system path to the Terraform plan JSON file.
+        path: File system path to the Terraform plan JSON file, which may be
+            compressed, or "-" for stdin (see ``open_plan``).
 
     Returns:
         A dictionary containing the parsed Terraform plan data.
@@ -22,5 +148,97 @@ def load_plan_json(path: str) -> Dict[str, Any]:
         json.JSONDecodeError: If the file contains invalid JSON.
         OSError: If the file cannot be read.
     """
-    with open(path, encoding="utf-8") as f:
-        return cast(Dict[str, Any], json.load(f))
+    with open_plan(path) as f:
+        # A memory map is decoded in place, without reading it into bytes first
+        data = str(f, "utf-8") if isinstance(f, mmap.mmap) else f.read()
+        return cast(Dict[str, Any], json.loads(data))
+
+
+def iter_resource_changes(
+    path: str,
+    graph: Optional[DependencyGraph] = None,
+    signals: Optional[SectionSignals] = None,
+) -> Iterator[Dict[str, Any]]:
+    """Stream the resource changes of a Terraform plan JSON file.
+
+    The plan is read incrementally, in a single pass. Top-level sections
+    other than ``resource_changes`` and those collected into ``graph`` and
+    ``signals`` (``prior_state``, ``planned_values``, ...) are skipped
+    without being decoded, and each resource change is reduced
+    to the fields used by the summarizer as soon as it is parsed. Memory use is
+    therefore independent of the size of the plan, as long as the caller does
+    not hold on to the yielded changes.
+
+    Args:
+        path: File system path to the Terraform plan JSON file, which may be
+            compressed, or "-" for stdin (see ``open_plan``).
+        graph: Optional dependency graph to add the plan's ``configuration``
+            block to, as it is read. The graph is complete once the iterator
+            is exhausted.
+        signals: Optional collector to add the plan's ``resource_drift`` and
+            ``output_changes`` to, as they are read, likewise.
+
+    Yields:
+        One dictionary per resource change holding ``address``, ``type``,
+        ``name`` and ``change`` with its ``actions``, ``before``, ``after``,
+        ``after_unknown``, ``before_sensitive`` and ``after_sensitive``
+        (when present in the plan).
+
+    Raises:
+        FileNotFoundError: If the file does not exist.
+        ValueError: If the file contains invalid JSON.
+        OSError: If the file cannot be read.
+    """
+    with open_plan(path) as f:
+        yield from iter_resource_changes_from_file(cast(IO[bytes], f), graph, signals)
+
+
+def iter_resource_changes_from_file(
+    fp: IO[bytes],
+    graph: Optional[DependencyGraph] = None,
+    signals: Optional[SectionSignals] = None,
+) -> Iterator[Dict[str, Any]]:
+    """Stream the resource changes of a Terraform plan JSON document from a file object.
+
+    Like ``iter_resource_changes``, for plans that do not come from a named
+    file (a socket, a pipe, ...). The file object is read up to the end of the
+    JSON document and is not closed.
+
+    Args:
+        fp: Binary file object positioned at the start of the plan JSON.
+        graph: Optional dependency graph to add the ``configuration`` block to.
+        signals: Optional collector to add the ``resource_drift`` and
+            ``output_changes`` to.
+
+    Yields:
+        One projected dictionary per resource change (see ``iter_resource_changes``).
+
+    Raises:
+        ValueError: If the document is not valid JSON.
+        OSError: If the file object cannot be read.
+    """
+    stream = JsonStream(fp)
+    for key in stream.iter_object():
+        if key == "configuration" and graph is not None:
+            graph.read_configuration(stream)
+            continue
+        if signals is not None and key == "resource_drift":
+            signals.read_drift(stream)
+            continue
+        if signals is not None and key == "output_changes":
+            signals.read_outputs(stream)
+            continue
+        if key != "resource_changes":
+            stream.skip_value()
+            continue
+        for _ in stream.iter_array():
+            yield project_resource_change(stream.read_value())
+
+
+def project_resource_change(rc: Dict[str, Any]) -> Dict[str, Any]:
+    """Reduce a resource change entry to the fields used by the summarizer."""
+    projected = {k: rc[k] for k in _RESOURCE_CHANGE_FIELDS if k in rc}
+    change = rc.get("change")
+    if isinstance(change, dict):
+        projected["change"] = {k: change[k] for k in _CHANGE_FIELDS if k in change}
+    return projected
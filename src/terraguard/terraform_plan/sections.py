@@ -0,0 +1,123 @@
+"""Drift and output signals of a plan.
+
+Besides ``resource_changes``, a plan has two sections worth a reviewer's
+attention:
+
+- ``resource_drift``: resources changed outside of Terraform since the last
+  apply, in the same format as resource changes. A HIGH or CRITICAL risk
+  resource edited out of band (a security group opened from the console,
+  say) is a signal whatever the plan changes.
+- ``output_changes``: the planned changes of the root module outputs. An
+  output that was sensitive and no longer is will have its value printed in
+  clear text by later runs.
+
+``SectionSignals`` collects both while the plan is read, in the same pass
+as the resource changes (see ``terraform_plan.loader.iter_resource_changes``).
+Drifted resources are mapped to their risk level by the same matcher as the
+resource changes.
+"""
+
+from typing import Any, Dict, List, Mapping, Tuple
+
+from terraguard.risk.risk import get_risk_matcher, max_level
+from terraguard.terraform_plan.stream import JsonStream
+from terraguard.terraform_plan.table import HIGH, LEVELS, ChangeRow, action_bits
+
+
+class SectionSignals:
+    """Collects the drift and output signals of a plan as its sections are read."""
+
+    def __init__(self, risk_config: Dict[str, Any]) -> None:
+        """Create an empty collector.
+
+        Args:
+            risk_config: Risk configuration dictionary used to map drifted
+                resources to risk levels.
+        """
+        matcher = get_risk_matcher(risk_config)
+        self._match_risk = matcher.match
+        self._match_attributes = matcher.attributes.match if matcher.attributes else None
+        self.drifted_resources = 0
+        # (rtype, address, risk_level, actions) of HIGH and CRITICAL risk drifts
+        self.drift_details: List[ChangeRow] = []
+        # (output name, "unmasked" or "masked") of outputs whose sensitivity changes
+        self.output_flips: List[Tuple[str, str]] = []
+
+    def add_drift(self, rc: Mapping[str, Any]) -> None:
+        """Add an entry of the plan's ``resource_drift`` list."""
+        change = rc.get("change", {})
+        actions: List[str] = change.get("actions", [])
+        if not action_bits(actions):
+            return
+        self.drifted_resources += 1
+        rtype = rc.get("type", "")
+        risk_level, _ = self._match_risk(rtype)
+        if self._match_attributes is not None:
+            hit = self._match_attributes(rtype, actions, change)
+            if hit is not None:
+                risk_level = max_level(risk_level, hit[0])
+        if LEVELS[risk_level] >= HIGH:
+            address = rc.get("address", f"{rtype}.{rc.get('name', 'unknown')}")
+            self.drift_details.append((rtype, address, risk_level, actions))
+
+    def add_output(self, name: str, change: Mapping[str, Any]) -> None:
+        """Add a member of the plan's ``output_changes`` object."""
+        actions = change.get("actions", [])
+        if "create" in actions or "delete" in actions:
+            return
+        before = _is_sensitive(change.get("before_sensitive"))
+        after = _is_sensitive(change.get("after_sensitive"))
+        if before != after:
+            self.output_flips.append((name, "masked" if after else "unmasked"))
+
+    def read_drift(self, stream: JsonStream) -> None:
+        """Add the ``resource_drift`` list at the current position of a stream."""
+        if stream.peek() != "[":
+            stream.skip_value()
+            return
+        for _ in stream.iter_array():
+            self.add_drift(stream.read_value())
+
+    def read_outputs(self, stream: JsonStream) -> None:
+        """Add the ``output_changes`` object at the current position of a stream."""
+        if stream.peek() != "{":
+            stream.skip_value()
+            return
+        for name in stream.iter_object():
+            self.add_output(name, stream.read_value())
+
+    def extend(self, other: "SectionSignals") -> None:
+        """Add the signals collected by another collector over a later part of the plan."""
+        self.drifted_resources += other.drifted_resources
+        self.drift_details.extend(other.drift_details)
+        self.output_flips.extend(other.output_flips)
+
+    def stats(self) -> Dict[str, Any]:
+        """Return the statistics of the signals (see ``summarize_changes``)."""
+        return {
+            "drifted_resources": self.drifted_resources,
+            "sensitive_drifts": len(self.drift_details),
+            "drift_details": self.drift_details,
+            "unmasked_outputs": sum(flip == "unmasked" for _, flip in self.output_flips),
+            "output_flips": self.output_flips,
+        }
+
+
+def empty_stats() -> Dict[str, Any]:
+    """Return the signal statistics of a plan without drift or output changes."""
+    return {
+        "drifted_resources": 0,
+        "sensitive_drifts": 0,
+        "drift_details": [],
+        "unmasked_outputs": 0,
+        "output_flips": [],
+    }
+
+
+def _is_sensitive(marker: Any) -> bool:
+    """Return whether a sensitivity marker marks the value or any part of it sensitive."""
+    if isinstance(marker, dict):
+        return any(_is_sensitive(value) for value in marker.values())
+    if isinstance(marker, list):
+        return any(_is_sensitive(value) for value in marker)
+    return marker is True
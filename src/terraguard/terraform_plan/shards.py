@@ -0,0 +1,312 @@
+"""Summarizing one large plan on several processes.
+
+Most of the time taken to assess a large plan goes into parsing its
+resource changes. ``summarize_plan_sharded`` splits the bytes of the
+``resource_changes`` array of a plain (not compressed) plan file into
+shards, and a process pool parses the changes of each shard and maps them
+to their risk level and change code (``match_resource_changes``), while
+this process reads the rest of the plan. The matched changes of the shards
+are concatenated in plan order and summarized by
+``summarize_matched_changes``, so the statistics, ``sensitive_details``
+included, are those of the serial path. The drift and output signals are
+collected from the sections before and after the array.
+
+A worker does not know where the first change of its shard starts. It
+looks for the first ``{"address":`` following ``},`` at or after the start
+of the shard, parses changes from there as long as they start before the
+end of the shard, and returns the byte offsets where it started and
+stopped. A match inside a change (a nested object with an ``address``
+member) is caught by chaining the shards: the changes of a shard are used
+only if it started where the previous shard stopped. Otherwise the shard
+is parsed again from there, in this process.
+
+Plans this cannot be applied to, invalid JSON included, are left to the
+serial path, which reports errors as usual.
+"""
+
+import mmap
+import re
+from itertools import chain
+from typing import IO, Any, Dict, Iterator, List, Optional, Tuple
+
+from terraguard.config import STDIN
+from terraguard.terraform_plan.baseline import BaselineDiff
+from terraguard.terraform_plan.graph import DependencyGraph
+from terraguard.terraform_plan.loader import project_resource_change
+from terraguard.terraform_plan.sections import SectionSignals
+from terraguard.terraform_plan.stream import JsonStream
+from terraguard.terraform_plan.summarizer import (
+    MatchedChange,
+    match_resource_changes,
+    summarize_matched_changes,
+)
+from terraguard.terraform_plan.table import ChangeTable
+
+# Plain plan files at least this large are summarized in shards when more
+# than one process may be used.
+SHARD_THRESHOLD = 32 << 20
+
+# Shards are at least this large, and there are up to this many per process
+# so that processes finishing early pick up more.
+MIN_SHARD_BYTES = 4 << 20
+SHARDS_PER_JOB = 4
+
+# Top-level keys written after "resource_changes" by `terraform show -json`,
+# used to estimate where the array ends.
+_FOLLOWING_KEYS = (
+    b"output_changes",
+    b"prior_state",
+    b"configuration",
+    b"relevant_attributes",
+    b"checks",
+    b"timestamp",
+    b"applyable",
+    b"complete",
+    b"errored",
+)
+
+_WS = re.compile(rb"[ \t\n\r]*")
+# The opening brace of a change following the previous one.
+_CHANGE_START = re.compile(rb'\}[ \t\n\r]*,[ \t\n\r]*(\{)[ \t\n\r]*"address"[ \t\n\r]*:')
+_ARRAY_END = re.compile(rb"\][ \t\n\r]*,[ \t\n\r]*\Z")
+_DOCUMENT_END = re.compile(rb"\][ \t\n\r]*\}[ \t\n\r]*\Z")
+# Continuation bytes of UTF-8 sequences; the other bytes each start a character.
+_CONTINUATION_BYTES = bytes(range(0x80, 0xC0))
+
+# (start, stop or None for the end of the array, whether the first change
+# must be searched for) of a shard.
+Shard = Tuple[int, Optional[int], bool]
+# (offset of the first change or -1 if none was found, offset where parsing
+# stopped, whether the array ended there, matched changes) of a parsed shard.
+ShardResult = Tuple[int, int, bool, List[MatchedChange]]
+
+# Plan path and risk configuration installed in each pool worker by _init_worker.
+_worker_path = ""
+_worker_risk_config: Dict[str, Any] = {}
+
+
+def shardable(path: str, jobs: int) -> bool:
+    """Return whether ``summarize_plan_sharded`` is worth trying on a plan file.
+
+    Args:
+        path: Path of the plan file.
+        jobs: Maximum number of worker processes.
+    """
+    if jobs <= 1 or path == STDIN:
+        return False
+    try:
+        with open(path, "rb") as f:
+            return f.seek(0, 2) >= SHARD_THRESHOLD
+    except OSError:
+        return False
+
+
+def summarize_plan_sharded(
+    path: str,
+    risk_config: Dict[str, Any],
+    jobs: int,
+    baseline: Optional[BaselineDiff] = None,
+    table: Optional[ChangeTable] = None,
+) -> Optional[Dict[str, Any]]:
+    """Summarize a plan file with its resource changes parsed on a process pool.
+
+    Args:
+        path: Path of a plain plan JSON file.
+        risk_config: Risk configuration dictionary.
+        jobs: Maximum number of worker processes.
+        baseline: Optional diff against a baseline plan (see
+            ``summarize_resource_changes``).
+        table: Optional change table to record every change in.
+
+    Returns:
+        The statistics dictionary of ``summarize_resource_changes`` for the
+        whole plan, or None if the plan could not be summarized in shards;
+        neither ``baseline`` nor ``table`` is then used, and the plan should
+        be summarized serially.
+    """
+    try:
+        with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            parts, graph, signals = _read_sharded(path, f, mm, risk_config, jobs)
+    except Exception:
+        # Including invalid plans: the serial path reports their errors.
+        return None
+    return summarize_matched_changes(chain.from_iterable(parts), graph, baseline, table, signals)
+
+
+def _read_sharded(
+    path: str, f: IO[bytes], mm: mmap.mmap, risk_config: Dict[str, Any], jobs: int
+) -> Tuple[List[List[MatchedChange]], DependencyGraph, SectionSignals]:
+    """Return the matched changes of each shard, in order, and the plan's graph and signals.
+
+    Raises:
+        ValueError: If the plan is not laid out as expected, or is invalid.
+    """
+    if not mm[:64].lstrip().startswith(b"{"):
+        raise ValueError("Not a plain JSON plan")
+    stream = JsonStream(f)
+    signals = SectionSignals(risk_config)
+    for key in stream.iter_object():
+        if key == "resource_changes":
+            break
+        if key == "configuration":
+            # Not where Terraform writes it; read the plan serially
+            raise ValueError("Configuration before resource changes")
+        if key == "resource_drift":
+            signals.read_drift(stream)
+        elif key == "output_changes":
+            signals.read_outputs(stream)
+        else:
+            stream.skip_value()
+    else:
+        raise ValueError("No resource changes")
+    if stream.peek() != "[":
+        raise ValueError("Resource changes are not an array")
+    first = _WS.match(mm, stream.byte_offset() + 1).end()  # type: ignore[union-attr]
+    if mm[first : first + 1] == b"]":
+        graph, rest_signals = _read_rest(f, first + 1, risk_config)
+        signals.extend(rest_signals)
+        return [], graph, signals
+
+    estimate = _estimate_end(mm, first)
+    count = min(jobs * SHARDS_PER_JOB, (estimate - first) // MIN_SHARD_BYTES)
+    if count < 2:
+        raise ValueError("Too few resource changes to shard")
+    bounds = [first + (estimate - first) * i // count for i in range(count)]
+    shards: List[Shard] = [
+        (start, stop, i > 0) for i, (start, stop) in enumerate(zip(bounds, [*bounds[1:], None]))
+    ]
+
+    # Imported here: concurrent.futures.process pulls in multiprocessing.
+    from concurrent.futures import ProcessPoolExecutor
+
+    with ProcessPoolExecutor(
+        max_workers=min(jobs, count), initializer=_init_worker, initargs=(path, risk_config)
+    ) as pool:
+        futures = [pool.submit(_match_in_worker, shard) for shard in shards]
+        # The rest of the plan is read meanwhile, from where the array likely ends
+        rest: Optional[Tuple[DependencyGraph, SectionSignals]] = None
+        try:
+            rest = _read_rest(f, estimate, risk_config)
+        except ValueError:
+            pass
+
+        parts: List[List[MatchedChange]] = []
+        expected = first
+        for (_, stop, _), future in zip(shards, futures):
+            if stop is not None and expected >= stop:
+                # The previous shard ended past this one
+                future.cancel()
+                continue
+            result = future.result()
+            if result is None or result[0] != expected:
+                result = _read_shard(mm, expected, stop, risk_config)
+            _, expected, closed, matched = result
+            parts.append(matched)
+            if closed:
+                break
+        for future in futures:
+            future.cancel()
+    if rest is None or expected != _WS.match(mm, estimate).end():  # type: ignore[union-attr]
+        rest = _read_rest(f, expected, risk_config)
+    graph, rest_signals = rest
+    signals.extend(rest_signals)
+    return parts, graph, signals
+
+
+def _estimate_end(mm: mmap.mmap, first: int) -> int:
+    """Return the likely offset just past the ``resource_changes`` array."""
+    for key in _FOLLOWING_KEYS:
+        pos = mm.find(b'"' + key + b'"', first)
+        if pos >= 0:
+            match = _ARRAY_END.search(mm, max(first, pos - 256), pos)
+            if match is not None:
+                return match.start() + 1
+    match = _DOCUMENT_END.search(mm, max(first, len(mm) - 256))
+    return match.start() + 1 if match is not None else len(mm)
+
+
+def _read_rest(
+    f: IO[bytes], offset: int, risk_config: Dict[str, Any]
+) -> Tuple[DependencyGraph, SectionSignals]:
+    """Read the top-level members after the ``resource_changes`` array ending at ``offset``.
+
+    Returns:
+        The dependency graph of the plan's configuration, and the signals of
+        the sections read.
+    """
+    f.seek(offset)
+    stream = JsonStream(f)
+    graph = DependencyGraph()
+    signals = SectionSignals(risk_config)
+    for key in stream.iter_object(resume=True):
+        if key == "configuration":
+            graph.read_configuration(stream)
+        elif key == "resource_drift":
+            signals.read_drift(stream)
+        elif key == "output_changes":
+            signals.read_outputs(stream)
+        elif key == "resource_changes":
+            raise ValueError("Duplicate resource changes")
+        else:
+            stream.skip_value()
+    return graph, signals
+
+
+def _init_worker(path: str, risk_config: Dict[str, Any]) -> None:
+    global _worker_path, _worker_risk_config
+    _worker_path = path
+    _worker_risk_config = risk_config
+
+
+def _match_in_worker(shard: Shard) -> Optional[ShardResult]:
+    start, stop, search = shard
+    try:
+        with open(_worker_path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            if search:
+                start = _find_change(mm, start, stop)
+                if start < 0:
+                    return None
+            return _read_shard(mm, start, stop, _worker_risk_config)
+    except Exception:
+        # A shard started at a false match may not parse; it is read again
+        return None
+
+
+def _find_change(mm: mmap.mmap, start: int, stop: Optional[int]) -> int:
+    """Return the offset of the first likely change starting in ``[start, stop)``, or -1."""
+    end = len(mm) if stop is None else min(stop + 256, len(mm))
+    pos = max(start - 256, 0)
+    while True:
+        match = _CHANGE_START.search(mm, pos, end)
+        if match is None or (stop is not None and match.start(1) >= stop):
+            return -1
+        if match.start(1) >= start:
+            return match.start(1)
+        pos = match.start(1)
+
+
+def _read_shard(
+    mm: mmap.mmap, start: int, stop: Optional[int], risk_config: Dict[str, Any]
+) -> ShardResult:
+    """Parse and match the changes from ``start`` to the first one starting at ``stop`` or after."""
+    limit = None
+    if stop is not None:
+        # Offsets in the stream count characters
+        data = mm[start:stop]
+        limit = len(data) if data.isascii() else len(data.translate(None, _CONTINUATION_BYTES))
+    mm.seek(start)
+    stream = JsonStream(mm)  # type: ignore[arg-type]
+    closed: List[bool] = []
+    matched = match_resource_changes(_iter_shard(stream, limit, closed), risk_config)
+    return start, start + stream.byte_offset(), bool(closed), matched
+
+
+def _iter_shard(
+    stream: JsonStream, limit: Optional[int], closed: List[bool]
+) -> Iterator[Dict[str, Any]]:
+    """Yield the projected changes starting before ``limit``; appends to ``closed`` at the end."""
+    for _ in stream.iter_array(resume=True):
+        if limit is not None and stream.offset() >= limit:
+            return
+        yield project_resource_change(stream.read_value())
+    closed.append(True)
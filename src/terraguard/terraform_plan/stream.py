@@ -0,0 +1,276 @@
+"""Incremental JSON reading for large Terraform plan files.
+
+This module provides a small pull-style JSON reader that walks a document in
+fixed-size chunks. Callers iterate over objects and arrays and decide, value by
+value, whether to materialize it (``read_value``) or to skip it
+(``skip_value``). Skipped values are never built as a whole, so the memory
+needed to walk a plan is bounded by the chunk size and the largest value that
+is actually read, not by the size of the file.
+"""
+
+import codecs
+import json
+import re
+from typing import IO, Any, Iterator, Pattern
+
+# Default number of bytes (or characters, for text files) read per chunk.
+DEFAULT_CHUNK_SIZE = 1 << 20
+
+_WS = re.compile(r"[ \t\n\r]*")
+# Body of a JSON string up to (not including) its closing quote or a dangling backslash.
+_STRING_BODY = re.compile(r'[^"\\]*(?:\\.[^"\\]*)*', re.S)
+
+
+class JsonStreamError(ValueError):
+    """Raised when the streamed document is not valid JSON."""
+
+
+class JsonStream:
+    """Pull-style reader over a JSON document stored in a file object.
+
+    The file object may be opened in text or binary mode; binary input is
+    decoded as UTF-8 one chunk at a time.
+
+    Example:
+        >>> for key in stream.iter_object():
+        ...     if key == "resource_changes":
+        ...         for _ in stream.iter_array():
+        ...             item = stream.read_value()
+        ...     else:
+        ...         stream.skip_value()
+
+    Every key yielded by ``iter_object`` and every step of ``iter_array`` must be
+    followed by exactly one ``read_value``, ``skip_value`` or nested iteration
+    before the iterator is resumed.
+    """
+
+    def __init__(self, fp: IO[Any], chunk_size: int = DEFAULT_CHUNK_SIZE) -> None:
+        self._fp = fp
+        self._chunk_size = chunk_size
+        self._utf8 = codecs.getincrementaldecoder("utf-8")()
+        self._decoder = json.JSONDecoder()
+        self._buf = ""
+        self._pos = 0
+        self._consumed = 0
+        self._read = 0
+        self._eof = False
+
+    # ------------------------------------------------------------------ #
+    # Buffer management
+    # ------------------------------------------------------------------ #
+
+    def _fill(self, size: int = 0) -> bool:
+        """Append at least one more chunk to the buffer, dropping consumed input.
+
+        Returns:
+            False if the end of the input has been reached, True otherwise.
+        """
+        if self._eof:
+            return False
+        text = ""
+        while not text:
+            chunk = self._fp.read(max(size, self._chunk_size))
+            if isinstance(chunk, bytes):
+                self._read += len(chunk)
+                text = self._utf8.decode(chunk, final=not chunk)
+            else:
+                text = chunk
+            if not chunk:
+                self._eof = True
+                return False
+        if self._pos:
+            self._consumed += self._pos
+            self._buf = self._buf[self._pos :] + text
+            self._pos = 0
+        else:
+            self._buf += text
+        return True
+
+    def _error(self, msg: str, pos: int) -> JsonStreamError:
+        return JsonStreamError(f"{msg} (char {self._consumed + pos})")
+
+    def _skip_ws(self) -> None:
+        while True:
+            self._pos = _match_end(_WS, self._buf, self._pos)
+            if self._pos < len(self._buf) or not self._fill():
+                return
+
+    def peek(self) -> str:
+        """Return the next non-whitespace character without consuming it.
+
+        Returns:
+            The character, or an empty string at the end of the input.
+        """
+        self._skip_ws()
+        return self._buf[self._pos] if self._pos < len(self._buf) else ""
+
+    def _expect(self, char: str) -> None:
+        if self.peek() != char:
+            raise self._error(f"Expecting {char!r}", self._pos)
+        self._pos += 1
+
+    def _closed(self, char: str) -> bool:
+        """Consume the delimiter after a member or item: True if it is ``char``, False for ','."""
+        found = self.peek()
+        self._pos += 1
+        if found == char:
+            return True
+        if found != ",":
+            raise self._error("Expecting ',' delimiter", self._pos - 1)
+        return False
+
+    def offset(self) -> int:
+        """Return the number of characters before the next non-whitespace character."""
+        self._skip_ws()
+        return self._consumed + self._pos
+
+    def byte_offset(self) -> int:
+        """Return ``offset`` in bytes of binary input."""
+        self._skip_ws()
+        pending = len(self._utf8.getstate()[0])
+        return self._read - pending - len(self._buf[self._pos :].encode("utf-8"))
+
+    # ------------------------------------------------------------------ #
+    # Structured iteration
+    # ------------------------------------------------------------------ #
+
+    def iter_object(self, resume: bool = False) -> Iterator[str]:
+        """Iterate over the keys of the object starting at the current position.
+
+        Args:
+            resume: Whether the stream is positioned right after a member
+                value instead, e.g. a file object seeked past a value read by
+                other means; the iteration continues with the next member.
+
+        Yields:
+            Each member name. The caller must consume the member value before
+            resuming the iterator.
+        """
+        if resume:
+            if self._closed("}"):
+                return
+        else:
+            self._expect("{")
+            if self.peek() == "}":
+                self._pos += 1
+                return
+        while True:
+            if self.peek() != '"':
+                raise self._error("Expecting property name enclosed in double quotes", self._pos)
+            key = self.read_value()
+            self._expect(":")
+            yield key
+            if self._closed("}"):
+                return
+
+    def iter_array(self, resume: bool = False) -> Iterator[None]:
+        """Iterate over the items of the array starting at the current position.
+
+        Args:
+            resume: Whether the stream is positioned at an item instead, e.g.
+                a file object seeked into the array; the iteration starts
+                with that item.
+
+        Yields:
+            None once per item. The caller must consume the item before resuming
+            the iterator.
+        """
+        if not resume:
+            self._expect("[")
+            if self.peek() == "]":
+                self._pos += 1
+                return
+        while True:
+            yield None
+            if self._closed("]"):
+                return
+
+    # ------------------------------------------------------------------ #
+    # Values
+    # ------------------------------------------------------------------ #
+
+    def read_value(self) -> Any:
+        """Decode and return the value at the current position.
+
+        Raises:
+            JsonStreamError: If the value is not valid JSON.
+        """
+        self._skip_ws()
+        grow = self._chunk_size
+        while True:
+            try:
+                value, end = self._decoder.raw_decode(self._buf, self._pos)
+            except json.JSONDecodeError as e:
+                truncated = e.pos >= len(self._buf) - 8 or e.msg.startswith("Unterminated")
+                if truncated and self._fill(grow):
+                    grow *= 2
+                    continue
+                raise self._error(e.msg, e.pos) from None
+            # A number such as "1.5e+3" may continue in the next chunk.
+            if end > len(self._buf) - 3 and self._fill():
+                continue
+            self._pos = end
+            return value
+
+    def skip_value(self) -> None:
+        """Advance past the value at the current position.
+
+        A container that fits in the buffer is decoded by the C scanner and
+        dropped straight away. A larger one is descended into and its members
+        are skipped one by one, so at most about one chunk worth of skipped
+        data is alive as Python objects at any time. Long strings are scanned
+        without being decoded.
+        """
+        char = self.peek()
+        if char == '"':
+            self._pos += 1
+            self._skip_string_body()
+        elif char == "{":
+            if not self._discard_buffered():
+                for _ in self.iter_object():
+                    self.skip_value()
+        elif char == "[":
+            if not self._discard_buffered():
+                for _ in self.iter_array():
+                    self.skip_value()
+        else:
+            self.read_value()
+
+    def _discard_buffered(self) -> bool:
+        """Decode and drop the value at the current position if it fits in a chunk.
+
+        Returns:
+            True if the value was skipped, False if it is larger than a chunk
+            and the position was left unchanged.
+        """
+        while True:
+            try:
+                _, end = self._decoder.raw_decode(self._buf, self._pos)
+            except json.JSONDecodeError as e:
+                truncated = e.pos >= len(self._buf) - 8 or e.msg.startswith("Unterminated")
+                if not truncated:
+                    raise self._error(e.msg, e.pos) from None
+                if len(self._buf) - self._pos < self._chunk_size and self._fill():
+                    continue
+                if self._eof:
+                    raise self._error(e.msg, e.pos) from None
+                return False
+            self._pos = end
+            return True
+
+    def _skip_string_body(self) -> None:
+        """Advance past the remainder of a string whose opening quote is consumed."""
+        while True:
+            self._pos = _match_end(_STRING_BODY, self._buf, self._pos)
+            if self._pos < len(self._buf) and self._buf[self._pos] == '"':
+                self._pos += 1
+                return
+            # Either the buffer ended or it ends with a dangling backslash.
+            if not self._fill():
+                raise self._error("Unterminated string", self._pos)
+
+
+def _match_end(pattern: Pattern[str], text: str, pos: int) -> int:
+    """Return where a pattern that may match the empty string stops matching at ``pos``."""
+    match = pattern.match(text, pos)
+    return match.end() if match else pos
@@ -4,9 +4,33 @@ This module analyzes Terraform plan data and produces statistics about
 resource changes, categorizing them by risk level and action type.
 """
 
-from typing import Any, Dict, List, Tuple
+from typing import Any, Dict, Iterable, Iterator, List, Mapping, Optional, Sequence, Tuple
 
-from terraguard.risk.risk import map_risk_level
+from terraguard.config import RISK_LEVEL_ORDER
+from terraguard.risk.attributes import AttributeMatch
+from terraguard.risk.risk import get_risk_matcher, max_level
+from terraguard.risk.rules import guaranteed_level
+from terraguard.terraform_plan.baseline import REVIEWED, BaselineDiff
+from terraguard.terraform_plan.graph import DependencyGraph
+from terraguard.terraform_plan.sections import SectionSignals, empty_stats
+from terraguard.terraform_plan.table import (
+    CHANGED,
+    CREATE,
+    CRITICAL,
+    DELETE,
+    HIGH,
+    LEVEL_MASK,
+    LEVELS,
+    UPDATE,
+    ChangeTable,
+    action_bits,
+)
+from terraguard.terraform_plan.table import REVIEWED as REVIEWED_FLAG
+from terraguard.terraform_plan.tree import build_trees
+
+# (address, rtype, module address, code, actions, attribute rule match) of a
+# resource change, as returned by ``match_resource_changes``.
+MatchedChange = Tuple[str, str, str, int, List[str], Optional[AttributeMatch]]
 
 
 def summarize_changes(plan: Dict[str, Any], risk_config: Dict[str, Any]) -> Dict[str, Any]:
@@ -15,6 +39,12 @@ def summarize_changes(plan: Dict[str, Any], risk_config: Dict[str, Any]) -> Dict
     Analyzes resource changes in the plan, counts actions (create/update/delete),
     and maps each resource to its risk level using the provided configuration.
 
+    When the plan has a "configuration" block, the dependency graph of its
+    resources gives the blast radius of the changes (see
+    ``terraform_plan.graph``). Its "resource_drift" and "output_changes"
+    sections give the drift and output signals (see
+    ``terraform_plan.sections``).
+
     Args:
         plan: Terraform plan dictionary containing a "resource_changes" list.
         risk_config: Risk configuration dictionary used to map resource types
@@ -32,53 +62,323 @@ def summarize_changes(plan: Dict[str, Any], risk_config: Dict[str, Any]) -> Dict
             - critical_deletes: Number of CRITICAL risk resources being deleted
             - sensitive_details: List of tuples (rtype, address, risk_level, actions)
                 for HIGH and CRITICAL risk resources
+            - attribute_changes: List of tuples (address, attribute, risk_level,
+                reason) for resources matched by an attribute risk rule
+            - blast_radius: Number of existing resources changed or depending
+                on a changed resource, or None without a configuration block
+            - top_dependents: List of tuples (address, action, dependents) for
+                the deleted and replaced resources with the most dependents
+            - baseline: Counts of new, escalated, reviewed and removed
+                changes, or None without a baseline
+            - escalated_changes: List of tuples (address, baseline actions,
+                actions, baseline risk level, risk level) for changes
+                escalated since the baseline
+            - reviewed_details: List of tuples (rtype, address, risk_level,
+                actions) for HIGH and CRITICAL risk changes already reviewed
+                in the baseline
+            - partial: Whether the scan stopped early (see
+                ``summarize_resource_changes``), the counts then being lower
+                bounds
+            - scanned: Number of resource changes read
+            - module_rollup: Changes rolled up by module, as tuples (path,
+                depth, changes, deletes, sensitive, risk_level), see
+                ``terraform_plan.tree``
+            - provider_rollup: Changes rolled up by resource type prefix,
+                as tuples like module_rollup's
+            - drifted_resources: Number of resources changed outside of
+                Terraform (the plan's "resource_drift")
+            - sensitive_drifts: Number of HIGH and CRITICAL risk resources
+                among them
+            - drift_details: List of tuples (rtype, address, risk_level,
+                actions) for those HIGH and CRITICAL risk resources
+            - unmasked_outputs: Number of outputs that will no longer be
+                sensitive
+            - output_flips: List of tuples (name, "unmasked" or "masked")
+                for the outputs whose sensitivity changes
+
+        With a baseline, the counts and details of the resource changes
+        cover only the new and escalated changes; the rollups and the drift
+        and output signals cover the whole plan.
+    """
+    graph = None
+    configuration = plan.get("configuration")
+    if isinstance(configuration, dict):
+        graph = DependencyGraph()
+        graph.add_configuration(configuration)
+    signals = SectionSignals(risk_config)
+    for rc in plan.get("resource_drift") or []:
+        signals.add_drift(rc)
+    for name, change in (plan.get("output_changes") or {}).items():
+        signals.add_output(name, change)
+    return summarize_resource_changes(
+        plan.get("resource_changes", []), risk_config, graph, signals=signals
+    )
+
+
+def summarize_resource_changes(
+    resource_changes: Iterable[Mapping[str, Any]],
+    risk_config: Dict[str, Any],
+    graph: Optional[DependencyGraph] = None,
+    baseline: Optional[BaselineDiff] = None,
+    table: Optional[ChangeTable] = None,
+    stop_at: Optional[str] = None,
+    signals: Optional[SectionSignals] = None,
+) -> Dict[str, Any]:
+    """Summarize an iterable of Terraform resource change entries.
+
+    This is the single-pass core of ``summarize_changes``. It accepts any
+    iterable, so resource changes streamed by
+    ``terraform_plan.loader.iter_resource_changes`` can be summarized without
+    loading the whole plan.
+
+    Args:
+        resource_changes: Resource change entries as found in a plan's
+            "resource_changes" list.
+        risk_config: Risk configuration dictionary used to map resource types
+            to risk levels.
+        graph: Optional dependency graph of the plan's configuration. It is
+            only used once ``resource_changes`` is exhausted, so a graph being
+            filled by ``iter_resource_changes`` can be passed along with it.
+        baseline: Optional diff against a baseline plan. Changes it
+            classifies as already reviewed are not counted, nor scored.
+        table: Optional change table to record every change in, for
+            consumers needing more than the statistics. Counts are computed
+            from it in any case.
+        stop_at: Optional overall risk level (one of RISK_LEVEL_ORDER) at
+            which to stop reading resource changes: once the changes read so
+            far guarantee ``assess_risk`` returns at least this level (see
+            ``risk.rules.guaranteed_level``), the rest is skipped and the
+            statistics are marked partial.
+        signals: Optional drift and output signals of the plan. Like
+            ``graph``, they are only used once ``resource_changes`` is
+            exhausted, so a collector being filled by
+            ``iter_resource_changes`` can be passed along with it.
+
+    Returns:
+        The statistics dictionary described in ``summarize_changes``, with
+        "partial" (whether the scan stopped early) and "scanned" (the number
+        of resource changes read).
+    """
+    return _summarize_matched(
+        _iter_matched_changes(resource_changes, risk_config),
+        graph,
+        baseline,
+        table,
+        signals,
+        stop_at,
+        risk_config,
+    )
+
+
+def match_resource_changes(
+    resource_changes: Iterable[Mapping[str, Any]], risk_config: Dict[str, Any]
+) -> List[MatchedChange]:
+    """Map resource change entries to their risk level and change code.
+
+    This is the part of ``summarize_resource_changes`` that depends on each
+    change alone, so that a plan's changes can be matched in shards on
+    several processes (see ``terraform_plan.shards``) and summarized with
+    ``summarize_matched_changes``.
+
+    Args:
+        resource_changes: Resource change entries as found in a plan's
+            "resource_changes" list.
+        risk_config: Risk configuration dictionary.
+
+    Returns:
+        One tuple (address, rtype, module address, code, actions, attribute
+        rule match) per change, in order. The codes are not flagged as
+        reviewed; that depends on the baseline.
+    """
+    return list(_iter_matched_changes(resource_changes, risk_config))
+
+
+def summarize_matched_changes(
+    matched: Iterable[MatchedChange],
+    graph: Optional[DependencyGraph] = None,
+    baseline: Optional[BaselineDiff] = None,
+    table: Optional[ChangeTable] = None,
+    signals: Optional[SectionSignals] = None,
+) -> Dict[str, Any]:
+    """Summarize resource changes already matched by ``match_resource_changes``.
+
+    Gives the same statistics as ``summarize_resource_changes`` on the
+    entries the changes were matched from, in the same order.
+
+    Args:
+        matched: Matched changes, in plan order.
+        graph: Optional dependency graph of the plan's configuration, complete.
+        baseline: Optional diff against a baseline plan.
+        table: Optional change table to record every change in.
+        signals: Optional drift and output signals of the plan, complete.
+
+    Returns:
+        The statistics dictionary described in ``summarize_changes``.
     """
-    resource_changes = plan.get("resource_changes", [])
-    stats: Dict[str, Any] = {
-        "total_resources": len(resource_changes),
-        "creates": 0,
-        "updates": 0,
-        "deletes": 0,
-        "high_risk_changes": 0,  # New stat
-        "critical_changes": 0,  # New stat
-        "high_risk_deletes": 0,  # New stat
-        "critical_deletes": 0,  # New stat
-        "sensitive_details": [],
-    }
-    # sensitive_details will now track HIGH/CRITICAL resources
-    high_critical_details: List[Tuple[str, str, str, List[str]]] = []
+    return _summarize_matched(matched, graph, baseline, table, signals)
 
+
+def _iter_matched_changes(
+    resource_changes: Iterable[Mapping[str, Any]], risk_config: Dict[str, Any]
+) -> Iterator[MatchedChange]:
+    """Yield the matched change of each entry, reading them as they are needed."""
+    matcher = get_risk_matcher(risk_config)
+    match_risk = matcher.match
+    match_attributes = matcher.attributes.match if matcher.attributes else None
     for rc in resource_changes:
         rtype = rc.get("type", "")
         address = rc.get("address", f"{rtype}.{rc.get('name', 'unknown')}")
         change = rc.get("change", {})
         actions: List[str] = change.get("actions", [])
 
-        # 1. Count basic stats
-        if "create" in actions:
-            stats["creates"] = stats.get("creates", 0) + 1
-        if "update" in actions:
-            stats["updates"] = stats.get("updates", 0) + 1
-        if "delete" in actions:
-            stats["deletes"] = stats.get("deletes", 0) + 1
-
-        # 2. Map resource risk using the new configuration
-        risk_level, _ = map_risk_level(
-            rtype, risk_config
-        )  # Assuming map_risk_level returns (level, reason)
-
-        # 3. Count changes based on mapped risk level
-        if risk_level == "HIGH" and any(a in actions for a in ("create", "update", "delete")):
-            stats["high_risk_changes"] = stats.get("high_risk_changes", 0) + 1
-            if "delete" in actions:
-                stats["high_risk_deletes"] = stats.get("high_risk_deletes", 0) + 1
-            high_critical_details.append((rtype, address, risk_level, actions))
-
-        elif risk_level == "CRITICAL" and any(a in actions for a in ("create", "update", "delete")):
-            stats["critical_changes"] = stats.get("critical_changes", 0) + 1
-            if "delete" in actions:
-                stats["critical_deletes"] = stats.get("critical_deletes", 0) + 1
-            high_critical_details.append((rtype, address, risk_level, actions))
-
-    stats["sensitive_details"] = high_critical_details
+        # Map resource risk using the new configuration
+        risk_level, _ = match_risk(rtype)  # Compiled once, memoized per type
+
+        # Attribute rules can raise the level based on which attributes change
+        hit = None
+        if match_attributes is not None:
+            hit = match_attributes(rtype, actions, change)
+            if hit is not None:
+                risk_level = max_level(risk_level, hit[0])
+        code = LEVELS[risk_level] | action_bits(actions)
+        yield address, rtype, rc.get("module_address", ""), code, actions, hit
+
+
+def _summarize_matched(
+    matched: Iterable[MatchedChange],
+    graph: Optional[DependencyGraph],
+    baseline: Optional[BaselineDiff],
+    table: Optional[ChangeTable],
+    signals: Optional[SectionSignals],
+    stop_at: Optional[str] = None,
+    risk_config: Optional[Dict[str, Any]] = None,
+) -> Dict[str, Any]:
+    """Record matched changes against the baseline and compute their statistics.
+
+    The common core of ``summarize_resource_changes`` and
+    ``summarize_matched_changes``; ``stop_at`` requires ``risk_config``.
+    """
+    table = table if table is not None else ChangeTable()
+    append = table.append
+    attribute_changes: List[Tuple[str, str, str, str]] = []
+    # Running count per change code, to check the guaranteed level whenever
+    # the count of a code reaches a power of two: a few checks per code, and
+    # a threshold crossed is noticed within twice as many changes.
+    running: Optional[List[int]] = None
+    stop_rank = 0
+    if stop_at is not None and risk_config is not None:
+        running = [0] * 256
+        stop_rank = RISK_LEVEL_ORDER.index(stop_at)
+    partial = False
+
+    for address, rtype, module, code, actions, hit in matched:
+        # Changes already reviewed in the baseline are flagged, and not counted
+        if baseline is not None and baseline.classify(address, code) == REVIEWED:
+            code |= REVIEWED_FLAG
+            if graph is not None:
+                graph.add_instance(address, actions, changed=False)
+        else:
+            if graph is not None:
+                graph.add_instance(address, actions)
+            if hit is not None:
+                attr_level, attr_reason, attr_path = hit
+                attribute_changes.append((address, attr_path, attr_level, attr_reason))
+
+        # Record the change; counts are taken from the table at the end
+        append(address, rtype, module, code)
+
+        if running is not None and risk_config is not None:
+            n = running[code] = running[code] + 1
+            if not n & (n - 1):
+                level = guaranteed_level(count_codes(running), risk_config)
+                if RISK_LEVEL_ORDER.index(level) >= stop_rank:
+                    partial = True
+                    break
+
+    return _table_stats(table, attribute_changes, graph, baseline, partial, signals)
+
+
+def _table_stats(
+    table: ChangeTable,
+    attribute_changes: List[Tuple[str, str, str, str]],
+    graph: Optional[DependencyGraph],
+    baseline: Optional[BaselineDiff],
+    partial: bool,
+    signals: Optional[SectionSignals],
+) -> Dict[str, Any]:
+    """Compute the statistics dictionary of the changes recorded in a table."""
+    stats = count_codes(table.histogram())
+    # HIGH and CRITICAL risk resources, in plan order
+    stats["sensitive_details"] = table.details(table.select(CHANGED, HIGH))
+    stats["attribute_changes"] = attribute_changes
+    stats["blast_radius"] = None
+    stats["top_dependents"] = []
+    stats["baseline"] = None
+    stats["escalated_changes"] = []
+    stats["reviewed_details"] = []
+    stats["partial"] = partial
+    stats["scanned"] = len(table)
+    module_tree, provider_tree = build_trees(table)
+    stats["module_rollup"] = module_tree.rollup()
+    stats["provider_rollup"] = provider_tree.rollup()
+    if baseline is not None:
+        stats["baseline"] = baseline.stats()
+        stats["escalated_changes"] = baseline.escalations
+        stats["reviewed_details"] = table.details(table.select(CHANGED, HIGH, reviewed=True))
+        if partial and stats["baseline"] is not None:
+            # Baseline changes may still be in the part of the plan not read
+            stats["baseline"]["removed"] = None
+    if graph is not None and graph.loaded:
+        stats.update(graph.blast_radius())
+    stats.update(signals.stats() if signals is not None else empty_stats())
+    return stats
+
+
+def count_codes(histogram: Sequence[int]) -> Dict[str, Any]:
+    """Compute the change counts from the number of changes per code.
+
+    Changes flagged as reviewed in a baseline are left out. Counting loops
+    over the 256 possible codes, not over the changes.
+
+    Args:
+        histogram: Number of changes per code, as returned by
+            ``ChangeTable.histogram``.
+
+    Returns:
+        The counts of the statistics dictionary described in
+        ``summarize_changes``.
+    """
+    stats: Dict[str, Any] = dict.fromkeys(
+        (
+            "total_resources",
+            "creates",
+            "updates",
+            "deletes",
+            "high_risk_changes",
+            "critical_changes",
+            "high_risk_deletes",
+            "critical_deletes",
+        ),
+        0,
+    )
+    for code, count in enumerate(histogram):
+        if not count or code & REVIEWED_FLAG:
+            continue
+        stats["total_resources"] += count
+        if code & CREATE:
+            stats["creates"] += count
+        if code & UPDATE:
+            stats["updates"] += count
+        if code & DELETE:
+            stats["deletes"] += count
+        if code & CHANGED:
+            level = code & LEVEL_MASK
+            if level == HIGH:
+                stats["high_risk_changes"] += count
+                if code & DELETE:
+                    stats["high_risk_deletes"] += count
+            elif level == CRITICAL:
+                stats["critical_changes"] += count
+                if code & DELETE:
+                    stats["critical_deletes"] += count
     return stats
@@ -0,0 +1,260 @@
+"""Compact columnar table of the resource changes of a plan.
+
+``ChangeTable`` keeps every summarized resource change as one row of a few
+typed arrays rather than as dictionaries and tuples:
+
+- ``codes``: one byte per change packing its resource risk level (bits 0-1,
+  an index into RESOURCE_RISK_LEVEL_ORDER), its action bitmask (``CREATE``,
+  ``UPDATE``, ``DELETE``, ``DESTROY``, ``CREATE_FIRST``) and the
+  ``REVIEWED`` flag of changes already reviewed in a baseline plan;
+- ``type_ids`` and ``module_ids``: indices into the interned lists of
+  resource types and module addresses;
+- the addresses, relative to their module, joined back to back in strings
+  of ``CHUNK_ROWS`` rows indexed by an array of end offsets.
+
+A row takes about a dozen bytes plus the length of its module-relative
+address, a small fraction of a resource change dictionary. Counts are
+computed from a histogram of the code bytes, and filters translate the code
+column into a match mask and scan it for hits, so neither loops over rows
+in Python.
+"""
+
+import sys
+from array import array
+from collections import Counter
+from itertools import accumulate
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+from terraguard.config import RESOURCE_RISK_LEVEL_ORDER
+
+# Code bits. The level takes the two lowest bits.
+LEVEL_MASK = 0b11
+CREATE = 1 << 2
+UPDATE = 1 << 3
+DELETE = 1 << 4
+# Set on deletes that are not part of a replacement.
+DESTROY = 1 << 5
+# Set on create-before-destroy replacements (actions ["create", "delete"]).
+CREATE_FIRST = 1 << 6
+REVIEWED = 1 << 7
+
+# Number of addresses per joined string.
+CHUNK_ROWS = 1024
+
+ACTION_MASK = CREATE | UPDATE | DELETE | DESTROY | CREATE_FIRST
+CHANGED = CREATE | UPDATE | DELETE
+
+LEVELS: Dict[str, int] = {level: i for i, level in enumerate(RESOURCE_RISK_LEVEL_ORDER)}
+LOW, MEDIUM, HIGH, CRITICAL = (LEVELS[level] for level in ("LOW", "MEDIUM", "HIGH", "CRITICAL"))
+
+_SINGLE_ACTION_BITS = {"create": CREATE, "update": UPDATE, "delete": DELETE | DESTROY}
+
+# (rtype, address, risk_level, actions), as in the summarizer's detail lists.
+ChangeRow = Tuple[str, str, str, List[str]]
+
+
+def action_bits(actions: Sequence[str]) -> int:
+    """Return the action bits of a change's actions; 0 for no-op and read changes."""
+    if len(actions) == 1:
+        return _SINGLE_ACTION_BITS.get(actions[0], 0)
+    bits = 0
+    for action in actions:
+        if action == "create":
+            bits |= CREATE
+        elif action == "update":
+            bits |= UPDATE
+        elif action == "delete":
+            bits |= DELETE | (CREATE_FIRST if bits & CREATE else 0)
+    if bits & (CREATE | DELETE) == DELETE:
+        bits |= DESTROY
+    return bits
+
+
+def actions_from_bits(bits: int) -> List[str]:
+    """Return the actions list of a change from its action bits."""
+    if bits & DESTROY:
+        return ["delete"]
+    if bits & (CREATE | DELETE) == CREATE | DELETE:
+        return ["create", "delete"] if bits & CREATE_FIRST else ["delete", "create"]
+    if bits & CREATE:
+        return ["create"]
+    if bits & UPDATE:
+        return ["update"]
+    return ["no-op"]
+
+
+class ChangeTable:
+    """Interned, array-backed table of resource changes."""
+
+    def __init__(self) -> None:
+        self.codes = bytearray()
+        self.type_ids = array("I")
+        self.module_ids = array("I")
+        self.types: List[str] = []
+        self.modules: List[str] = []
+        self._type_index: Dict[str, int] = {}
+        self._module_index: Dict[str, int] = {"": 0}
+        self.modules.append("")
+        # Addresses of full chunks, their end offsets, and the addresses of
+        # the chunk being filled.
+        self._chunks: List[str] = []
+        self._offsets = array("I")
+        self._pending: List[str] = []
+
+    def __len__(self) -> int:
+        return len(self.codes)
+
+    def append(self, address: str, rtype: str, module: str, code: int) -> None:
+        """Add a change.
+
+        Args:
+            address: Resource instance address.
+            rtype: Resource type.
+            module: Address of the module of the resource ("" for the root
+                module). The address is stored relative to it.
+            code: Risk level, action bits and flags of the change.
+        """
+        self.codes.append(code)
+        type_id = self._type_index.get(rtype)
+        if type_id is None:
+            type_id = self._type_index[rtype] = len(self.types)
+            self.types.append(rtype)
+        self.type_ids.append(type_id)
+        # An address outside its module is stored whole, as in the root module
+        if module and address.startswith(module) and address.startswith(".", len(module)):
+            module_id = self._module_index.get(module)
+            if module_id is None:
+                module_id = self._module_index[module] = len(self.modules)
+                self.modules.append(module)
+            self.module_ids.append(module_id)
+            address = address[len(module) + 1 :]
+        else:
+            self.module_ids.append(0)
+        pending = self._pending
+        pending.append(address)
+        if len(pending) == CHUNK_ROWS:
+            self._offsets.extend(accumulate(map(len, pending)))
+            self._chunks.append("".join(pending))
+            pending.clear()
+
+    # ------------------------------------------------------------------ #
+    # Rows
+    # ------------------------------------------------------------------ #
+
+    def address(self, row: int) -> str:
+        """Return the address of a row."""
+        chunk, index = divmod(row, CHUNK_ROWS)
+        if chunk == len(self._chunks):
+            local = self._pending[index]
+        else:
+            start = self._offsets[row - 1] if index else 0
+            local = self._chunks[chunk][start : self._offsets[row]]
+        module = self.modules[self.module_ids[row]]
+        return f"{module}.{local}" if module else local
+
+    def rtype(self, row: int) -> str:
+        """Return the resource type of a row."""
+        return self.types[self.type_ids[row]]
+
+    def module(self, row: int) -> str:
+        """Return the module address of a row ("" for the root module)."""
+        return self.modules[self.module_ids[row]]
+
+    def level(self, row: int) -> str:
+        """Return the resource risk level of a row."""
+        return RESOURCE_RISK_LEVEL_ORDER[self.codes[row] & LEVEL_MASK]
+
+    def actions(self, row: int) -> List[str]:
+        """Return the actions of a row."""
+        return actions_from_bits(self.codes[row])
+
+    def details(self, rows: Sequence[int]) -> List[ChangeRow]:
+        """Return (rtype, address, risk_level, actions) tuples of rows."""
+        codes, types, type_ids = self.codes, self.types, self.type_ids
+        # Rows with the same code share their actions list
+        actions: Dict[int, List[str]] = {}
+        details = []
+        for row in rows:
+            code = codes[row]
+            row_actions = actions.get(code)
+            if row_actions is None:
+                row_actions = actions[code] = actions_from_bits(code)
+            details.append(
+                (
+                    types[type_ids[row]],
+                    self.address(row),
+                    RESOURCE_RISK_LEVEL_ORDER[code & LEVEL_MASK],
+                    row_actions,
+                )
+            )
+        return details
+
+    # ------------------------------------------------------------------ #
+    # Vectorized operations
+    # ------------------------------------------------------------------ #
+
+    def histogram(self) -> List[int]:
+        """Return the number of rows per code (a list of 256 counts)."""
+        counts = [0] * 256
+        for code, count in Counter(self.codes).items():
+            counts[code] = count
+        return counts
+
+    def count(
+        self, any_bits: int = 0, min_level: int = LOW, reviewed: Optional[bool] = False
+    ) -> int:
+        """Return the number of rows matching a filter (see ``select``)."""
+        histogram = self.histogram()
+        return sum(histogram[code] for code in _matching_codes(any_bits, min_level, reviewed))
+
+    def select(
+        self, any_bits: int = 0, min_level: int = LOW, reviewed: Optional[bool] = False
+    ) -> List[int]:
+        """Return the rows matching a filter, in order.
+
+        Args:
+            any_bits: Action bits of which rows must have at least one, or 0
+                for any row.
+            min_level: Lowest resource risk level (an index into
+                RESOURCE_RISK_LEVEL_ORDER).
+            reviewed: Whether rows must be flagged REVIEWED (True), must not
+                be (False) or either (None).
+        """
+        table = bytearray(256)
+        for code in _matching_codes(any_bits, min_level, reviewed):
+            table[code] = 1
+        mask = self.codes.translate(table)
+        rows = []
+        find = mask.find
+        row = find(1)
+        while row != -1:
+            rows.append(row)
+            row = find(1, row + 1)
+        return rows
+
+    def iter_rows(self, rows: Optional[Sequence[int]] = None) -> Iterator[Tuple[str, str, int]]:
+        """Yield (address, rtype, code) of rows, or of all rows."""
+        for row in range(len(self)) if rows is None else rows:
+            yield self.address(row), self.rtype(row), self.codes[row]
+
+    def nbytes(self) -> int:
+        """Return the approximate memory used by the columns, interned strings excluded."""
+        return (
+            len(self.codes)
+            + self.type_ids.itemsize * len(self.type_ids)
+            + self.module_ids.itemsize * len(self.module_ids)
+            + sum(sys.getsizeof(chunk) for chunk in self._chunks)
+            + self._offsets.itemsize * len(self._offsets)
+            + sum(sys.getsizeof(address) for address in self._pending)
+        )
+
+
+def _matching_codes(any_bits: int, min_level: int, reviewed: Optional[bool]) -> Iterator[int]:
+    for code in range(256):
+        if any_bits and not code & any_bits:
+            continue
+        if code & LEVEL_MASK < min_level:
+            continue
+        if reviewed is not None and bool(code & REVIEWED) != reviewed:
+            continue
+        yield code
@@ -0,0 +1,218 @@
+"""Roll-up of resource changes by module and by provider.
+
+``RiskTree`` is a prefix trie whose nodes hold the number of changes, deletes
+and HIGH or CRITICAL risk changes under them, and their highest resource
+risk level. Two trees are built from a ``ChangeTable``:
+
+- by module: one level per module call of the module address, e.g.
+  ``module.network`` then ``module.network.module.subnets["a"]``;
+- by provider: one level per underscore-separated prefix of the resource
+  type, e.g. ``aws`` then ``aws_iam`` then ``aws_iam_role``.
+
+The root holds the totals of the whole plan.
+
+Both are built in one pass over the table's columns, counting the changes
+per (module, code) and per (type, code) pair, so only the distinct pairs are
+walked down the tree. Queries such as the risk under ``module.network``
+(``find``) or the riskiest modules (``top``) then read the tree.
+
+A tree is kept in the statistics of a summary as its ``rollup``: one
+(path, depth, changes, deletes, sensitive, level) tuple per node, root
+and parents first, from which ``RiskTree.from_rollup`` rebuilds it.
+"""
+
+import heapq
+import itertools
+import re
+from collections import Counter
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+from terraguard.config import RESOURCE_RISK_LEVEL_ORDER
+from terraguard.terraform_plan.table import (
+    CHANGED,
+    DELETE,
+    HIGH,
+    LEVEL_MASK,
+    REVIEWED,
+    ChangeTable,
+)
+
+# (path, depth, changes, deletes, sensitive, risk_level)
+RollupRow = Tuple[str, int, int, int, int, str]
+
+# One module call of a module address, with its optional instance key.
+_MODULE_CALL = re.compile(r'module\.[^.\[]+(?:\[(?:"(?:[^"\\]|\\.)*"|[^\]]*)\])?')
+# Module calls at the start of a resource address.
+_MODULE_PREFIX = re.compile(rf"(?:{_MODULE_CALL.pattern}\.)*")
+
+
+def module_segments(module_address: str) -> List[str]:
+    """Split a module address into its module calls; [] for the root module."""
+    return _MODULE_CALL.findall(module_address)
+
+
+def resource_type(address: str) -> str:
+    """Return the resource type of a resource instance address."""
+    local = address[_MODULE_PREFIX.match(address).end() :]  # type: ignore[union-attr]
+    if local.startswith("data."):
+        local = local[len("data.") :]
+    return local.split(".", 1)[0]
+
+
+class TreeNode:
+    """Changes rolled up under a module or resource type prefix."""
+
+    __slots__ = ("path", "depth", "changes", "deletes", "sensitive", "level", "children")
+
+    def __init__(self, path: str, depth: int) -> None:
+        self.path = path
+        self.depth = depth
+        self.changes = 0
+        self.deletes = 0
+        # HIGH and CRITICAL risk changes
+        self.sensitive = 0
+        # Highest resource risk level, an index into RESOURCE_RISK_LEVEL_ORDER
+        self.level = 0
+        self.children: Dict[str, TreeNode] = {}
+
+    @property
+    def risk_level(self) -> str:
+        """Highest resource risk level of the changes under this node."""
+        return RESOURCE_RISK_LEVEL_ORDER[self.level]
+
+    def collapsed(self) -> "TreeNode":
+        """Return the deepest node down the chain of only children holding all changes of this one.
+
+        Resource type prefixes such as ``aws_db`` and ``aws_db_subnet`` add
+        nothing to ``aws_db_subnet_group`` when it is their only change.
+        """
+        node = self
+        while len(node.children) == 1:
+            (child,) = node.children.values()
+            if child.changes != node.changes:
+                break
+            node = child
+        return node
+
+    def rank(self) -> Tuple[int, int, int, int]:
+        """Sort key of the node: riskier nodes first when sorted in reverse."""
+        return (self.level, self.sensitive, self.deletes, self.changes)
+
+
+class RiskTree:
+    """Prefix trie of changes, rolling up counts and the highest risk level."""
+
+    def __init__(self, separator: str) -> None:
+        """Create an empty tree.
+
+        Args:
+            separator: Joins the segments of a path: "." for module
+                addresses, "_" for resource types.
+        """
+        self.separator = separator
+        self.root = TreeNode("", 0)
+        self._nodes: Dict[str, TreeNode] = {"": self.root}
+
+    def add(self, segments: Sequence[str], code: int, count: int = 1) -> None:
+        """Add ``count`` changes of the same code under a path.
+
+        Args:
+            segments: Segments of the path, outermost first.
+            code: Change code (see ``terraform_plan.table``).
+            count: Number of changes.
+        """
+        level = code & LEVEL_MASK
+        deletes = count if code & DELETE else 0
+        sensitive = count if level >= HIGH else 0
+        node = self.root
+        for segment in segments:
+            child = node.children.get(segment)
+            if child is None:
+                path = f"{node.path}{self.separator}{segment}" if node.path else segment
+                child = node.children[segment] = self._nodes[path] = TreeNode(path, node.depth + 1)
+            _add_to(node, count, deletes, sensitive, level)
+            node = child
+        _add_to(node, count, deletes, sensitive, level)
+
+    def find(self, path: str) -> Optional[TreeNode]:
+        """Return the node of a path ("" for the root), or None if nothing changes under it."""
+        return self._nodes.get(path)
+
+    def nodes(self) -> Iterator[TreeNode]:
+        """Yield every node but the root, parents first."""
+        stack = list(reversed(self.root.children.values()))
+        while stack:
+            node = stack.pop()
+            yield node
+            stack.extend(reversed(node.children.values()))
+
+    def top(self, n: int, depth: Optional[int] = None) -> List[TreeNode]:
+        """Return the ``n`` riskiest nodes, optionally only those at ``depth``.
+
+        Nodes are ranked by highest risk level, then by number of sensitive
+        changes, deletes and changes.
+        """
+        candidates = self.nodes() if depth is None else self.at_depth(depth)
+        return heapq.nlargest(n, candidates, key=TreeNode.rank)
+
+    def at_depth(self, depth: int) -> Iterator[TreeNode]:
+        """Yield the nodes at ``depth`` (1 for the outermost segments)."""
+        return (node for node in self.nodes() if node.depth == depth)
+
+    def rollup(self) -> List[RollupRow]:
+        """Return one (path, depth, changes, deletes, sensitive, level) tuple per node."""
+        return [
+            (node.path, node.depth, node.changes, node.deletes, node.sensitive, node.risk_level)
+            for node in itertools.chain((self.root,), self.nodes())
+        ]
+
+    @classmethod
+    def from_rollup(cls, rows: Sequence[RollupRow], separator: str) -> "RiskTree":
+        """Rebuild a tree from its ``rollup``."""
+        tree = cls(separator)
+        stack: List[TreeNode] = []
+        for path, depth, changes, deletes, sensitive, risk_level in rows:
+            del stack[depth:]
+            node = TreeNode(path, depth) if stack else tree.root
+            node.changes, node.deletes, node.sensitive = changes, deletes, sensitive
+            node.level = RESOURCE_RISK_LEVEL_ORDER.index(risk_level)
+            if stack:
+                parent = stack[-1]
+                segment = path[len(parent.path) + len(separator) :] if parent.path else path
+                parent.children[segment] = tree._nodes[path] = node
+            stack.append(node)
+        return tree
+
+
+def _add_to(node: TreeNode, changes: int, deletes: int, sensitive: int, level: int) -> None:
+    node.changes += changes
+    node.deletes += deletes
+    node.sensitive += sensitive
+    if level > node.level:
+        node.level = level
+
+
+def build_trees(table: ChangeTable) -> Tuple[RiskTree, RiskTree]:
+    """Roll up the changes of a table by module and by provider.
+
+    No-op and read changes, and changes already reviewed in a baseline, are
+    left out.
+
+    Returns:
+        The module tree and the provider tree.
+    """
+    modules = RiskTree(".")
+    providers = RiskTree("_")
+    segments: Dict[int, List[str]] = {}
+    for (module_id, code), count in Counter(zip(table.module_ids, table.codes)).items():
+        if code & REVIEWED or not code & CHANGED:
+            continue
+        path = segments.get(module_id)
+        if path is None:
+            path = segments[module_id] = module_segments(table.modules[module_id])
+        modules.add(path, code, count)
+    for (type_id, code), count in Counter(zip(table.type_ids, table.codes)).items():
+        if code & REVIEWED or not code & CHANGED:
+            continue
+        providers.add(table.types[type_id].split("_"), code, count)
+    return modules, providers
@@ -0,0 +1,177 @@
+"""Shared fixtures: a local stub of the GitHub REST API."""
+
+import json
+import re
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Deque, Dict, Iterator, List, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+import pytest
+
+from terraguard.outputs import github
+
+REPO = "octo/infra"
+PR_NUMBER = 7
+
+# (status, headers, body) of a scripted response.
+Response = Tuple[int, Dict[str, str], Any]
+
+
+class StubGitHub:
+    """In-memory GitHub API serving the endpoints terraguard uses.
+
+    Comments live in ``comments`` (ID to {"id", "body", "user": {"login"}}).
+    Responses queued with ``script`` are served, in order, before a request
+    to the given method and path is handled normally.
+    """
+
+    def __init__(self) -> None:
+        self.login = "terraguard-bot"
+        self.user_status = 200
+        self.comments: Dict[int, Dict[str, Any]] = {}
+        self.check_runs: List[Dict[str, Any]] = []
+        # (method, path, monotonic time) of every request received
+        self.requests: List[Tuple[str, str, float]] = []
+        self.write_delay = 0.0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._next_id = 1000
+        self._scripts: Dict[Tuple[str, str], Deque[Response]] = {}
+        self._lock = threading.Lock()
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self.server.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self.server.server_port}"
+
+    def add_comment(self, body: str, login: Optional[str] = None) -> int:
+        """Add a comment to the pull request and return its ID."""
+        with self._lock:
+            self._next_id += 1
+            comment_id = self._next_id
+            self.comments[comment_id] = {
+                "id": comment_id,
+                "body": body,
+                "user": {"login": login or self.login},
+            }
+        return comment_id
+
+    def script(self, method: str, path: str, *responses: Response) -> None:
+        """Serve ``responses`` to the next requests to ``method`` ``path``."""
+        self._scripts.setdefault((method, path), deque()).extend(responses)
+
+    def count(self, method: str, path_pattern: str = ".*") -> int:
+        """Return the number of requests received to ``method`` and a matching path."""
+        return sum(
+            m == method and re.fullmatch(path_pattern, p) is not None for m, p, _ in self.requests
+        )
+
+    def _handle(self, method: str, target: str, body: Any) -> Response:
+        parts = urlsplit(target)
+        path, query = parts.path, parse_qs(parts.query)
+        with self._lock:
+            self.requests.append((method, path, time.monotonic()))
+            scripted = self._scripts.get((method, path))
+            if scripted:
+                return scripted.popleft()
+
+        comments_path = f"/repos/{REPO}/issues/{PR_NUMBER}/comments"
+        comment = re.fullmatch(rf"/repos/{REPO}/issues/comments/(\d+)", path)
+        if method == "GET" and path == "/user":
+            if self.user_status != 200:
+                return self.user_status, {}, {"message": "Resource not accessible by integration"}
+            return 200, {}, {"login": self.login}
+        if method == "GET" and path == comments_path:
+            per_page = int(query.get("per_page", ["30"])[0])
+            page = int(query.get("page", ["1"])[0])
+            with self._lock:
+                listed = list(self.comments.values())
+            headers = {}
+            if page * per_page < len(listed):
+                headers["Link"] = (
+                    f'<{self.url}{comments_path}?per_page={per_page}&page={page + 1}>; rel="next"'
+                )
+            return 200, headers, listed[(page - 1) * per_page : page * per_page]
+        if method == "POST" and path == comments_path:
+            comment_id = self.add_comment(body["body"])
+            return 201, {}, self.comments[comment_id]
+        if method == "PATCH" and comment is not None:
+            with self._lock:
+                found = self.comments.get(int(comment.group(1)))
+                if found is None:
+                    return 404, {}, {"message": "Not Found"}
+                if found["user"]["login"] != self.login:
+                    return 403, {}, {"message": "Must have admin rights to Repository."}
+                found["body"] = body["body"]
+            return 200, {}, found
+        if method == "POST" and path == f"/repos/{REPO}/check-runs":
+            self.check_runs.append(body)
+            return 201, {}, {"id": len(self.check_runs), **body}
+        return 404, {}, {"message": "Not Found"}
+
+    def _handler(self) -> type:
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def _serve(self) -> None:
+                length = int(self.headers.get("Content-Length") or 0)
+                body = json.loads(self.rfile.read(length)) if length else None
+                write = self.command != "GET"
+                if write:
+                    with stub._lock:
+                        stub.in_flight += 1
+                        stub.max_in_flight = max(stub.max_in_flight, stub.in_flight)
+                    time.sleep(stub.write_delay)
+                try:
+                    status, headers, payload = stub._handle(self.command, self.path, body)
+                finally:
+                    if write:
+                        with stub._lock:
+                            stub.in_flight -= 1
+                data = (
+                    payload.encode() if isinstance(payload, str) else json.dumps(payload).encode()
+                )
+                self.send_response(status)
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            do_GET = do_POST = do_PATCH = _serve
+
+            def log_message(self, format: str, *args: Any) -> None:
+                pass
+
+        return Handler
+
+
+@pytest.fixture
+def github_api() -> Iterator[StubGitHub]:
+    """Run a stub GitHub API on a local port for the duration of a test."""
+    stub = StubGitHub()
+    thread = threading.Thread(target=stub.server.serve_forever, args=(0.01,), daemon=True)
+    thread.start()
+    github._own_logins.clear()
+    try:
+        yield stub
+    finally:
+        stub.server.shutdown()
+        stub.server.server_close()
+
+
+@pytest.fixture
+def session() -> Any:
+    """Return a fresh session with the headers of ``github.get_session``."""
+    import requests
+
+    session = requests.Session()
+    session.headers["Authorization"] = "Bearer test-token"
+    return session
+
+
+@pytest.fixture
+def pull_request() -> github.PullRequest:
+    return github.PullRequest(REPO, PR_NUMBER, "abc123")
@@ -0,0 +1,50 @@
+"""Reading baseline digests, well-formed or not."""
+
+import gzip
+import json
+from typing import Any
+
+import pytest
+
+from terraguard.terraform_plan.baseline import (
+    DIGEST_FORMAT,
+    DIGEST_VERSION,
+    load_baseline,
+    write_digest,
+)
+
+
+def _write_document(path: Any, plans: Any) -> str:
+    document = {"format": DIGEST_FORMAT, "version": DIGEST_VERSION, "plans": plans}
+    with gzip.open(path, "wt", encoding="utf-8") as f:
+        json.dump(document, f, separators=(",", ":"))
+    return str(path)
+
+
+def test_digest_round_trip(tmp_path: Any) -> None:
+    path = str(tmp_path / "baseline.digest")
+    write_digest(path, {"plan.json": {"aws_s3_bucket.b": 0x42, "aws_vpc.main": 0x11}})
+
+    baseline = load_baseline(path, {})
+
+    assert baseline.plans == {"plan.json": {"aws_s3_bucket.b": 0x42, "aws_vpc.main": 0x11}}
+
+
+@pytest.mark.parametrize(
+    "plans",
+    [
+        ["plan.json"],
+        {"plan.json": ["aws_vpc.main"]},
+        {"plan.json": {"codes": [1]}},
+        {"plan.json": {"addresses": ["aws_vpc.main"]}},
+        {"plan.json": {"addresses": "aws_vpc.main", "codes": [1]}},
+        {"plan.json": {"addresses": ["aws_vpc.main"], "codes": [1, 2]}},
+        {"plan.json": {"addresses": [7], "codes": [1]}},
+        {"plan.json": {"addresses": ["aws_vpc.main"], "codes": ["1"]}},
+    ],
+)
+def test_malformed_digest_is_reported_as_invalid(tmp_path: Any, plans: Any) -> None:
+    path = _write_document(tmp_path / "baseline.digest", plans)
+
+    with pytest.raises(ValueError, match="Invalid digest .*baseline.digest"):
+        load_baseline(path, {})
@@ -0,0 +1,37 @@
+"""Size limit of the result cache."""
+
+import os
+from typing import Any, List
+
+from terraguard import cache
+
+
+def _entries_size(directory: str) -> int:
+    return sum(
+        os.path.getsize(os.path.join(root, name))
+        for root, _, names in os.walk(directory)
+        for name in names
+    )
+
+
+def test_cache_is_scanned_only_when_over_the_limit(tmp_path: Any, monkeypatch: Any) -> None:
+    scans: List[str] = []
+    scan_entries = cache._scan_entries
+
+    def counting_scan(root: str) -> Any:
+        scans.append(root)
+        return scan_entries(root)
+
+    monkeypatch.setattr(cache, "_scan_entries", counting_scan)
+    result_cache = cache.ResultCache(str(tmp_path), max_bytes=40_000)
+    result = {"level": "LOW", "padding": "x" * 900}
+
+    for i in range(100):
+        result_cache.put(f"{i:064x}", result)
+
+    # One scan on the first write, then one per tenth of the limit written
+    # once the cache is full
+    assert 1 < len(scans) <= 15
+    assert _entries_size(str(tmp_path)) <= 40_000
+    assert result_cache.get(f"{99:064x}") is not None
+    assert result_cache.get(f"{0:064x}") is None
@@ -0,0 +1,98 @@
+"""Verdicts of ``--fast-fail`` runs, against runs reading the whole plan."""
+
+import json
+import sys
+from typing import Any, Dict, List, Tuple
+
+import pytest
+
+from terraguard import cli
+
+# Few enough changes for the plan size alone not to make it HIGH risk
+LOW_CHANGES = 15
+
+ENVIRONMENT = (
+    "FAIL_ON_RISK_LEVEL",
+    "RISK_CONFIG_PATH",
+    "RISK_CONFIG_LAYERS",
+    "TERRAGUARD_CACHE_DIR",
+    "TERRAGUARD_HISTORY",
+    "TERRAGUARD_METRICS_FILE",
+    "TERRAGUARD_METRICS_URL",
+)
+
+
+def _change(address: str, rtype: str, action: str) -> Dict[str, Any]:
+    return {
+        "address": address,
+        "type": rtype,
+        "change": {"actions": [action], "before": {}, "after": {}},
+    }
+
+
+def _write_plan(tmp_path: Any, critical_at: int, action: str = "delete") -> str:
+    """Write a plan of LOW risk updates with one CRITICAL change at ``critical_at``."""
+    changes = [_change(f"example_item.i{i}", "example_item", "update") for i in range(LOW_CHANGES)]
+    changes.insert(critical_at, _change("aws_iam_role.deploy", "aws_iam_role", action))
+    path = tmp_path / "plan.json"
+    path.write_text(json.dumps({"resource_changes": changes}))
+    return str(path)
+
+
+def _run(plan: str, fail_on: str, fast_fail: bool, monkeypatch: Any) -> Tuple[int, Dict[str, Any]]:
+    """Run tguard on a plan and return its exit code and summary record."""
+    records = f"{plan}.records.jsonl"
+    argv: List[str] = ["tguard", plan, "--fail-on", fail_on, "--no-github-comment"]
+    argv += ["--output", "jsonl", "--output-file", records]
+    if fast_fail:
+        argv.append("--fast-fail")
+    monkeypatch.setattr(sys, "argv", argv)
+    with pytest.raises(SystemExit) as exit_info:
+        cli.main()
+    with open(records, encoding="utf-8") as f:
+        summaries = [r for r in map(json.loads, f) if r["record"] == "summary"]
+    assert len(summaries) == 1
+    return int(exit_info.value.code or 0), summaries[0]
+
+
+@pytest.fixture(autouse=True)
+def clean_environment(monkeypatch: Any) -> None:
+    for name in ENVIRONMENT:
+        monkeypatch.delenv(name, raising=False)
+
+
+@pytest.mark.parametrize("critical_at", [0, LOW_CHANGES], ids=["first", "last"])
+def test_fast_fail_reaching_threshold(
+    tmp_path: Any, monkeypatch: Any, capsys: Any, critical_at: int
+) -> None:
+    plan = _write_plan(tmp_path, critical_at)
+
+    full_code, full = _run(plan, "HIGH", False, monkeypatch)
+    fast_code, fast = _run(plan, "HIGH", True, monkeypatch)
+
+    assert full_code == fast_code == 1
+    assert full["level"] == fast["level"] == "HIGH"
+    assert not full["stats"]["partial"]
+    assert full["stats"]["scanned"] == LOW_CHANGES + 1
+    if critical_at == 0:
+        # Stopped at the first check, right after the CRITICAL delete
+        assert fast["stats"]["partial"]
+        assert fast["stats"]["scanned"] == 1
+    else:
+        assert fast["stats"]["scanned"] == LOW_CHANGES + 1
+
+
+@pytest.mark.parametrize("critical_at", [0, LOW_CHANGES], ids=["first", "last"])
+def test_fast_fail_below_threshold(
+    tmp_path: Any, monkeypatch: Any, capsys: Any, critical_at: int
+) -> None:
+    # A CRITICAL update alone only makes the plan MEDIUM risk
+    plan = _write_plan(tmp_path, critical_at, "update")
+
+    full_code, full = _run(plan, "HIGH", False, monkeypatch)
+    fast_code, fast = _run(plan, "HIGH", True, monkeypatch)
+
+    assert full_code == fast_code == 0
+    assert full["level"] == fast["level"] == "MEDIUM"
+    assert not fast["stats"]["partial"]
+    assert fast["stats"] == full["stats"]
@@ -0,0 +1,228 @@
+"""Rate limits, retries and concurrent writes against a local stub of the GitHub API."""
+
+import json
+import threading
+import time
+from typing import Any
+
+import pytest
+import requests
+from conftest import PR_NUMBER, REPO, StubGitHub
+
+from terraguard.outputs import github
+
+COMMENTS = f"/repos/{REPO}/issues/{PR_NUMBER}/comments"
+
+
+@pytest.fixture(autouse=True)
+def fast_retries(monkeypatch: Any) -> None:
+    monkeypatch.setattr(github, "BACKOFF_SECONDS", 0.01)
+    monkeypatch.setattr(github, "_pause_until", 0.0)
+
+
+def _times(stub: StubGitHub, method: str, path: str) -> list:
+    return [t for m, p, t in stub.requests if m == method and p == path]
+
+
+def test_waits_for_retry_after(github_api: StubGitHub, session: Any) -> None:
+    github_api.script("GET", "/user", (429, {"Retry-After": "0.3"}, {"message": "slow down"}))
+
+    resp = github.request(session, "GET", f"{github_api.url}/user")
+
+    assert resp.status_code == 200
+    first, second = _times(github_api, "GET", "/user")
+    assert second - first >= 0.3
+
+
+def test_pauses_when_rate_limit_is_used_up(github_api: StubGitHub, session: Any) -> None:
+    reset = time.time() + 0.4
+    headers = {"X-RateLimit-Remaining": "0", "X-RateLimit-Reset": str(reset)}
+    github_api.script("GET", "/user", (200, headers, {"login": "terraguard-bot"}))
+
+    # The response using up the limit is returned; the next request waits for the reset
+    assert github.request(session, "GET", f"{github_api.url}/user").status_code == 200
+    assert github.request(session, "GET", f"{github_api.url}/user").status_code == 200
+    first, second = _times(github_api, "GET", "/user")
+    assert second - first >= 0.3
+    assert time.time() >= reset - 0.05
+
+
+def test_retries_primary_rate_limit_error(github_api: StubGitHub, session: Any) -> None:
+    headers = {"X-RateLimit-Remaining": "0", "X-RateLimit-Reset": str(time.time() + 0.3)}
+    github_api.script("GET", "/user", (403, headers, {"message": "API rate limit exceeded"}))
+
+    resp = github.request(session, "GET", f"{github_api.url}/user")
+
+    assert resp.status_code == 200
+    assert github_api.count("GET", "/user") == 2
+
+
+def test_retries_secondary_rate_limit(
+    github_api: StubGitHub, session: Any, monkeypatch: Any
+) -> None:
+    # Without Retry-After, GitHub asks to wait at least a minute; shortened here
+    monkeypatch.setattr(github, "MAX_RATE_LIMIT_WAIT", 0.3)
+    message = {"message": "You have exceeded a secondary rate limit."}
+    github_api.script("POST", COMMENTS, (403, {}, message))
+
+    resp = github.request(session, "POST", f"{github_api.url}{COMMENTS}", json={"body": "x"})
+
+    assert resp.status_code == 201
+    first, second = _times(github_api, "POST", COMMENTS)
+    assert second - first >= 0.3
+
+
+def test_gives_up_on_long_rate_limit(github_api: StubGitHub, session: Any) -> None:
+    github_api.script("GET", "/user", (429, {"Retry-After": "3600"}, {"message": "slow down"}))
+
+    started = time.monotonic()
+    resp = github.request(session, "GET", f"{github_api.url}/user")
+
+    assert resp.status_code == 429
+    assert time.monotonic() - started < 1
+    assert github_api.count("GET", "/user") == 1
+
+
+def test_forbidden_without_rate_limit_is_not_retried(github_api: StubGitHub, session: Any) -> None:
+    github_api.script("GET", "/user", (403, {}, {"message": "Resource not accessible"}))
+
+    assert github.request(session, "GET", f"{github_api.url}/user").status_code == 403
+    assert github_api.count("GET", "/user") == 1
+
+
+def test_retries_server_errors_with_backoff(github_api: StubGitHub, session: Any) -> None:
+    github_api.script("GET", "/user", (502, {}, "bad gateway"), (503, {}, "unavailable"))
+
+    assert github.request(session, "GET", f"{github_api.url}/user").status_code == 200
+    assert github_api.count("GET", "/user") == 3
+
+    github_api.script("GET", "/user", *[(500, {}, "error")] * github.MAX_ATTEMPTS)
+    assert github.request(session, "GET", f"{github_api.url}/user").status_code == 500
+    assert github_api.count("GET", "/user") == 3 + github.MAX_ATTEMPTS
+
+
+def test_post_is_not_sent_again_after_server_error(github_api: StubGitHub, session: Any) -> None:
+    github_api.script("POST", COMMENTS, (502, {}, "bad gateway"))
+
+    resp = github.request(session, "POST", f"{github_api.url}{COMMENTS}", json={"body": "x"})
+
+    assert resp.status_code == 502
+    assert github_api.count("POST", COMMENTS) == 1
+
+
+def test_post_is_not_sent_again_after_timeout(
+    github_api: StubGitHub, session: Any, pull_request: github.PullRequest, monkeypatch: Any
+) -> None:
+    # GitHub creates the comment, but answers after the client gave up
+    monkeypatch.setattr(github, "REQUEST_TIMEOUT", 0.1)
+    github_api.write_delay = 0.4
+
+    with pytest.raises(requests.Timeout):
+        github.upsert_sticky_comment(session, github_api.url, pull_request, "summary")
+
+    deadline = time.monotonic() + 2
+    while not github_api.comments and time.monotonic() < deadline:
+        time.sleep(0.01)
+    time.sleep(0.5)
+    assert len(github_api.comments) == 1
+    assert github_api.count("POST", COMMENTS) == 1
+
+
+def test_patch_is_sent_again_after_server_error(github_api: StubGitHub, session: Any) -> None:
+    comment_id = github_api.add_comment("old")
+    path = f"/repos/{REPO}/issues/comments/{comment_id}"
+    github_api.script("PATCH", path, (503, {}, "unavailable"))
+
+    resp = github.request(session, "PATCH", f"{github_api.url}{path}", json={"body": "new"})
+
+    assert resp.status_code == 200
+    assert github_api.comments[comment_id]["body"] == "new"
+    assert github_api.count("PATCH", path) == 2
+
+
+def test_pause_holds_back_other_threads(github_api: StubGitHub, session: Any) -> None:
+    github_api.script("GET", "/user", (429, {"Retry-After": "0.4"}, {"message": "slow down"}))
+    limited = threading.Thread(
+        target=github.request, args=(session, "GET", f"{github_api.url}/user")
+    )
+    limited.start()
+    while not github_api.requests:
+        time.sleep(0.01)
+    time.sleep(0.1)
+
+    github.request(session, "GET", f"{github_api.url}{COMMENTS}")
+    limited.join()
+
+    rate_limited, _ = _times(github_api, "GET", "/user")
+    (listed,) = _times(github_api, "GET", COMMENTS)
+    assert listed - rate_limited >= 0.35
+
+
+def test_plan_comments_are_written_concurrently_and_cached(
+    github_api: StubGitHub, session: Any, pull_request: github.PullRequest, tmp_path: Any
+) -> None:
+    github_api.write_delay = 0.05
+    cache = github.CommentCache(str(tmp_path / "comments.json"))
+    summaries = {f"default:{i}": f"plan {i}" for i in range(8)}
+
+    results = github.upsert_sticky_comments(
+        session, github_api.url, pull_request, summaries, cache, max_workers=3
+    )
+
+    assert set(results.values()) == {"created"}
+    assert len(github_api.comments) == 8
+    assert 1 < github_api.max_in_flight <= 3
+    assert github_api.count("GET", COMMENTS) == 1
+    assert len(json.loads((tmp_path / "comments.json").read_text())) == 8
+
+    # Unchanged summaries make no request; a changed one is patched directly
+    cache = github.CommentCache(str(tmp_path / "comments.json"))
+    requests_before = len(github_api.requests)
+    summaries["default:3"] = "plan 3, changed"
+    results = github.upsert_sticky_comments(
+        session, github_api.url, pull_request, summaries, cache, max_workers=3
+    )
+    assert results["default:3"] == "updated"
+    assert list(results.values()).count("unchanged") == 7
+    assert [m for m, _, _ in github_api.requests[requests_before:]] == ["PATCH"]
+
+
+def test_failed_write_keeps_earlier_writes_cached(
+    github_api: StubGitHub, session: Any, pull_request: github.PullRequest, tmp_path: Any
+) -> None:
+    marker = "<!-- terraguard:sticky-comment:a -->"
+    created = {"id": 555, "body": f"{marker}\nplan a", "user": {"login": "terraguard-bot"}}
+    github_api.script("POST", COMMENTS, (201, {}, created), (422, {}, {"message": "invalid"}))
+    cache = github.CommentCache(str(tmp_path / "comments.json"))
+
+    with pytest.raises(requests.HTTPError):
+        github.upsert_sticky_comments(
+            session, github_api.url, pull_request, {"a": "plan a", "b": "plan b"}, cache, 1
+        )
+
+    entries = json.loads((tmp_path / "comments.json").read_text())
+    assert [entry["id"] for entry in entries.values()] == [555]
+
+
+def test_comment_cache_ignores_unreadable_file(tmp_path: Any) -> None:
+    path = tmp_path / "comments.json"
+    path.write_text("not json")
+    cache = github.CommentCache(str(path))
+
+    assert cache.get("key") is None
+    cache.put("key", 1, "digest")
+    cache.save()
+    assert github.CommentCache(str(path)).get("key") == {"id": 1, "digest": "digest"}
+
+
+def test_check_run(github_api: StubGitHub, session: Any, pull_request: github.PullRequest) -> None:
+    summary = "### Terraform Plan Risk Assessment\n" + "x" * github.CHECK_RUN_SUMMARY_LIMIT
+
+    github.post_check_run(session, github_api.url, pull_request, summary, failed=True)
+
+    (run,) = github_api.check_runs
+    assert run["head_sha"] == "abc123"
+    assert run["conclusion"] == "failure"
+    assert run["output"]["title"] == "Terraform Plan Risk Assessment"
+    assert len(run["output"]["summary"]) == github.CHECK_RUN_SUMMARY_LIMIT
+    assert run["output"]["summary"].endswith("_Summary truncated._")
@@ -0,0 +1,149 @@
+"""Sticky comments against a local stub of the GitHub API."""
+
+import json
+import os
+from typing import Any
+
+from conftest import PR_NUMBER, REPO, StubGitHub
+
+from terraguard.outputs import github
+
+COMMENTS = f"/repos/{REPO}/issues/{PR_NUMBER}/comments"
+COMMENT = rf"/repos/{REPO}/issues/comments/\d+"
+
+
+def _marker(key: str = github.DEFAULT_COMMENT_KEY) -> str:
+    return f"<!-- terraguard:sticky-comment:{key} -->"
+
+
+def _bodies(stub: StubGitHub) -> list:
+    return [comment["body"] for comment in stub.comments.values()]
+
+
+def test_creates_then_updates_then_skips(
+    github_api: StubGitHub, session: Any, pull_request: github.PullRequest, tmp_path: Any
+) -> None:
+    cache = github.CommentCache(str(tmp_path / "comments.json"))
+    upsert = github.upsert_sticky_comment
+
+    assert upsert(session, github_api.url, pull_request, "first", cache=cache) == "created"
+    assert _bodies(github_api) == [f"{_marker()}\nfirst"]
+
+    assert upsert(session, github_api.url, pull_request, "second", cache=cache) == "updated"
+    assert _bodies(github_api) == [f"{_marker()}\nsecond"]
+    # The cached comment ID is patched without listing the comments again
+    assert github_api.count("GET", COMMENTS) == 1
+
+    requests_before = len(github_api.requests)
+    assert upsert(session, github_api.url, pull_request, "second", cache=cache) == "unchanged"
+    assert len(github_api.requests) == requests_before
+
+
+def test_finds_existing_comment_without_cache(
+    github_api: StubGitHub, session: Any, pull_request: github.PullRequest
+) -> None:
+    github_api.add_comment("LGTM", login="reviewer")
+    comment_id = github_api.add_comment(f"{_marker()}\nold")
+
+    result = github.upsert_sticky_comment(session, github_api.url, pull_request, "new")
+
+    assert result == "updated"
+    assert github_api.comments[comment_id]["body"] == f"{_marker()}\nnew"
+    assert len(github_api.comments) == 2
+
+
+def test_recreates_deleted_comment(
+    github_api: StubGitHub, session: Any, pull_request: github.PullRequest, tmp_path: Any
+) -> None:
+    cache = github.CommentCache(str(tmp_path / "comments.json"))
+    github.upsert_sticky_comment(session, github_api.url, pull_request, "first", cache=cache)
+    github_api.comments.clear()
+
+    result = github.upsert_sticky_comment(
+        session, github_api.url, pull_request, "second", cache=cache
+    )
+
+    assert result == "created"
+    assert _bodies(github_api) == [f"{_marker()}\nsecond"]
+    assert github_api.count("PATCH", COMMENT) == 1
+    (entry,) = json.loads((tmp_path / "comments.json").read_text()).values()
+    assert entry["id"] == next(iter(github_api.comments))
+
+
+def test_pages_through_comments(
+    github_api: StubGitHub, session: Any, pull_request: github.PullRequest
+) -> None:
+    for i in range(2 * github.COMMENTS_PER_PAGE + 10):
+        github_api.add_comment(f"comment {i}", login="reviewer")
+    comment_id = github_api.add_comment(f"{_marker('stack-a')}\nold")
+
+    result = github.upsert_sticky_comment(
+        session, github_api.url, pull_request, "new", key="stack-a"
+    )
+
+    assert result == "updated"
+    assert github_api.comments[comment_id]["body"] == f"{_marker('stack-a')}\nnew"
+    assert github_api.count("GET", COMMENTS) == 3
+    assert github_api.count("POST") == 0
+
+
+def test_ignores_marker_in_comment_of_another_user(
+    github_api: StubGitHub, session: Any, pull_request: github.PullRequest
+) -> None:
+    spoofed = github_api.add_comment(f"{_marker()}\nspoofed", login="mallory")
+
+    result = github.upsert_sticky_comment(session, github_api.url, pull_request, "real")
+
+    assert result == "created"
+    assert github_api.comments[spoofed]["body"] == f"{_marker()}\nspoofed"
+    assert github_api.count("PATCH", COMMENT) == 0
+    assert _bodies(github_api)[-1] == f"{_marker()}\nreal"
+
+
+def test_actions_token_matches_bot_comments(
+    github_api: StubGitHub, session: Any, pull_request: github.PullRequest
+) -> None:
+    # GITHUB_TOKEN cannot read /user; its comments are github-actions[bot]'s
+    github_api.user_status = 403
+    github_api.login = github.ACTIONS_BOT_LOGIN
+    comment_id = github_api.add_comment(f"{_marker()}\nold")
+    github_api.add_comment(f"{_marker()}\nspoofed", login="mallory")
+
+    result = github.upsert_sticky_comment(session, github_api.url, pull_request, "new")
+
+    assert result == "updated"
+    assert github_api.comments[comment_id]["body"] == f"{_marker()}\nnew"
+
+
+def test_keys_keep_separate_comments(
+    github_api: StubGitHub, session: Any, pull_request: github.PullRequest
+) -> None:
+    github.upsert_sticky_comment(session, github_api.url, pull_request, "a", key="stack-a")
+    github.upsert_sticky_comment(session, github_api.url, pull_request, "b", key="stack-b")
+    github.upsert_sticky_comment(session, github_api.url, pull_request, "a2", key="stack-a")
+
+    assert _bodies(github_api) == [f"{_marker('stack-a')}\na2", f"{_marker('stack-b')}\nb"]
+
+
+def test_report_from_actions_environment(
+    github_api: StubGitHub, tmp_path: Any, monkeypatch: Any
+) -> None:
+    event = tmp_path / "event.json"
+    event.write_text(
+        json.dumps(
+            {
+                "pull_request": {"number": PR_NUMBER, "head": {"sha": "abc123"}},
+                "repository": {"full_name": REPO},
+            }
+        )
+    )
+    monkeypatch.setenv("GITHUB_TOKEN", "test-token")
+    monkeypatch.setenv("GITHUB_EVENT_PATH", str(event))
+    monkeypatch.setenv("GITHUB_API_URL", github_api.url)
+    cache_dir = str(tmp_path / "cache")
+
+    for summary in ("first", "second"):
+        github.maybe_post_github_comment(summary, sticky=True, cache_dir=cache_dir)
+
+    assert _bodies(github_api) == [f"{_marker()}\nsecond"]
+    assert os.path.exists(os.path.join(cache_dir, "github-comments.json"))
@@ -0,0 +1,60 @@
+"""Backfilling the run history from saved JSON Lines records."""
+
+import os
+import shutil
+import sqlite3
+from typing import Any
+
+from terraguard import history
+from terraguard.batch import assess_plan_file
+from terraguard.outputs.records import JsonLinesWriter
+from terraguard.risk.risk import load_risk_config
+
+FIXTURES = os.path.join(os.path.dirname(__file__), "fixtures")
+RISK_CONFIG = load_risk_config(
+    os.path.join(os.path.dirname(history.__file__), "risk", "risk_config.json")
+)
+
+
+def _save_records(tmp_path: Any) -> str:
+    """Save the records of the fixture plans, as ``--output jsonl`` does, and return their path."""
+    path = str(tmp_path / "runs.jsonl")
+    with open(path, "w", encoding="utf-8") as out:
+        writer = JsonLinesWriter(out)
+        for name in ("vpc.tfplan.json", "data.tfplan.json"):
+            result = assess_plan_file(
+                os.path.join(FIXTURES, name), RISK_CONFIG, record_changes=True
+            )
+            writer.write_result(result, result.pop("changes"))
+        writer.close()
+    return path
+
+
+def _runs(store: history.HistoryStore) -> int:
+    return sum(row["runs"] for row in store.level_counts())
+
+
+def test_import_skips_files_already_imported(tmp_path: Any) -> None:
+    records = _save_records(tmp_path)
+    copy = str(tmp_path / "copy.jsonl")
+    shutil.copy(records, copy)
+
+    with history.HistoryStore(str(tmp_path / "history.sqlite")) as store:
+        assert history.import_records(store, [records]) == (2, [])
+        assert history.import_records(store, [records, copy]) == (0, [records, copy])
+        assert _runs(store) == 2
+        assert len(store.recent_runs()) == 2
+
+
+def test_import_into_database_of_previous_format(tmp_path: Any) -> None:
+    db = str(tmp_path / "history.sqlite")
+    with history.HistoryStore(db):
+        pass
+    with sqlite3.connect(db) as conn:
+        conn.execute("DROP TABLE imports")
+        conn.execute("PRAGMA user_version=1")
+
+    records = _save_records(tmp_path)
+    with history.HistoryStore(db) as store:
+        assert history.import_records(store, [records, records]) == (2, [records])
+        assert _runs(store) == 2
@@ -0,0 +1,33 @@
+"""Modules that must stay light to import, checked in fresh interpreters."""
+
+import os
+import subprocess
+import sys
+
+import pytest
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src")
+
+# Loaded once a plan is read or scored, never to post a report or run the client.
+HEAVY_PACKAGES = ("terraguard.risk", "terraguard.terraform_plan.loader")
+
+
+def _imported(module: str) -> list:
+    code = f"import sys, {module}; print('\\n'.join(sys.modules))"
+    env = {**os.environ, "PYTHONPATH": SRC_DIR}
+    out = subprocess.run(
+        [sys.executable, "-c", code], env=env, check=True, capture_output=True, text=True
+    ).stdout
+    return out.split()
+
+
+@pytest.mark.parametrize(
+    "module", ["terraguard.client", "terraguard.outputs.github", "terraguard.outputs.metrics"]
+)
+def test_module_does_not_load_plan_reader_or_risk_matcher(module: str) -> None:
+    loaded = _imported(module)
+    assert [name for name in loaded if name.startswith(HEAVY_PACKAGES)] == []
+
+
+def test_github_does_not_load_metrics_until_a_request_is_sent() -> None:
+    assert "terraguard.outputs.metrics" not in _imported("terraguard.outputs.github")
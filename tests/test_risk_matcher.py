@@ -0,0 +1,86 @@
+"""The compiled risk matcher, against a plain scan of the patterns."""
+
+import re
+from typing import Any, Dict, List, Tuple
+
+import pytest
+
+from terraguard.config import RESOURCE_RISK_LEVEL_ORDER
+from terraguard.risk.risk import RiskMatcher
+
+
+def _scan(rtype: str, config: Dict[str, Any]) -> Tuple[str, str]:
+    """Match every pattern in turn, as map_risk_level did before patterns were compiled."""
+    level = config.get("default_risk_level", "LOW")
+    reason = "No specific pattern matched."
+    for item in config.get("resource_risk_patterns", []):
+        item_level = item.get("risk_level", "LOW")
+        if re.match(item["pattern"], rtype) and RESOURCE_RISK_LEVEL_ORDER.index(
+            item_level
+        ) >= RESOURCE_RISK_LEVEL_ORDER.index(level):
+            level, reason = item_level, item.get("reason", "Pattern matched.")
+    return level, reason
+
+
+def _config(*patterns: Tuple[str, str], default: str = "LOW") -> Dict[str, Any]:
+    return {
+        "default_risk_level": default,
+        "resource_risk_patterns": [
+            {"pattern": pattern, "risk_level": level, "reason": f"{i}: {pattern}"}
+            for i, (pattern, level) in enumerate(patterns)
+        ],
+    }
+
+
+RTYPES = [
+    "aws_s3_bucket",
+    "aws_s3_bucket_policy",
+    "aws_s3",
+    "aws_iam_role",
+    "aws_iam_role_policy",
+    "aws_db_instance",
+    "aws_rds_cluster",
+    "google_sql_database_instance",
+    "azurerm_key_vault",
+    "random_id",
+    "null_resource",
+    "",
+]
+
+CONFIGS: List[Tuple[str, Dict[str, Any]]] = [
+    ("anchored exact", _config(("^aws_s3_bucket$", "HIGH"), ("^aws_iam_role$", "CRITICAL"))),
+    ("exact without caret", _config(("aws_s3_bucket$", "HIGH"))),
+    ("unanchored literal", _config(("aws_iam", "HIGH"), ("s3_bucket", "CRITICAL"))),
+    ("prefix", _config(("^aws_s3_.*", "MEDIUM"), ("aws_iam_.*$", "HIGH"))),
+    ("alternation", _config(("^(aws_db_instance|aws_rds_cluster)$", "CRITICAL"))),
+    ("unanchored alternation", _config(("aws_iam_role|.*_key_vault", "HIGH"))),
+    ("regex", _config((r"^\w+_sql_\w+$", "HIGH"), (r".*_policy$", "MEDIUM"), ("^a.s_", "LOW"))),
+    ("empty pattern", _config(("", "MEDIUM"), ("^random_id$", "HIGH"))),
+    (
+        "higher level wins",
+        _config(("^aws_.*", "MEDIUM"), ("^aws_s3_bucket$", "CRITICAL"), ("^aws_s3", "HIGH")),
+    ),
+    (
+        "later pattern of a level wins",
+        _config(("^aws_s3_bucket$", "HIGH"), ("^aws_s3_.*", "HIGH"), (r"^aws_\w+", "HIGH")),
+    ),
+    (
+        "exact after regex of the same level",
+        _config((r"^aws_\w+$", "HIGH"), ("^aws_s3_bucket$", "HIGH"), ("^aws_iam.*", "MEDIUM")),
+    ),
+    (
+        "patterns below the default level",
+        _config(("^aws_s3_bucket$", "LOW"), ("^aws_iam_role$", "MEDIUM"), default="MEDIUM"),
+    ),
+    ("no patterns", _config(default="HIGH")),
+]
+
+
+@pytest.mark.parametrize("config", [c for _, c in CONFIGS], ids=[name for name, _ in CONFIGS])
+def test_matcher_agrees_with_scan(config: Dict[str, Any]) -> None:
+    matcher = RiskMatcher(config)
+
+    for rtype in RTYPES:
+        assert matcher.match(rtype) == _scan(rtype, config), rtype
+        # Memoized results are the same
+        assert matcher.match(rtype) == _scan(rtype, config), rtype
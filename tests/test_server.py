@@ -0,0 +1,114 @@
+"""Assessments of the server, from a file path and from a request body."""
+
+import gzip
+import io
+import json
+import sys
+import threading
+from typing import Any, Iterator, List
+
+import pytest
+
+from terraguard import client
+from terraguard.server import AssessmentService, create_server
+
+PLAN = {
+    "resource_changes": [
+        {
+            "address": f"aws_s3_bucket.b{i}",
+            "type": "aws_s3_bucket",
+            "change": {"actions": ["update"], "before": {}, "after": {}},
+        }
+        for i in range(3)
+    ],
+    "resource_drift": [
+        {
+            "address": "aws_security_group.web",
+            "type": "aws_security_group",
+            "change": {"actions": ["update"], "before": {}, "after": {}},
+        }
+    ],
+    "output_changes": {
+        "db_password": {
+            "actions": ["update"],
+            "before_sensitive": True,
+            "after_sensitive": False,
+        }
+    },
+}
+
+
+def test_body_is_assessed_like_path(tmp_path: Any) -> None:
+    path = tmp_path / "plan.json"
+    path.write_text(json.dumps(PLAN))
+    service = AssessmentService()
+
+    by_path = service.assess_path(str(path))
+    by_body = service.assess_file(io.BufferedReader(io.BytesIO(path.read_bytes())))
+
+    assert by_body == by_path
+    stats = by_body["result"]["stats"]
+    assert stats["drifted_resources"] == 1
+    assert stats["unmasked_outputs"] == 1
+    assert "Outputs no longer sensitive" in by_body["summary_markdown"]
+
+
+@pytest.fixture
+def server_address(tmp_path: Any) -> Iterator[str]:
+    """Serve assessments on a Unix socket for the duration of a test."""
+    address = f"unix:{tmp_path / 'tguard.sock'}"
+    server = create_server(address, AssessmentService())
+    thread = threading.Thread(target=server.serve_forever, args=(0.01,), daemon=True)
+    thread.start()
+    try:
+        yield address
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def _run_client(argv: List[str], monkeypatch: Any, capsys: Any) -> str:
+    """Run tguard-client and return its output, checking it did not fall back."""
+    monkeypatch.setattr(sys, "argv", ["tguard-client", *argv, "--no-github-comment"])
+    with pytest.raises(SystemExit) as exit_info:
+        client.main()
+    assert exit_info.value.code == 0
+    out, err = capsys.readouterr()
+    assert "WARNING" not in err
+    return str(out)
+
+
+@pytest.mark.parametrize("compress", [False, True])
+def test_client_sends_stdin_to_server(
+    server_address: str, tmp_path: Any, monkeypatch: Any, capsys: Any, compress: bool
+) -> None:
+    path = tmp_path / "plan.json"
+    path.write_text(json.dumps(PLAN))
+    data = gzip.compress(path.read_bytes()) if compress else path.read_bytes()
+    monkeypatch.setattr(sys, "stdin", io.TextIOWrapper(io.BytesIO(data)))
+
+    out = _run_client(["--server", server_address, "-"], monkeypatch, capsys)
+
+    assert out == AssessmentService().assess_path(str(path))["summary_markdown"] + "\n"
+
+
+@pytest.mark.parametrize("plan", ["file", "stdin"])
+def test_client_sends_risk_config_layers(
+    server_address: str, tmp_path: Any, monkeypatch: Any, capsys: Any, plan: str
+) -> None:
+    path = tmp_path / "plan.json"
+    path.write_text(json.dumps(PLAN))
+    layer = tmp_path / "layer.json"
+    pattern = {"pattern": "^aws_s3_bucket$", "risk_level": "CRITICAL", "reason": "Buckets."}
+    layer.write_text(json.dumps({"resource_risk_patterns": [pattern]}))
+    monkeypatch.setenv("RISK_CONFIG_LAYERS", str(layer))
+    if plan == "stdin":
+        monkeypatch.setattr(sys, "stdin", io.TextIOWrapper(io.BytesIO(path.read_bytes())))
+
+    out = _run_client(
+        ["--server", server_address, "-" if plan == "stdin" else str(path)], monkeypatch, capsys
+    )
+
+    expected = AssessmentService().assess_path(str(path), None, [str(layer)])
+    assert expected["result"]["stats"]["critical_changes"] == 3
+    assert out == expected["summary_markdown"] + "\n"
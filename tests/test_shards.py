@@ -0,0 +1,90 @@
+"""Summaries of plans read in shards on a process pool, against the serial path."""
+
+import io
+import json
+import os
+import sys
+from typing import Any, Dict
+
+import pytest
+
+from terraguard.risk.risk import load_risk_config
+from terraguard.terraform_plan import shards
+from terraguard.terraform_plan.graph import DependencyGraph
+from terraguard.terraform_plan.loader import iter_resource_changes
+from terraguard.terraform_plan.sections import SectionSignals
+from terraguard.terraform_plan.summarizer import summarize_resource_changes
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(__file__)), "benchmarks"))
+
+from generate_plan import generate_plan  # noqa: E402
+
+RISK_CONFIG = load_risk_config(
+    os.path.join(os.path.dirname(shards.__file__), "..", "risk", "risk_config.json")
+)
+
+
+@pytest.fixture(autouse=True)
+def small_shards(monkeypatch: Any) -> None:
+    # Shards are cut in this process; the workers only get their bounds
+    monkeypatch.setattr(shards, "SHARD_THRESHOLD", 1)
+    monkeypatch.setattr(shards, "MIN_SHARD_BYTES", 16 << 10)
+
+
+def _generated_plan(resources: int, padding: int = 0) -> Dict[str, Any]:
+    out = io.StringIO()
+    generate_plan(out, resources, padding=padding, seed=7)
+    return dict(json.loads(out.getvalue()))
+
+
+def _serial(path: str) -> Dict[str, Any]:
+    graph = DependencyGraph()
+    signals = SectionSignals(RISK_CONFIG)
+    changes = iter_resource_changes(path, graph, signals)
+    return summarize_resource_changes(changes, RISK_CONFIG, graph, signals=signals)
+
+
+def _assert_sharded_like_serial(path: str, jobs: int) -> None:
+    assert shards.shardable(path, jobs)
+    sharded = shards.summarize_plan_sharded(path, RISK_CONFIG, jobs)
+    assert sharded is not None
+    assert sharded == _serial(path)
+
+
+@pytest.mark.parametrize("jobs", [2, 3])
+@pytest.mark.parametrize("padding", [0, 300])
+def test_generated_plan(tmp_path: Any, jobs: int, padding: int) -> None:
+    path = tmp_path / "plan.json"
+    path.write_text(json.dumps(_generated_plan(2000, padding)))
+
+    _assert_sharded_like_serial(str(path), jobs)
+
+
+def test_nested_addresses_drift_and_outputs(tmp_path: Any) -> None:
+    plan = _generated_plan(1500)
+    changes = plan.pop("resource_changes")
+    # Objects with an "address" inside a change look like the start of the next change
+    for change in changes[::7]:
+        change["change"]["after"] = {"targets": [{"id": 1}, {"address": "aws_lb.decoy"}]}
+    drift = [
+        {
+            "address": "aws_security_group.web",
+            "type": "aws_security_group",
+            "change": {"actions": ["update"], "before": {}, "after": {}},
+        }
+    ]
+    outputs = {"db_password": {"actions": ["update"], "before_sensitive": True}}
+    configuration = plan.pop("configuration")
+    plan.update(
+        resource_drift=drift,
+        resource_changes=changes,
+        output_changes=outputs,
+        configuration=configuration,
+    )
+    path = tmp_path / "plan.json"
+    path.write_text(json.dumps(plan, indent=1))
+
+    _assert_sharded_like_serial(str(path), 3)
+    stats = _serial(str(path))
+    assert stats["drifted_resources"] == 1
+    assert stats["unmasked_outputs"] == 1
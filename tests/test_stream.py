@@ -0,0 +1,172 @@
+"""Tests of the pull-style JSON reader against ``json.loads``."""
+
+import io
+import json
+from typing import IO, Any, List
+
+import pytest
+
+from terraguard.terraform_plan.stream import JsonStream, JsonStreamError
+
+CHUNK_SIZES = [1, 2, 3, 5, 7, 13, 64, 1 << 20]
+
+DOCUMENTS = [
+    "{}",
+    "[]",
+    '{"a": 1}',
+    "  [1, -2.5e+10, 3.25E-3, 0, true, false, null]  ",
+    '{"nested": {"list": [[], {}, [{"x": [1, [2, [3]]]}]], "empty": ""}}',
+    '{"escapes": "quote \\" backslash \\\\ slash \\/ \\b\\f\\n\\r\\t", "u": "\\u00e9\\u4e2d"}',
+    '{"surrogates": "\\ud83d\\ude00 and \\ud834\\udd1e", "raw": "é中😀"}',
+    '{"key with \\"quotes\\"": ["\\\\", "\\"", "a\\\\\\"b"], "\\u00e9": 1}',
+    '{"long": "' + "x" * 5000 + '", "n": 12345678901234567890}',
+    json.dumps(
+        {"resource_changes": [{"address": f"aws_s3_bucket.b{i}", "n": i} for i in range(50)]}
+    ),
+    '\n{\n\t"ws" :\r\n [ 1 ,\n2 ] \n}\n',
+]
+
+
+class _Trickle(io.RawIOBase):
+    """Binary file returning at most ``step`` bytes per read, like a pipe."""
+
+    def __init__(self, data: bytes, step: int) -> None:
+        self._data = data
+        self._pos = 0
+        self._step = step
+
+    def readable(self) -> bool:
+        return True
+
+    def read(self, size: int = -1) -> bytes:
+        count = self._step if size < 0 else min(size, self._step)
+        chunk = self._data[self._pos : self._pos + count]
+        self._pos += len(chunk)
+        return chunk
+
+
+def _walk(stream: JsonStream) -> Any:
+    """Rebuild the value at the current position through nested iteration."""
+    char = stream.peek()
+    if char == "{":
+        return {key: _walk(stream) for key in stream.iter_object()}
+    if char == "[":
+        return [_walk(stream) for _ in stream.iter_array()]
+    return stream.read_value()
+
+
+def _inputs(text: str, chunk_size: int) -> List[IO[Any]]:
+    data = text.encode("utf-8")
+    return [io.StringIO(text), io.BytesIO(data), _Trickle(data, max(1, chunk_size // 2 + 1))]
+
+
+@pytest.mark.parametrize("chunk_size", CHUNK_SIZES)
+@pytest.mark.parametrize("text", DOCUMENTS)
+def test_walk_matches_json_loads(text: str, chunk_size: int) -> None:
+    for fp in _inputs(text, chunk_size):
+        stream = JsonStream(fp, chunk_size=chunk_size)
+        assert _walk(stream) == json.loads(text)
+        assert stream.peek() == ""
+
+
+@pytest.mark.parametrize("chunk_size", CHUNK_SIZES)
+@pytest.mark.parametrize("text", DOCUMENTS)
+def test_read_value_matches_json_loads(text: str, chunk_size: int) -> None:
+    for fp in _inputs(text, chunk_size):
+        assert JsonStream(fp, chunk_size=chunk_size).read_value() == json.loads(text)
+
+
+@pytest.mark.parametrize("chunk_size", CHUNK_SIZES)
+@pytest.mark.parametrize("text", DOCUMENTS)
+def test_skip_value_consumes_whole_value(text: str, chunk_size: int) -> None:
+    wrapped = '[{"before": 0}, ' + text + ', "after \\u00e9"]'
+    for fp in _inputs(wrapped, chunk_size):
+        stream = JsonStream(fp, chunk_size=chunk_size)
+        items = stream.iter_array()
+        next(items)
+        assert stream.read_value() == {"before": 0}
+        next(items)
+        stream.skip_value()
+        next(items)
+        assert stream.read_value() == "after é"
+        assert list(items) == []
+
+
+@pytest.mark.parametrize("chunk_size", [16, 256, 4096])
+def test_skip_large_nested_container(chunk_size: int) -> None:
+    big = {"level": [{"deep": [[i, {"s": '\\"' * 3 + "é" * i}] for i in range(40)]}] * 30}
+    text = json.dumps({"skip": big, "keep": {"x": [1, 2]}, "also": [big, big]}, ensure_ascii=False)
+    for fp in _inputs(text, chunk_size):
+        stream = JsonStream(fp, chunk_size=chunk_size)
+        kept = {}
+        for key in stream.iter_object():
+            if key == "keep":
+                kept[key] = stream.read_value()
+            else:
+                stream.skip_value()
+        assert kept == {"keep": {"x": [1, 2]}}
+
+
+@pytest.mark.parametrize("chunk_size", [1, 3, 7, 1 << 20])
+def test_byte_offsets_of_items(chunk_size: int) -> None:
+    items = ['{"a": "é"}', '"中😀"', "[1, 2]", "3.5", '{"b": null}']
+    text = "[" + " , ".join(items) + "]"
+    data = text.encode("utf-8")
+    stream = JsonStream(io.BytesIO(data), chunk_size=chunk_size)
+    offsets = []
+    for _ in stream.iter_array():
+        offsets.append(stream.byte_offset())
+        stream.skip_value()
+    assert offsets == [data.index(item.encode("utf-8")) for item in items]
+
+
+TRUNCATED = [
+    '{"a": [1, 2',
+    '{"a": "abc',
+    '{"a": "ab\\',
+    '{"a": {"b": [',
+    '{"a": 1,',
+    '{"a"',
+    "[",
+    '"\\ud83d',
+]
+
+INVALID = [
+    '{"a" 1}',
+    "[1 2]",
+    '{"a": tru}',
+    "{a: 1}",
+    '{"a": 1,}',
+    "[1,]",
+    '{"a": [1, 2}',
+]
+
+# Skipped strings are scanned without being decoded, so only reading them
+# reports invalid escapes.
+INVALID_ESCAPES = ['{"a": "\\x"}', '["\\u12"]']
+
+
+@pytest.mark.parametrize("chunk_size", [1, 2, 5, 1 << 20])
+@pytest.mark.parametrize("text", TRUNCATED + INVALID + INVALID_ESCAPES)
+def test_invalid_documents_raise_when_read(text: str, chunk_size: int) -> None:
+    with pytest.raises(ValueError):
+        json.loads(text)
+    for fp in _inputs(text, chunk_size):
+        with pytest.raises(JsonStreamError):
+            _walk(JsonStream(fp, chunk_size=chunk_size))
+    for fp in _inputs(text, chunk_size):
+        with pytest.raises(JsonStreamError):
+            JsonStream(fp, chunk_size=chunk_size).read_value()
+
+
+@pytest.mark.parametrize("chunk_size", [1, 2, 5, 1 << 20])
+@pytest.mark.parametrize("text", TRUNCATED + INVALID)
+def test_invalid_documents_raise_when_skipped(text: str, chunk_size: int) -> None:
+    for fp in _inputs(text, chunk_size):
+        with pytest.raises(JsonStreamError):
+            JsonStream(fp, chunk_size=chunk_size).skip_value()
+
+
+def test_error_reports_position() -> None:
+    with pytest.raises(JsonStreamError, match=r"\(char 9\)"):
+        _walk(JsonStream(io.StringIO('{"a": [1 2]}'), chunk_size=2))